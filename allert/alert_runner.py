@@ -1,13 +1,23 @@
 from allert.model.synth import DataSynthesizer
 from allert.model.sklearn_model import GenericModel
+from allert.model.scoring import BatchScorer, write_scores
+from allert.model.incremental import IncrementalTrainer, time_periods
+from allert.model.compare import DEFAULT_CANDIDATES, compare_models
 from allert.rule_engine import RuleEngine
-from allert.data_loader import DataLoader
+from allert.data_loader import DataLoader, TSDB_DSN, TSDB_TABLE, build_query, format_ts, resolve_inputs
 from allert.mapping_loader import MappingLoader
+from allert.tsdb_cache import ParquetCache
+from allert.tsdb_pool import get_pool
+from allert.watermark import WatermarkStore
 import click
+from contextlib import closing
+import pandas as pd
+from sklearn.model_selection import train_test_split
 import yaml
 from loguru import logger
 import os
 import sys
+import time
 
 # 如果直接运行，确保 src 在路径中
 sys.path.append(os.getcwd())
@@ -26,49 +36,152 @@ def load_yaml(path):
         return yaml.safe_load(f)
 
 
-@cli.command()
-@click.option('--config', default='configs/config.yaml', help='Path to config file')
-@click.option('--input', default=None, help='Input CSV file')
-@click.option('--sql', default=None, help='SQL query for TSDB')
-@click.option('--output', default=None, help='Output CSV file')
-def run(config, input, sql, output):
-    """Run rule engine on input CSV or TSDB"""
-    cfg = load_yaml(config)
-
-    # 初始化组件
+def build_data_loader(cfg, use_cache=True, compact=False):
     mapping_loader = MappingLoader(
         cfg['data']['mapping_path'],
-        encoding=cfg['data'].get('mapping_encoding', 'utf-8')
+        encoding=cfg['data'].get('mapping_encoding', 'utf-8'),
+        meta_path=cfg['data'].get('meta_path'),
+        meta_encoding=cfg['data'].get('meta_encoding')
     )
-    data_loader = DataLoader(mapping_loader)
+    cache = None
+    cache_cfg = cfg.get('cache', {})
+    if use_cache and cache_cfg.get('path'):
+        try:
+            cache = ParquetCache(cache_cfg['path'], source=TSDB_DSN,
+                                 partition=cache_cfg.get('partition', '1D'), settle=cache_cfg.get('settle', '10m'))
+        except ImportError as e:
+            logger.warning(f"TSDB cache disabled, Parquet engine not available: {e}")
+    # 进程内共享的连接池，watch 循环等多次查询之间复用连接；删除 pool 项即每次查询单独建立连接
+    pool = get_pool(TSDB_DSN, **cfg['pool']) if cfg.get('pool') is not None else None
+    return DataLoader(mapping_loader, cache=cache, compact=compact or cfg['data'].get('compact', False), pool=pool)
 
-    # 加载规则
+
+def load_input(cfg, data_loader, input, workers=None, fast=False):
+    """读取 --input: 单个文件直接读取，目录/通配符匹配的多个文件并行读取"""
+    paths = resolve_inputs(input, cfg['data'].get('input_pattern', '*.csv'))
+    if not paths:
+        raise FileNotFoundError(f"No input files match {input}")
+    return data_loader.load_csv_files(paths, workers=workers, fast=fast)
+
+
+def load_rules(cfg, config):
     rules_path = cfg['rules']['path']
     if not os.path.exists(rules_path):
         # 回退到相对于配置文件的路径
         rules_path = os.path.join(os.path.dirname(
             config), os.path.basename(rules_path))
+    return load_yaml(rules_path)
+
+
+def rule_filter(engine, data_loader, pushdown=True):
+    """规则可以翻译为 SQL 时，返回下推到 WHERE 的条件列表，只拉取候选行"""
+    if not pushdown:
+        return []
+    pushdown_sql = engine.pushdown_filter(data_loader.mapping_loader.resolve_column)
+    if not pushdown_sql:
+        return []
+    logger.info(f"Pushing rule predicates down to TDengine: {pushdown_sql}")
+    return [pushdown_sql]
+
+
+def build_rule_query(engine, data_loader, start=None, end=None, pushdown=True, columns=None, order_by=None):
+    """为规则引擎生成 TDengine 查询
+
+    - 查询起点额外回看最大规则窗口，保证起点附近的窗口完整
+    - 规则条件可以下推时加入 WHERE (见 rule_filter)
+    - columns 为列裁剪后的 SELECT 列表
+    - 未指定时间范围时沿用默认的 LIMIT 1000
+    """
+    where = rule_filter(engine, data_loader, pushdown)
+    if start is not None:
+        start = pd.Timestamp(start) - engine.max_window
+    limit = 1000 if start is None and end is None else None
+    return build_query(columns=columns, start=start, end=end, where=where, order_by=order_by, limit=limit)
+
+
+@cli.command()
+@click.option('--config', default='configs/config.yaml', help='Path to config file')
+@click.option('--input', default=None, help='Input CSV file, directory (matched by data.input_pattern) or glob')
+@click.option('--sql', default=None, help='SQL query for TSDB')
+@click.option('--start', default=None, help='Start time for TSDB query (inclusive)')
+@click.option('--end', default=None, help='End time for TSDB query (exclusive)')
+@click.option('--no-pushdown', is_flag=True, help='Disable rule predicate pushdown into TDengine')
+@click.option('--memory-budget', default=None, type=int, help='Stream TSDB data in chunks within this memory budget (MB)')
+@click.option('--shards', default=1, help='Split --start/--end into this many time shards read in parallel')
+@click.option('--devices', default=None, help='Comma-separated equ_code list, one shard per device')
+@click.option('--workers', default=4, help='Parallel TDengine connections for sharded reads / processes for multi-file input')
+@click.option('--no-cache', is_flag=True, help='Bypass the local TSDB partition cache')
+@click.option('--fast-csv', is_flag=True, help='Use the chunked fast path for large CSV exports')
+@click.option('--compact', is_flag=True, help='Keep frames in compact form (float32, categorical tags, packed bits)')
+@click.option('--output', default=None, help='Output CSV file')
+def run(config, input, sql, start, end, no_pushdown, memory_budget, shards, devices, workers, no_cache, fast_csv,
+        compact, output):
+    """Run rule engine on input CSV or TSDB"""
+    cfg = load_yaml(config)
 
-    rules_config = load_yaml(rules_path)
-    engine = RuleEngine(rules_config)
+    # 初始化组件
+    data_loader = build_data_loader(cfg, use_cache=not no_cache, compact=compact)
+
+    # 加载规则
+    engine = RuleEngine(load_rules(cfg, config))
+    # 紧凑模式下规则引用的位域列保持展开；无法确定引用列时不打包
+    data_loader.keep_bits = engine.referenced_columns()
 
     # 加载数据
+    columns = None
     try:
         if input:
-            df = data_loader.load_csv(input)
+            df = load_input(cfg, data_loader, input, workers, fast_csv)
+        elif sql and not memory_budget:
+            df = data_loader.load_from_tsdb(sql)
+        elif not sql and not memory_budget and start and end:
+            # 时间范围查询: 只查询规则引用到的列，可走本地缓存、并行分片读取
+            columns = data_loader.project_columns(engine.referenced_columns())
+            df = data_loader.load_range(pd.Timestamp(start) - engine.max_window, end, columns,
+                                        rule_filter(engine, data_loader, not no_pushdown),
+                                        devices.split(',') if devices else None, shards, workers)
         else:
-            # 默认使用 SQL
-            query = sql if sql else "SELECT * FROM station_data.stable_gtjjlfgdzf LIMIT 1000"
-            df = data_loader.load_from_tsdb(query)
+            if shards > 1 or devices:
+                # 分块模式依赖单个查询的 ts 顺序，不做分片
+                logger.warning("Sharded reads need --start and --end without --memory-budget, using a single query.")
+            # 只查询规则引用到的列
+            if not sql:
+                columns = data_loader.project_columns(engine.referenced_columns())
+                sql = build_rule_query(engine, data_loader, start, end, not no_pushdown, columns,
+                                       order_by='ts' if memory_budget else None)
+            df = None if memory_budget else data_loader.load_from_tsdb(sql)
 
-        logger.info(f"Loaded data shape: {df.shape}")
+        if df is not None:
+            logger.info(f"Loaded data shape: {df.shape}")
+            data_loader.report_projection(columns, len(df))
     except Exception as e:
         logger.error(f"Failed to load data: {e}")
         return
 
     # 运行规则
     logger.info("Running rule engine...")
-    alerts = engine.run(df)
+    if df is None:
+        # 分块模式: 逐块送入增量引擎，峰值内存受预算约束
+        stream = engine.stream()
+        alert_frames = []
+        n_rows = 0
+        try:
+            with closing(data_loader.iter_from_tsdb(sql, memory_budget_mb=memory_budget)) as chunks:
+                for chunk in chunks:
+                    n_rows += len(chunk)
+                    alert_frames.append(stream.feed(chunk))
+                    logger.info(f"Processed {n_rows} rows...")
+        except Exception as e:
+            logger.error(f"Failed to load data: {e}")
+            return
+        data_loader.report_projection(columns, n_rows)
+        alerts = pd.concat(alert_frames, ignore_index=True) if alert_frames else pd.DataFrame()
+    else:
+        alerts = engine.run(df)
+
+    if start and not alerts.empty:
+        # 丢弃窗口回看区间内产生的告警
+        alerts = alerts[alerts['timestamp'] >= pd.Timestamp(start)].reset_index(drop=True)
 
     if not alerts.empty:
         logger.warning(f"Generated {len(alerts)} alerts.")
@@ -84,48 +197,299 @@ def run(config, input, sql, output):
         logger.info("No alerts generated.")
 
 
+def build_synthesizer(cfg, data_loader, input=None, sql=None, start=None, end=None, memory_budget=None,
+                      fast_csv=False):
+    """读取训练基础数据 (CSV / 时间范围 / SQL)，返回拟合了统计量的 DataSynthesizer"""
+    if input:
+        synth = DataSynthesizer(load_input(cfg, data_loader, input, fast=fast_csv))
+    elif not sql and not memory_budget and start and end:
+        # 时间范围查询可走本地缓存
+        columns = data_loader.project_columns(cfg.get('model', {}).get('feature_columns'))
+        df = data_loader.load_range(start, end, columns)
+        data_loader.report_projection(columns, len(df))
+        synth = DataSynthesizer(df)
+    else:
+        columns = None
+        if not sql:
+            # 默认使用 SQL，只查询模型特征列
+            columns = data_loader.project_columns(cfg.get('model', {}).get('feature_columns'))
+            sql = build_query(columns=columns, start=start, end=end,
+                              limit=None if memory_budget or start or end else 1000)
+
+        if memory_budget:
+            # 分块模式: 只累积统计量，不保留原始数据
+            with closing(data_loader.iter_from_tsdb(sql, memory_budget_mb=memory_budget)) as chunks:
+                synth = DataSynthesizer.from_chunks(chunks)
+        else:
+            df = data_loader.load_from_tsdb(sql)
+            data_loader.report_projection(columns, len(df))
+            synth = DataSynthesizer(df)
+
+    logger.info(f"Loaded base statistics for {len(synth.columns)} columns")
+    return synth
+
+
 @cli.command()
 @click.option('--config', default='configs/config.yaml')
-@click.option('--input', default=None, help='Input CSV for training base')
+@click.option('--input', default=None, help='Input CSV, directory or glob for training base')
 @click.option('--sql', default=None, help='SQL query for TSDB')
-def train_model(config, input, sql):
+@click.option('--start', default=None, help='Start time for TSDB query (inclusive)')
+@click.option('--end', default=None, help='End time for TSDB query (exclusive)')
+@click.option('--memory-budget', default=None, type=int, help='Stream TSDB data in chunks within this memory budget (MB)')
+@click.option('--no-cache', is_flag=True, help='Bypass the local TSDB partition cache')
+@click.option('--fast-csv', is_flag=True, help='Use the chunked fast path for large CSV exports')
+@click.option('--compact', is_flag=True, help='Keep frames in compact form (float32, categorical tags)')
+@click.option('--algorithm', default='lgbm', type=click.Choice(['lgbm', 'rf', 'sgd', 'lr', 'knn', 'mlp']), help='Model algorithm')
+@click.option('--incremental', is_flag=True, help='Train chunk by chunk on real data with checkpoints (out-of-core)')
+@click.option('--checkpoint', default=None, help='Checkpoint file (default: model.checkpoint_path or <model>.ckpt)')
+@click.option('--resume', is_flag=True, help='Continue from the checkpoint, skipping data already trained on')
+@click.option('--period', default='1D', help='Segment length of --start/--end in incremental mode')
+@click.option('--chunk-rows', default=200_000, help='Rows per CSV chunk in incremental mode')
+def train_model(config, input, sql, start, end, memory_budget, no_cache, fast_csv, compact, algorithm, incremental,
+                checkpoint, resume, period, chunk_rows):
     """Train a model (Demo)"""
     cfg = load_yaml(config)
 
     # 加载数据
-    mapping_loader = MappingLoader(
-        cfg['data']['mapping_path'],
-        encoding=cfg['data'].get('mapping_encoding', 'utf-8')
-    )
-    data_loader = DataLoader(mapping_loader)
+    data_loader = build_data_loader(cfg, use_cache=not no_cache, compact=compact)
+    # 位域列本身是模型特征，不打包
+    data_loader.keep_bits = None
 
-    try:
-        if input:
-            df = data_loader.load_csv(input)
-        else:
-            # 默认使用 SQL
-            query = sql if sql else "SELECT * FROM station_data.stable_gtjjlfgdzf LIMIT 1000"
-            df = data_loader.load_from_tsdb(query)
+    if incremental:
+        train_incremental(cfg, data_loader, algorithm, input, sql, start, end, memory_budget, checkpoint, resume,
+                          period, chunk_rows)
+        return
 
-        logger.info(f"Loaded base data shape: {df.shape}")
+    try:
+        synth = build_synthesizer(cfg, data_loader, input, sql, start, end, memory_budget, fast_csv)
     except Exception as e:
         logger.error(f"Failed to load data: {e}")
         return
 
     # 合成数据
-    synth = DataSynthesizer(df)
     X_train, y_train = synth.generate(n_samples=2000, anomaly_ratio=0.1)
 
     # 训练
     model_path = cfg.get('model', {}).get('model_path', 'out/model.pkl')
     logger.info(f"Training LightGBM/RF model...")
 
-    model = GenericModel(algorithm='lgbm')  # 或 'rf'
+    model = GenericModel(algorithm=algorithm)
     model.train(X_train, y_train)
 
     model.save(model_path)
     logger.info(f"Model saved to {model_path}")
 
 
+def train_incremental(cfg, data_loader, algorithm, input, sql, start, end, memory_budget, checkpoint, resume,
+                      period, chunk_rows):
+    """分段、分块读取真实数据并增量训练，每块之后写检查点"""
+    model_cfg = cfg.get('model', {})
+    model_path = model_cfg.get('model_path', 'out/model.pkl')
+    checkpoint = checkpoint or model_cfg.get('checkpoint_path') or f'{model_path}.ckpt'
+    budget = memory_budget or 256
+
+    if input:
+        paths = resolve_inputs(input, cfg['data'].get('input_pattern', '*.csv'))
+        segments = [(path, lambda path=path: data_loader.iter_csv(path, chunk_rows)) for path in paths]
+    elif sql:
+        segments = [(sql, lambda: data_loader.iter_from_tsdb(sql, memory_budget_mb=budget))]
+    elif start and end:
+        # 按时间段查询，检查点以段为边界，恢复时从未完成的段开始
+        columns = data_loader.project_columns(model_cfg.get('feature_columns'))
+        segments = [(seg_start.isoformat(),
+                     lambda seg_start=seg_start, seg_end=seg_end: data_loader.iter_from_tsdb(
+                         build_query(columns=columns, start=seg_start, end=seg_end, order_by='ts'),
+                         memory_budget_mb=budget))
+                    for seg_start, seg_end in time_periods(start, end, period)]
+    else:
+        logger.error("Incremental training needs --input, --sql or --start/--end")
+        return
+
+    trainer = IncrementalTrainer(GenericModel(algorithm=algorithm), checkpoint,
+                                 anomaly_ratio=model_cfg.get('anomaly_ratio', 0.1))
+    if resume and not trainer.resume():
+        logger.info(f"No checkpoint at {checkpoint}, starting from scratch")
+
+    try:
+        model = trainer.fit(segments)
+    except Exception as e:
+        logger.error(f"Incremental training failed (progress kept in {checkpoint}): {e}")
+        return
+    if not trainer.state['chunks']:
+        logger.warning("No data was trained on, model not saved")
+        return
+    model.save(model_path)
+    logger.info(f"Model trained on {trainer.state['rows']} rows in {trainer.state['chunks']} chunks, "
+                f"saved to {model_path}")
+
+
+@cli.command()
+@click.option('--config', default='configs/config.yaml')
+@click.option('--model', 'model_path', default=None, help='Model file (default: model.model_path)')
+@click.option('--input', default=None, help='Input CSV, directory or glob (read in chunks)')
+@click.option('--sql', default=None, help='SQL query for TSDB')
+@click.option('--start', default=None, help='Start time for TSDB query (inclusive)')
+@click.option('--end', default=None, help='End time for TSDB query (exclusive)')
+@click.option('--devices', default=None, help='Comma-separated equ_code list')
+@click.option('--memory-budget', default=256, help='Memory budget per TSDB chunk (MB)')
+@click.option('--chunk-rows', default=1_000_000, help='Rows per CSV chunk')
+@click.option('--batch-rows', default=50_000, help='Rows per predict_proba call')
+@click.option('--workers', default=4, help='Parallel predict_proba calls')
+@click.option('--processes', is_flag=True, help='Score in worker processes instead of threads')
+@click.option('--threshold', default=0.5, help='Score at or above which a row is flagged')
+@click.option('--output', default=None, help='Output CSV file (default: model.scores_path)')
+def predict(config, model_path, input, sql, start, end, devices, memory_budget, chunk_rows, batch_rows, workers,
+            processes, threshold, output):
+    """Score TSDB or CSV data with a trained model, chunk by chunk"""
+    cfg = load_yaml(config)
+    model_cfg = cfg.get('model', {})
+    model_path = model_path or model_cfg.get('model_path', 'out/model.pkl')
+    out_path = output or model_cfg.get('scores_path', 'out/scores.csv')
+
+    data_loader = build_data_loader(cfg)
+    # 位域列本身是模型特征，不打包
+    data_loader.keep_bits = None
+
+    try:
+        scorer = BatchScorer(model_path, model_cfg.get('feature_columns'), workers, batch_rows, processes)
+    except Exception as e:
+        logger.error(f"Failed to load model: {e}")
+        return
+
+    with scorer:
+        logger.info(f"Scoring with {len(scorer.features)} features from {model_path}")
+        if input:
+            paths = resolve_inputs(input, cfg['data'].get('input_pattern', '*.csv'))
+            chunks = (chunk for path in paths for chunk in data_loader.iter_csv(path, chunk_rows))
+        else:
+            if not sql:
+                # 只查询模型特征列，按时间顺序分块读取
+                columns = data_loader.project_columns(scorer.features)
+                where = None
+                if devices:
+                    where = "equ_code IN (" + ', '.join(f"'{d}'" for d in devices.split(',')) + ")"
+                sql = build_query(columns=columns, start=start, end=end, where=where, order_by='ts')
+            chunks = data_loader.iter_from_tsdb(sql, memory_budget_mb=memory_budget)
+        try:
+            with closing(chunks):
+                write_scores(chunks, scorer, out_path, threshold)
+        except Exception as e:
+            logger.error(f"Scoring failed: {e}")
+
+
+@cli.command('compare-models')
+@click.option('--config', default='configs/config.yaml')
+@click.option('--input', default=None, help='Input CSV, directory or glob for training base')
+@click.option('--sql', default=None, help='SQL query for TSDB')
+@click.option('--start', default=None, help='Start time for TSDB query (inclusive)')
+@click.option('--end', default=None, help='End time for TSDB query (exclusive)')
+@click.option('--memory-budget', default=None, type=int, help='Stream TSDB data in chunks within this memory budget (MB)')
+@click.option('--fast-csv', is_flag=True, help='Use the chunked fast path for large CSV exports')
+@click.option('--samples', default=20000, help='Synthetic samples (70% train / 30% test)')
+@click.option('--anomaly-ratio', default=0.1, help='Share of fault samples')
+@click.option('--workers', default=None, type=int, help='Worker processes (default: CPU count)')
+@click.option('--output', default=None, help='Results table CSV (default: model.comparison_path)')
+def compare_models_cmd(config, input, sql, start, end, memory_budget, fast_csv, samples, anomaly_ratio, workers,
+                       output):
+    """Train candidate algorithms in parallel and compare accuracy and cost"""
+    cfg = load_yaml(config)
+    model_cfg = cfg.get('model', {})
+    data_loader = build_data_loader(cfg)
+    data_loader.keep_bits = None
+
+    try:
+        synth = build_synthesizer(cfg, data_loader, input, sql, start, end, memory_budget, fast_csv)
+    except Exception as e:
+        logger.error(f"Failed to load data: {e}")
+        return
+
+    X, y = synth.generate(samples, anomaly_ratio, n_fault_types=4, seed=0)
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.3, stratify=y, random_state=42)
+
+    candidates = model_cfg.get('candidates') or DEFAULT_CANDIDATES
+    table, _ = compare_models(X_train, y_train, X_test, y_test, candidates, workers)
+
+    out_path = output or model_cfg.get('comparison_path', 'out/model_comparison.csv')
+    os.makedirs(os.path.dirname(out_path) or '.', exist_ok=True)
+    table.to_csv(out_path, index=False)
+    logger.info(f"Comparison table saved to {out_path}")
+    with pd.option_context('display.width', 200, 'display.max_columns', None):
+        print(table.drop(columns=['params']).round(4).to_string(index=False))
+
+
+def append_alerts(alerts, out_path):
+    os.makedirs(os.path.dirname(out_path) or '.', exist_ok=True)
+    alerts.to_csv(out_path, mode='a', index=False, header=not os.path.exists(out_path))
+
+
+def poll_once(data_loader, stream, store, since, max_lag, warmup, columns=None):
+    """执行一次增量轮询，返回 (新数据行数, 新告警)"""
+    lower = store.lower_bound(max_lag)
+    if lower is None:
+        # 首次运行没有水位，从 NOW - since 开始
+        where = f"ts > NOW - {since}"
+    else:
+        # 重启后的首次轮询需要额外回看最大规则窗口，用于预热窗口尾部
+        start = lower - stream.max_window if warmup else lower
+        where = f"ts > '{format_ts(start)}'"
+
+    df = data_loader.load_from_tsdb(build_query(columns=columns, where=where, order_by='ts'))
+    history, new = store.split(df)
+    if warmup and not history.empty:
+        stream.prime(history)
+
+    alerts = stream.feed(new)
+    store.advance(new)
+    store.last_alert = stream.get_state()
+    store.save()
+    return len(new), alerts
+
+
+@cli.command()
+@click.option('--config', default='configs/config.yaml', help='Path to config file')
+@click.option('--state', default=None, help='Watermark state file')
+@click.option('--interval', default=60, help='Polling interval in seconds')
+@click.option('--since', default='10m', help='Initial look-back (TDengine duration) when no watermark exists')
+@click.option('--max-lag', default='1h', help='Devices lagging the newest watermark by more than this do not hold back polling')
+@click.option('--output', default=None, help='Output CSV file (alerts are appended)')
+@click.option('--once', is_flag=True, help='Poll once and exit (cron mode)')
+def watch(config, state, interval, since, max_lag, output, once):
+    """Poll TDengine incrementally and evaluate rules as new data arrives"""
+    cfg = load_yaml(config)
+    watch_cfg = cfg.get('watch', {})
+
+    data_loader = build_data_loader(cfg)
+    engine = RuleEngine(load_rules(cfg, config))
+    data_loader.keep_bits = engine.referenced_columns()
+    stream = engine.stream()
+
+    store = WatermarkStore(state or watch_cfg.get('state_path', 'out/watch_state.json'))
+    stream.set_state(store.last_alert)
+    out_path = output if output else cfg['output']['path']
+    max_lag = pd.to_timedelta(max_lag)
+    columns = data_loader.project_columns(engine.referenced_columns())
+
+    logger.info(f"Watching {TSDB_TABLE} every {interval}s, max rule window {stream.max_window}")
+    warmup = True
+    try:
+        while True:
+            try:
+                n_rows, alerts = poll_once(data_loader, stream, store, since, max_lag, warmup, columns)
+                warmup = False
+                if not alerts.empty:
+                    append_alerts(alerts, out_path)
+                    logger.warning(f"{len(alerts)} new alerts from {n_rows} new rows, appended to {out_path}")
+                else:
+                    logger.info(f"Processed {n_rows} new rows, no alerts.")
+            except Exception as e:
+                logger.error(f"Poll failed: {e}")
+
+            if once:
+                break
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        logger.info("Watch stopped.")
+
+
 if __name__ == '__main__':
     cli()
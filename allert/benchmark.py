@@ -0,0 +1,254 @@
+import os
+import tempfile
+import time
+
+import click
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+from allert.data_loader import DataLoader
+from allert.mapping_loader import MappingLoader
+from allert.model.synth import DataSynthesizer
+from allert.rule_engine import RuleEngine
+from allert.tsdb_fetch import ColumnarFetcher
+
+# 性能基准测试
+# 用法: python -m allert.benchmark <command>
+
+
+@click.group()
+def cli():
+    pass
+
+
+def _timeit(func, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def _make_frame(n_rows, n_cols, seed=0):
+    rng = np.random.default_rng(seed)
+    data = rng.random((n_rows, n_cols))
+    columns = [f'测点{i}' for i in range(n_cols)]
+    index = pd.date_range('2026-01-01', periods=n_rows, freq='1s', name='timestamp')
+    df = pd.DataFrame(data, columns=columns, index=index)
+    df['device_id'] = 'F01'
+    return df
+
+
+def _make_rules(n_rules, n_cols, seed=0):
+    # 模拟真实规则集: 少量阈值在多条规则之间复用，组合成不同的告警条件
+    rng = np.random.default_rng(seed)
+    thresholds = [0.1, 0.3, 0.5, 0.9]
+    rules = []
+    for i in range(n_rules):
+        a, b = rng.choice(n_cols, 2, replace=False)
+        ta, tb = rng.choice(thresholds, 2)
+        rules.append({
+            'name': f'rule_{i}',
+            'expr': f'测点{a} < {ta} and 测点{b} > {tb}',
+            'severity': 'warning',
+        })
+    return rules
+
+
+@cli.command()
+@click.option('--rows', default=86400, help='Rows per run (default: one day of 1s data)')
+@click.option('--cols', default=236, help='Number of numeric columns')
+@click.option('--rule-counts', default='10,50,100,200', help='Comma separated rule counts')
+def rule_plan(rows, cols, rule_counts):
+    """Compare per-rule df.eval with the compiled rule plan"""
+    df = _make_frame(rows, cols)
+    print(f"{'rules':>6} | {'nodes':>6} | {'df.eval (s)':>12} | {'plan (s)':>10} | {'speedup':>8}")
+    for n_rules in [int(c) for c in rule_counts.split(',')]:
+        rules = _make_rules(n_rules, cols)
+        logger.disable('allert')
+        engine = RuleEngine(rules)
+        logger.enable('allert')
+
+        t_eval = _timeit(lambda: [rule.evaluate_expr(df) for rule in engine.rules])
+        t_plan = _timeit(lambda: engine.evaluate_rules(df))
+        print(f"{n_rules:>6} | {len(engine.plan.nodes):>6} | {t_eval:>12.4f} | {t_plan:>10.4f} | {t_eval / t_plan:>7.1f}x")
+
+
+class _ListCursor:
+    """模拟 taosws 游标: 按 fetchmany 返回行元组"""
+
+    def __init__(self, rows, description):
+        self.rows = rows
+        self.description = description
+        self._pos = 0
+
+    def fetchall(self):
+        return self.rows
+
+    def fetchmany(self, size):
+        rows = self.rows[self._pos:self._pos + size]
+        self._pos += size
+        return rows
+
+
+@cli.command()
+@click.option('--shapes', default='5000x20,65536x20,200000x236', help='Comma separated ROWSxCOLS result shapes')
+def fetch(shapes):
+    """Compare fetchall + pd.DataFrame with the columnar block fetch"""
+    for shape in shapes.split(','):
+        rows, cols = (int(v) for v in shape.lower().split('x'))
+        rng = np.random.default_rng(0)
+        values = rng.random((rows, cols)).tolist()
+        ts = pd.date_range('2026-01-28', periods=rows, freq='1s').to_pydatetime().tolist()
+        data = [(t, *v, 'gtjjlfgdzf', f'F{i % 20:02d}') for i, (t, v) in enumerate(zip(ts, values))]
+        description = ([('ts', 'TIMESTAMP')] + [(f'c{i}', 'DOUBLE') for i in range(cols)]
+                       + [('station_code', 'NCHAR'), ('equ_code', 'NCHAR')])
+        fields = [d[0] for d in description]
+        repeat = 3 if rows * cols <= 5_000_000 else 1
+
+        result = [None, None]
+
+        def rows_frame():
+            result[1] = pd.DataFrame(_ListCursor(data, description).fetchall(), columns=fields)
+
+        t_rows = _timeit(rows_frame, repeat)
+
+        def columnar():
+            result[0] = ColumnarFetcher(_ListCursor(data, description)).fetch_frame()
+
+        t_col = _timeit(columnar, repeat)
+        print(f"{rows} x {cols}: fetchall + DataFrame {t_rows:.3f}s ({rows / t_rows:,.0f} rows/s), "
+              f"columnar {t_col:.3f}s ({rows / t_col:,.0f} rows/s, {t_rows / t_col:.2f}x), "
+              f"frame {result[1].memory_usage(deep=True).sum() / 1024 ** 2:.1f} MB -> "
+              f"{result[0].memory_usage(deep=True).sum() / 1024 ** 2:.1f} MB")
+
+
+def _write_export_csv(path, n_rows, n_cols, n_bits, n_devices=20, chunk_rows=1_000_000, seed=0):
+    """生成与场站导出格式一致的 CSV: PK, 测点列 (a, b, ...), bit"""
+    rng = np.random.default_rng(seed)
+    letters = [chr(ord('a') + i) for i in range(26)]
+    columns = (letters + [x + y for x in letters for y in letters])[:n_cols]
+    devices = np.array([f'F{i + 1:02d}' for i in range(n_devices)], dtype=object)
+    start = pd.Timestamp('2025-12-15')
+    for offset in range(0, n_rows, chunk_rows):
+        n = min(chunk_rows, n_rows - offset)
+        rows = offset + np.arange(n)
+        # 每秒 n_devices 行，只格式化不重复的时间
+        seconds = rows // n_devices
+        first = seconds[0]
+        ts_text = (start + pd.to_timedelta(np.arange(first, seconds[-1] + 1), unit='s')).strftime('%Y-%m-%d%H:%M:%S')
+        pk = devices[rows % n_devices] + '|' + ts_text.to_numpy(dtype=object)[seconds - first]
+        # 位域按字节矩阵拼接: 0|1|0|...
+        bit_bytes = np.full((n, 2 * n_bits - 1), ord('|'), dtype=np.uint8)
+        bit_bytes[:, ::2] = rng.integers(0, 2, (n, n_bits), dtype=np.uint8) + ord('0')
+        bits = bit_bytes.view(f'S{2 * n_bits - 1}').ravel().astype(str)
+        df = pd.DataFrame(rng.random((n, n_cols)) * 100, columns=columns)
+        df.insert(0, 'PK', pk)
+        df['bit'] = bits
+        df.to_csv(path, mode='a' if offset else 'w', header=offset == 0, index=False, float_format='%.3f')
+    return columns
+
+
+@cli.command()
+@click.option('--rows', default=10_000_000, help='Rows in the generated export file')
+@click.option('--cols', default=20, help='Number of measurement columns')
+@click.option('--bits', default=32, help='Number of status bits in the bit column')
+@click.option('--chunk-rows', default=1_000_000, help='Chunk size of the fast path')
+@click.option('--path', default=None, help='Reuse/keep the generated file at this path')
+@click.option('--skip-baseline', is_flag=True, help='Only time the fast path')
+def csv(rows, cols, bits, chunk_rows, path, skip_baseline):
+    """Compare DataLoader.load_csv with the fast chunked CSV path"""
+    keep = path is not None
+    path = path or os.path.join(tempfile.mkdtemp(), 'export.csv')
+    if not os.path.exists(path):
+        start = time.perf_counter()
+        columns = _write_export_csv(path, rows, cols, bits)
+        print(f"Generated {rows:,} rows in {time.perf_counter() - start:.1f}s: {path} "
+              f"({os.path.getsize(path) / 1024 ** 2:.0f} MB)")
+    else:
+        columns = [c for c in pd.read_csv(path, nrows=0).columns if c not in ('PK', 'bit')]
+
+    mapping = MappingLoader(os.path.join(os.path.dirname(path), 'no_mapping.json'))
+    mapping.column_map = {c: c for c in columns}
+    loader = DataLoader(mapping)
+
+    try:
+        if not skip_baseline:
+            start = time.perf_counter()
+            df = loader.load_csv(path)
+            t_base = time.perf_counter() - start
+            print(f"load_csv:            {t_base:.1f}s ({len(df) / t_base:,.0f} rows/s, "
+                  f"{df.memory_usage(deep=True).sum() / 1024 ** 2:.0f} MB)")
+            del df
+
+        start = time.perf_counter()
+        df = loader.load_csv(path, fast=True, chunk_rows=chunk_rows)
+        t_fast = time.perf_counter() - start
+        print(f"load_csv(fast=True): {t_fast:.1f}s ({len(df) / t_fast:,.0f} rows/s, "
+              f"{df.memory_usage(deep=True).sum() / 1024 ** 2:.0f} MB)")
+        if not skip_baseline:
+            print(f"speedup: {t_base / t_fast:.1f}x")
+    finally:
+        if not keep:
+            os.remove(path)
+
+
+def _synth_per_column(stats, n_samples, anomaly_ratio):
+    """原 DataSynthesizer.generate: 逐列独立正态分布"""
+    data = {}
+    n_anomalies = int(n_samples * anomaly_ratio)
+    for col in stats.index:
+        mean, std = stats.loc[col, 'mean'], stats.loc[col, 'std']
+        vals = np.random.normal(loc=mean, scale=std, size=n_samples)
+        if np.random.random() > 0.5:
+            vals[:n_anomalies] += (1 if np.random.random() > 0.5 else -1) * 3 * std
+        data[col] = vals
+    return pd.DataFrame(data)
+
+
+@cli.command()
+@click.option('--rows', default=1_000_000, help='Samples to synthesize')
+@click.option('--cols', default=236, help='Number of numeric columns')
+@click.option('--chunk-rows', default=100_000, help='Chunk size of the memmap writer')
+@click.option('--autocorr', default=0.9, help='AR(1) coefficient of the memmap run')
+def synth(rows, cols, chunk_rows, autocorr):
+    """Compare the per-column synthesizer with the vectorized/memmap generator"""
+    # 相关的基础数据: 少量潜在因子 + 噪声
+    rng = np.random.default_rng(0)
+    base = rng.standard_normal((20000, 8)) @ rng.standard_normal((8, cols)) + rng.standard_normal((20000, cols))
+    synthesizer = DataSynthesizer(pd.DataFrame(base * 10 + 50, columns=[f'测点{i}' for i in range(cols)]))
+    target = np.corrcoef(base, rowvar=False)
+    off_diag = ~np.eye(cols, dtype=bool)
+
+    start = time.perf_counter()
+    df = _synth_per_column(synthesizer.stats, rows, 0.1)
+    t_loop = time.perf_counter() - start
+    err_loop = np.abs(np.corrcoef(df.to_numpy()[int(rows * 0.1):][:100000], rowvar=False) - target)[off_diag].mean()
+    del df
+    print(f"per-column loop:  {t_loop:.2f}s ({rows / t_loop:,.0f} rows/s), corr error {err_loop:.3f}")
+
+    start = time.perf_counter()
+    df, labels = synthesizer.generate(rows, 0.1, seed=0)
+    t_vec = time.perf_counter() - start
+    err_vec = np.abs(np.corrcoef(df.to_numpy()[labels == 0][:100000], rowvar=False) - target)[off_diag].mean()
+    del df
+    print(f"vectorized:       {t_vec:.2f}s ({rows / t_vec:,.0f} rows/s), corr error {err_vec:.3f}")
+
+    path = os.path.join(tempfile.mkdtemp(), 'synth.npy')
+    try:
+        start = time.perf_counter()
+        values, labels = synthesizer.generate_to_memmap(path, rows, 0.1, chunk_rows=chunk_rows, autocorr=autocorr,
+                                                        fault_length=60, n_fault_types=4, ramp=10, seed=0)
+        t_mm = time.perf_counter() - start
+        print(f"memmap (AR {autocorr}): {t_mm:.2f}s ({rows / t_mm:,.0f} rows/s, "
+              f"{os.path.getsize(path) / 1024 ** 2:.0f} MB on disk)")
+        del values, labels
+    finally:
+        os.remove(path)
+        os.remove(f'{path}.labels.npy')
+
+
+if __name__ == '__main__':
+    cli()
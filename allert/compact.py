@@ -0,0 +1,107 @@
+import re
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+from .mapping_artifact import column_dtype
+
+# 紧凑内存模式
+#   测点列: 点表 type 为 float 且 factor 为 1 的测点来自 32 位浮点寄存器，存为 float32 不损失精度；
+#           带缩放系数的列、int 类型 (电量累计等) 与没有元数据的列保持 float64
+#   标签列: device_id / station_code 转为 category
+#   位域列: bit_k 打包进 uint64 列 bits_{k // 64} 的第 k % 64 位，
+#           规则需要的位可以保留展开，或用 unpack_bits 还原
+
+TAG_COLUMNS = ('device_id', 'station_code', 'equ_code')
+PACK_WIDTH = 64
+
+_BIT_COLUMN = re.compile(r'^bit_(\d+)$')
+
+
+def memory_mb(df):
+    return df.memory_usage(deep=True).sum() / 1024 ** 2
+
+
+def bit_columns(df):
+    """{位号: 列名}，按位号排序"""
+    found = [(int(m.group(1)), name) for name in df.columns if (m := _BIT_COLUMN.match(str(name)))]
+    return dict(sorted(found))
+
+
+def pack_bits(df, keep=()):
+    """把 0/1 位域列打包为 uint64 列: bit_k 存入 bits_{k // 64} 的第 k % 64 位
+
+    keep 中的列打包后仍保留展开的副本；取值不全为 0/1 时不打包。
+    """
+    columns = bit_columns(df)
+    if not columns:
+        return df
+    matrix = df[list(columns.values())].to_numpy()
+    if not np.isin(matrix, (0, 1)).all():
+        logger.warning("Bit columns contain values other than 0/1, left unpacked.")
+        return df
+
+    matrix = matrix.astype(np.uint64)
+    numbers = np.array(list(columns), dtype=np.uint64)
+    words = {}
+    for word in np.unique(numbers // PACK_WIDTH):
+        sel = numbers // PACK_WIDTH == word
+        name = f'bits_{word}'
+        value = (matrix[:, sel] << (numbers[sel] % PACK_WIDTH)).sum(axis=1, dtype=np.uint64)
+        if name in df.columns:
+            # 已经打包过: 合并新展开的位
+            value |= df[name].to_numpy(dtype=np.uint64)
+        words[name] = value
+
+    drop = [name for name in columns.values() if name not in keep] + [name for name in words if name in df.columns]
+    return pd.concat([df.drop(columns=drop), pd.DataFrame(words, index=df.index)], axis=1)
+
+
+def unpack_bits(df, names):
+    """从 bits_w 列还原指定的 bit_k 列 (uint8)，已存在或无法还原的列跳过"""
+    columns = {}
+    for name in names:
+        m = _BIT_COLUMN.match(str(name))
+        if not m or name in df.columns:
+            continue
+        number = int(m.group(1))
+        word = f'bits_{number // PACK_WIDTH}'
+        if word in df.columns:
+            shift = np.uint64(number % PACK_WIDTH)
+            columns[name] = ((df[word].to_numpy(dtype=np.uint64) >> shift) & np.uint64(1)).astype(np.uint8)
+    if not columns:
+        return df
+    return pd.concat([df, pd.DataFrame(columns, index=df.index)], axis=1)
+
+
+def _float32_safe(meta):
+    # 按 type 与 factor 重新判断，不依赖旧版本产物中缓存的 dtype
+    if not meta:
+        return False
+    return column_dtype(meta.get('type'), meta.get('factor', 1.0)) == 'float32'
+
+
+def compact_frame(df, mapping_loader, keep_bits=(), report=True):
+    """按点表元数据压缩 DataFrame，可重复调用"""
+    if df.empty:
+        return df
+    before = memory_mb(df) if report else 0.0
+
+    downcast = [name for name in df.columns
+                if df[name].dtype == np.float64 and _float32_safe(mapping_loader.get_meta(name))]
+    if downcast:
+        df = df.astype({name: np.float32 for name in downcast})
+
+    for name in TAG_COLUMNS:
+        if name in df.columns and not isinstance(df[name].dtype, pd.CategoricalDtype):
+            df[name] = df[name].astype('category')
+
+    if keep_bits is not None:
+        df = pack_bits(df, keep_bits)
+
+    if report:
+        after = memory_mb(df)
+        logger.info(f"Compact mode: {before:.1f} MB -> {after:.1f} MB "
+                    f"({before / after if after else 0:.1f}x, {len(downcast)} columns as float32)")
+    return df
@@ -0,0 +1,213 @@
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+# 场站导出 CSV 的快速解析
+#   PK  : 设备ID|YYYY-MM-DDHH:MM:SS，时间部分固定 18 字节，按字节矩阵定宽切片解析
+#   bit : 0|1|0|...，每位 1 字节，奇数位置为分隔符，直接解码为 uint8 矩阵
+# 无法按定宽解析的行回退到 pandas 的通用解析，结果与 DataLoader.load_csv 一致。
+
+DEFAULT_CHUNK_ROWS = 1_000_000
+
+PK_TS_WIDTH = 18
+_PK_TS_LAYOUT = {4: b'-', 7: b'-', 12: b':', 15: b':'}
+
+
+def _byte_matrix(values):
+    """等长 bytes 数组 -> (n, width) 的 uint8 矩阵 (不足 itemsize 的部分补 0)"""
+    return values.view(np.uint8).reshape(len(values), values.dtype.itemsize)
+
+
+def _digits(matrix, cols):
+    out = np.zeros(len(matrix), dtype=np.int64)
+    for c in cols:
+        out = out * 10 + matrix[:, c]
+    return out
+
+
+def _parse_ts_fixed(matrix):
+    """(n, 18) 字节矩阵 -> (datetime64[ns] 数组, 是否有效)"""
+    digit_cols = [c for c in range(PK_TS_WIDTH) if c not in _PK_TS_LAYOUT]
+    digits = matrix[:, digit_cols] - np.uint8(48)
+    valid = (digits <= 9).all(axis=1)
+    for c, sep in _PK_TS_LAYOUT.items():
+        valid &= matrix[:, c] == ord(sep)
+    digits = np.where(valid[:, None], digits, 0).astype(np.int64)
+
+    # digits 列顺序: YYYY MM DD hh mm ss
+    year = _digits(digits, [0, 1, 2, 3])
+    month = _digits(digits, [4, 5])
+    day = _digits(digits, [6, 7])
+    hour = _digits(digits, [8, 9])
+    minute = _digits(digits, [10, 11])
+    second = _digits(digits, [12, 13])
+
+    valid &= (month >= 1) & (month <= 12) & (hour < 24) & (minute < 60) & (second < 60)
+    months = np.where(valid, (year - 1970) * 12 + month - 1, 0)
+    month_start = months.astype('datetime64[M]').astype('datetime64[D]').astype(np.int64)
+    month_len = (months + 1).astype('datetime64[M]').astype('datetime64[D]').astype(np.int64) - month_start
+    valid &= (day >= 1) & (day <= month_len)
+
+    seconds = (month_start + day - 1) * 86400 + hour * 3600 + minute * 60 + second
+    ts = (seconds * 1_000_000_000).astype('datetime64[ns]')
+    ts[~valid] = np.datetime64('NaT')
+    return ts, valid
+
+
+def _to_bytes(values):
+    try:
+        return np.asarray(values, dtype=object).astype('S')
+    except (UnicodeEncodeError, TypeError, ValueError):
+        # 含非 ASCII 字符或空值
+        return None
+
+
+def parse_pk(pk):
+    """PK 列 -> (device_id 数组, timestamp 数组)
+
+    PK 按 '设备ID|' + 18 字节时间 定宽切片；按长度分组处理，
+    时间部分格式不符的行回退到 pd.to_datetime。
+    """
+    pk = pd.Series(pk).reset_index(drop=True)
+    raw = _to_bytes(pk.to_numpy(dtype=object))
+    if raw is None:
+        return None
+
+    lengths = np.char.str_len(raw)
+    device = np.empty(len(raw), dtype=object)
+    ts = np.full(len(raw), np.datetime64('NaT'), dtype='datetime64[ns]')
+    valid = np.zeros(len(raw), dtype=bool)
+
+    for length in np.unique(lengths):
+        idx = np.flatnonzero(lengths == length)
+        matrix = _byte_matrix(raw[idx])
+        dev_width = length - PK_TS_WIDTH - 1
+        if dev_width < 0:
+            continue
+        ok = matrix[:, dev_width] == ord('|')
+        ts_part, ts_ok = _parse_ts_fixed(matrix[:, dev_width + 1:length])
+        ts[idx] = ts_part
+        valid[idx] = ok & ts_ok
+
+        # 设备数很少: 先按字节去重，再解码
+        dev_bytes = np.ascontiguousarray(matrix[:, :dev_width]).view(f'S{max(dev_width, 1)}').ravel()
+        if dev_width == 0:
+            dev_bytes = np.full(len(idx), b'', dtype='S1')
+        codes, uniques = pd.factorize(dev_bytes)
+        device[idx] = np.array([u.decode() for u in uniques], dtype=object)[codes]
+
+    bad = np.flatnonzero(~valid)
+    if len(bad):
+        # 与原实现一致: 先按第一个 '|' 切分，再尝试通用格式
+        split_pk = pk.iloc[bad].str.split('|', n=1, expand=True)
+        if split_pk.shape[1] == 2:
+            device[bad] = split_pk[0].to_numpy(dtype=object)
+            raw_time = split_pk[1]
+            parsed = pd.to_datetime(raw_time, format='%Y-%m-%d%H:%M:%S', errors='coerce')
+            mask_nat = parsed.isna()
+            if mask_nat.any():
+                parsed[mask_nat] = pd.to_datetime(raw_time[mask_nat], errors='coerce')
+            ts[bad] = parsed.to_numpy(dtype='datetime64[ns]')
+        else:
+            device[bad] = pk.iloc[bad].to_numpy(dtype=object)
+    return device, ts
+
+
+def decode_bits(bits):
+    """'0|1|0|...' 列 -> (n, k) uint8 矩阵；长度不一致或含非 0-9 单字符时返回 None"""
+    raw = _to_bytes(bits)
+    if raw is None or len(raw) == 0:
+        return None
+    lengths = np.char.str_len(raw)
+    width = int(lengths[0])
+    if width % 2 == 0 or (lengths != width).any():
+        return None
+    matrix = _byte_matrix(raw)[:, :width]
+    digits = matrix[:, ::2] - np.uint8(48)
+    if (matrix[:, 1::2] != ord('|')).any() or (digits > 9).any():
+        return None
+    return np.ascontiguousarray(digits)
+
+
+def expand_bits_slow(bits):
+    """通用位域展开 (与 DataLoader.load_csv 相同)"""
+    bit_df = bits.str.split('|', expand=True)
+    bit_df.columns = [f'bit_{i}' for i in range(bit_df.shape[1])]
+    return bit_df.apply(pd.to_numeric, errors='coerce').fillna(0)
+
+
+def detect_encoding(file_path, sample_bytes=1 << 20):
+    """按文件开头判断 UTF-8 / GBK"""
+    with open(file_path, 'rb') as f:
+        head = f.read(sample_bytes)
+    try:
+        # 截断处可能落在多字节字符中间
+        head.decode('utf-8')
+        return 'utf-8'
+    except UnicodeDecodeError as e:
+        if e.start >= len(head) - 3:
+            return 'utf-8'
+        return 'gbk'
+
+
+def column_dtypes(columns, mapping_loader):
+    """按映射表预先确定列类型: PK/bit 为字符串，已映射的测点列为 float64"""
+    dtypes = {}
+    for name in columns:
+        if name in ('PK', 'bit'):
+            dtypes[name] = object
+        elif name in mapping_loader.column_map:
+            dtypes[name] = np.float64
+    return dtypes
+
+
+def transform_chunk(df):
+    """解析一块原始数据的 PK 与 bit 列 (不做映射，不排序)"""
+    if 'PK' in df.columns:
+        parsed = parse_pk(df['PK'])
+        if parsed is not None:
+            device, ts = parsed
+            # 一次性拼接，避免在数百列的块上逐列插入
+            parsed_df = pd.DataFrame({'device_id': device, 'timestamp': ts}, index=df.index)
+            df = pd.concat([df.drop(columns=['PK']), parsed_df], axis=1)
+        else:
+            logger.debug("PK is not ASCII, falling back to generic parsing for this chunk")
+            split_pk = df['PK'].str.split('|', n=1, expand=True)
+            if split_pk.shape[1] == 2:
+                df['device_id'] = split_pk[0]
+                raw_time = split_pk[1]
+                df['timestamp'] = pd.to_datetime(raw_time, format='%Y-%m-%d%H:%M:%S', errors='coerce')
+                mask_nat = df['timestamp'].isna()
+                if mask_nat.any():
+                    df.loc[mask_nat, 'timestamp'] = pd.to_datetime(raw_time[mask_nat], errors='coerce')
+            df.drop(columns=['PK'], inplace=True)
+
+    if 'bit' in df.columns and pd.api.types.is_string_dtype(df['bit']):
+        matrix = decode_bits(df['bit'].to_numpy(dtype=object))
+        if matrix is not None:
+            bit_df = pd.DataFrame(matrix, columns=[f'bit_{i}' for i in range(matrix.shape[1])], index=df.index)
+        else:
+            bit_df = expand_bits_slow(df['bit'])
+        df = pd.concat([df.drop(columns=['bit']), bit_df], axis=1)
+    return df
+
+
+def iter_csv_chunks(file_path, mapping_loader, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """分块读取导出 CSV，逐块产出已解析 PK/bit 的原始 DataFrame"""
+    encoding = detect_encoding(file_path)
+    header = pd.read_csv(file_path, encoding=encoding, nrows=0).columns
+    dtypes = column_dtypes(header, mapping_loader)
+    try:
+        reader = pd.read_csv(file_path, encoding=encoding, dtype=dtypes, chunksize=chunk_rows)
+        first = next(reader, None)
+    except ValueError as e:
+        # 测点列中存在非数值内容，回退到类型推断
+        logger.warning(f"Predefined dtypes rejected ({e}), falling back to inference")
+        reader = pd.read_csv(file_path, encoding=encoding, dtype={k: v for k, v in dtypes.items() if v is object},
+                             chunksize=chunk_rows)
+        first = next(reader, None)
+    if first is None:
+        return
+    yield transform_chunk(first)
+    for chunk in reader:
+        yield transform_chunk(chunk)
@@ -0,0 +1,218 @@
+import hashlib
+import json
+import os
+
+import chardet
+import pandas as pd
+from loguru import logger
+
+# 编译后的映射表
+# 把映射文件 (column_mapping.json 或点表 CSV) 与点表元数据 (jjl.csv) 解析一次，
+# 保存为 <映射文件名>[.<变体>].compiled.json (纯数据，读取时不执行任何代码)，包含:
+#   forward : 原始列名 -> 中文名
+#   reverse : 中文名 -> 原始列名 (读取时由 forward 重建)
+#   columns : 原始列名 -> {'type', 'factor', 'dtype'}
+# 源文件的 mtime/大小 变化时重新校验内容哈希，哈希不同或读取编码改变时重新编译。
+# 不同的 (点表, 编码) 组合各自使用一个产物文件 (变体为其哈希)，例如 Plus 只读映射、CLI 带点表元数据，
+# 两者交替加载时不会互相判定过期、反复重新编译。
+
+ARTIFACT_VERSION = 3
+ARTIFACT_SUFFIX = '.compiled.json'
+
+
+def _read_csv(path, encoding):
+    try:
+        return pd.read_csv(path, encoding=encoding), encoding
+    except (UnicodeDecodeError, pd.errors.ParserError):
+        # 回退到自动检测编码
+        with open(path, 'rb') as f:
+            result = chardet.detect(f.read())
+        detected = result['encoding']
+        logger.warning(f"Decoding failed with {encoding}, switching to {detected}")
+        return pd.read_csv(path, encoding=detected), detected
+
+
+def read_mapping(path, encoding='utf-8'):
+    """解析映射文件，返回 {原始列名: 中文名}"""
+    if path.lower().endswith('.json'):
+        try:
+            with open(path, 'r', encoding=encoding) as f:
+                mapping = json.load(f)
+            logger.info(f"Loaded {len(mapping)} mapping entries from JSON.")
+            return mapping
+        except Exception as e:
+            logger.error(f"Failed to load JSON mapping: {e}")
+            return {}
+
+    df, _ = _read_csv(path, encoding)
+    # 检查列名。用户文件应包含 'index' 和 'chinese_name'
+    if 'index' not in df.columns or 'chinese_name' not in df.columns:
+        logger.error(f"Mapping file missing required columns 'index' or 'chinese_name'. Found: {df.columns}")
+        return {}
+    df = df.dropna(subset=['chinese_name'])
+    mapping = dict(zip(df['index'].astype(str).str.strip(), df['chinese_name'].astype(str).str.strip()))
+    logger.info(f"Loaded {len(mapping)} mapping entries.")
+    return mapping
+
+
+def column_dtype(type_name, factor=1.0):
+    """点表 type 为 float 且 factor 为 1 的测点来自 32 位浮点寄存器，可以无损存为 float32；其余保持 float64
+
+    factor 不为 1 时入库值为 寄存器值 * factor (如 0.1)，一般不能用 float32 精确表示。
+    """
+    return 'float32' if type_name == 'float' and factor == 1.0 else 'float64'
+
+
+def read_meta(path, encoding='utf-8'):
+    """读取点表 (如 jjl.csv) 中的 type/factor，按小写 index 返回 {原始列名: 元数据}"""
+    df, _ = _read_csv(path, encoding)
+    if 'index' not in df.columns or 'type' not in df.columns:
+        logger.error(f"Point table missing required columns 'index' or 'type'. Found: {df.columns}")
+        return {}
+    df = df.dropna(subset=['index'])
+    # 点表按风机重复，同一 index 取第一条
+    df = df.assign(index=df['index'].astype(str).str.strip().str.lower()).drop_duplicates('index')
+    factors = df['factor'] if 'factor' in df.columns else pd.Series(1, index=df.index)
+    meta = {}
+    for index, type_name, factor in zip(df['index'], df['type'], factors):
+        type_name = str(type_name).strip().lower()
+        factor = float(factor) if pd.notna(factor) else 1.0
+        meta[index] = {'type': type_name, 'factor': factor, 'dtype': column_dtype(type_name, factor)}
+    logger.info(f"Loaded metadata for {len(meta)} columns from {path}")
+    return meta
+
+
+def _file_sha1(path):
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _encodings(encoding, meta_encoding):
+    return {'mapping': encoding, 'meta': meta_encoding or encoding}
+
+
+def _source_info(path):
+    stat = os.stat(path)
+    return {'mtime': stat.st_mtime, 'size': stat.st_size, 'sha1': _file_sha1(path)}
+
+
+def reverse_mapping(forward):
+    """中文名 -> 原始列名；多个原始列映射到同一中文名时保留第一个，返回 (反向映射, {中文名: [原始列名, ...]})"""
+    reverse, duplicates = {}, {}
+    for raw, name in forward.items():
+        if name in reverse:
+            duplicates.setdefault(name, [reverse[name]]).append(raw)
+        else:
+            reverse[name] = raw
+    return reverse, duplicates
+
+
+class CompiledMapping:
+    def __init__(self, forward, columns, sources=None, encodings=None, version=ARTIFACT_VERSION):
+        self.version = version
+        self.forward = forward
+        self.reverse, self.duplicates = reverse_mapping(forward)
+        self.columns = columns
+        self.sources = sources or {}
+        # 解析源文件时使用的编码，编码不同解析结果可能不同
+        self.encodings = encodings or {}
+
+    @classmethod
+    def build(cls, mapping_path, meta_path=None, encoding='utf-8', meta_encoding=None):
+        forward = read_mapping(mapping_path, encoding) if os.path.exists(mapping_path) else {}
+        columns = {}
+        if meta_path:
+            if os.path.exists(meta_path):
+                columns = read_meta(meta_path, meta_encoding or encoding)
+            else:
+                logger.warning(f"Point table not found at {meta_path}, column metadata unavailable.")
+        sources = {os.path.abspath(p): _source_info(p) for p in (mapping_path, meta_path) if p and os.path.exists(p)}
+        compiled = cls(forward, columns, sources, _encodings(encoding, meta_encoding))
+        for name, raws in compiled.duplicates.items():
+            logger.warning(f"Columns {raws} all map to '{name}', reverse lookup uses '{raws[0]}'")
+        return compiled
+
+    def to_dict(self):
+        return {'version': self.version, 'forward': self.forward, 'columns': self.columns,
+                'sources': self.sources, 'encodings': self.encodings}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['forward'], data['columns'], data.get('sources'), data.get('encodings'),
+                   data.get('version'))
+
+    def is_fresh(self, mapping_path, meta_path=None, encoding='utf-8', meta_encoding=None):
+        """源文件集合、内容与读取编码未变化时返回 True；只有 mtime 变化而内容相同时更新记录 (self.touched)"""
+        self.touched = False
+        if self.version != ARTIFACT_VERSION:
+            return False
+        if self.encodings != _encodings(encoding, meta_encoding):
+            return False
+        # 产物可以包含多于本次请求的源 (例如带点表元数据)，多出的元数据不影响使用
+        paths = {os.path.abspath(p) for p in (mapping_path, meta_path) if p and os.path.exists(p)}
+        if not paths <= set(self.sources):
+            return False
+        for path, info in self.sources.items():
+            if not os.path.exists(path):
+                return False
+            stat = os.stat(path)
+            if stat.st_mtime == info['mtime'] and stat.st_size == info['size']:
+                continue
+            if stat.st_size != info['size'] or _file_sha1(path) != info['sha1']:
+                return False
+            info['mtime'] = stat.st_mtime
+            self.touched = True
+        return True
+
+    def save(self, path):
+        # 先写临时文件再替换，避免并发启动时读到不完整的文件
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+
+def artifact_path(mapping_path, meta_path=None, encoding='utf-8', meta_encoding=None):
+    """产物文件路径；只有映射文件且为 UTF-8 时为 <映射文件名>.compiled.json"""
+    base = os.path.splitext(mapping_path)[0]
+    encodings = _encodings(encoding, meta_encoding)
+    if not meta_path and encodings == _encodings('utf-8', None):
+        return base + ARTIFACT_SUFFIX
+    variant = json.dumps([os.path.abspath(meta_path) if meta_path else None, encodings], sort_keys=True)
+    return f"{base}.{hashlib.sha1(variant.encode('utf-8')).hexdigest()[:8]}{ARTIFACT_SUFFIX}"
+
+
+def compile_mapping(mapping_path, meta_path=None, encoding='utf-8', meta_encoding=None, out_path=None):
+    """编译映射表并写入磁盘，返回 CompiledMapping。meta_encoding 默认与 encoding 相同"""
+    compiled = CompiledMapping.build(mapping_path, meta_path, encoding, meta_encoding)
+    out_path = out_path or artifact_path(mapping_path, meta_path, encoding, meta_encoding)
+    try:
+        compiled.save(out_path)
+        logger.info(f"Compiled mapping saved to {out_path}")
+    except OSError as e:
+        logger.warning(f"Failed to save compiled mapping to {out_path}: {e}")
+    return compiled
+
+
+def load_compiled_mapping(mapping_path, meta_path=None, encoding='utf-8', meta_encoding=None):
+    """读取编译后的映射表，源文件变化或不存在时重新编译"""
+    if not os.path.exists(mapping_path):
+        # 没有映射文件 (恒等映射) 时不生成产物
+        return CompiledMapping.build(mapping_path, meta_path, encoding, meta_encoding)
+
+    path = artifact_path(mapping_path, meta_path, encoding, meta_encoding)
+    if os.path.exists(path):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                compiled = CompiledMapping.from_dict(json.load(f))
+            if compiled.is_fresh(mapping_path, meta_path, encoding, meta_encoding):
+                if compiled.touched:
+                    compiled.save(path)
+                return compiled
+            logger.info(f"Mapping sources changed, recompiling {path}")
+        except Exception as e:
+            logger.warning(f"Failed to read compiled mapping {path}: {e}")
+    return compile_mapping(mapping_path, meta_path, encoding, meta_encoding, path)
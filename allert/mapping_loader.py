@@ -1,63 +1,60 @@
-import pandas as pd
 from loguru import logger
-import chardet
 import os
 
-import json
+from .mapping_artifact import load_compiled_mapping, read_mapping, read_meta
 
 class MappingLoader:
-    def __init__(self, mapping_path, encoding='utf-8'):
+    def __init__(self, mapping_path, encoding='utf-8', meta_path=None, meta_encoding=None):
         self.mapping_path = mapping_path
         self.encoding = encoding
-        self.column_map = {}
-        if os.path.exists(mapping_path):
-            self.load()
-        else:
+        self.meta_encoding = meta_encoding or encoding
+        # 编译后的映射表 (见 mapping_artifact)，源文件未变化时直接读取，不再解析/探测编码
+        compiled = load_compiled_mapping(mapping_path, meta_path, encoding, meta_encoding)
+        if not os.path.exists(mapping_path):
             logger.warning(f"Mapping file not found at {mapping_path}. Using identity mapping.")
+        self.column_map = compiled.forward
+        # 反向索引: 中文名 -> 原始列名
+        self.reverse_map = compiled.reverse
+        # 测点元数据: 原始列名 -> {'type': 'float'/'int', 'factor': 1.0, 'dtype': 'float32'/'float64'}
+        self.column_meta = compiled.columns
+        # 列集合 -> 重命名字典，同一数据源的各块只计算一次
+        self._rename_cache = {}
 
     def load(self):
-        # 如果是 json 文件
-        if self.mapping_path.lower().endswith('.json'):
-            try:
-                with open(self.mapping_path, 'r', encoding=self.encoding) as f:
-                    self.column_map = json.load(f)
-                logger.info(f"Loaded {len(self.column_map)} mapping entries from JSON.")
-                return
-            except Exception as e:
-                logger.error(f"Failed to load JSON mapping: {e}")
-                return
-
-        # 否则尝试作为 CSV 读取
-        try:
-            # 尝试使用指定的编码读取
-            df = pd.read_csv(self.mapping_path, encoding=self.encoding)
-        except (UnicodeDecodeError, pd.errors.ParserError):
-            # 回退到自动检测编码
-            with open(self.mapping_path, 'rb') as f:
-                raw_data = f.read()
-                result = chardet.detect(raw_data)
-            encoding = result['encoding']
-            logger.warning(f"Decoding failed with {self.encoding}, switching to {encoding}")
-            df = pd.read_csv(self.mapping_path, encoding=encoding)
-
-        # 清洗并构建映射表
-        # 检查列名。用户文件应包含 'index' 和 'chinese_name'
-        if 'index' in df.columns and 'chinese_name' in df.columns:
-            df['index'] = df['index'].astype(str).str.strip()
-            df['chinese_name'] = df['chinese_name'].astype(str).str.strip()
-            # 移除空名称
-            df = df.dropna(subset=['chinese_name'])
-            self.column_map = dict(zip(df['index'], df['chinese_name']))
-            logger.info(f"Loaded {len(self.column_map)} mapping entries.")
-        else:
-            logger.error(f"Mapping file missing required columns 'index' or 'chinese_name'. Found: {df.columns}")
+        """重新解析映射文件 (不经过编译产物)"""
+        self.column_map = read_mapping(self.mapping_path, self.encoding)
+        self.reverse_map = {v: k for k, v in self.column_map.items()}
+        self._rename_cache = {}
+
+    def load_meta(self, meta_path):
+        """重新读取点表元数据 (不经过编译产物)"""
+        self.column_meta = read_meta(meta_path, self.meta_encoding)
+
+    def get_meta(self, name):
+        """列名 (中文名或原始列名) 对应的测点元数据，没有时返回 None"""
+        raw = self.resolve_column(name)
+        return self.column_meta.get(raw) if raw else None
 
     def get_name(self, index_code):
         return self.column_map.get(index_code, index_code)
 
+    def resolve_column(self, name):
+        """规则/特征中的列名 -> TDengine 原始列名，无法确定时返回 None"""
+        if name == 'device_id':
+            return 'equ_code'
+        if name in self.reverse_map:
+            return self.reverse_map[name]
+        if name in self.column_map:
+            return name
+        return None
+
     def apply_mapping(self, df_data):
         # 重命名数据 DataFrame 中的列
         # 仅重命名存在于映射表中的列
-        rename_dict = {k: v for k, v in self.column_map.items() if k in df_data.columns}
+        key = tuple(df_data.columns)
+        rename_dict = self._rename_cache.get(key)
+        if rename_dict is None:
+            rename_dict = {k: self.column_map[k] for k in key if k in self.column_map}
+            self._rename_cache[key] = rename_dict
 
         return df_data.rename(columns=rename_dict)
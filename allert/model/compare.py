@@ -0,0 +1,176 @@
+import multiprocessing
+import os
+import pickle
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+from sklearn.metrics import accuracy_score, roc_auc_score
+
+from .sklearn_model import HAS_LGBM, GenericModel
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# 多算法对比
+# 训练/测试集写入临时目录的 .npy 文件，各进程以 memmap 读取，不在进程间传递大数组；
+# 每个候选在新启动 (spawn) 的独立进程中训练 (Python 3.11+ 每个进程只执行一个候选)，记录:
+#   fit_s          训练耗时
+#   ms_per_1k      在测试集上批量预测，折算为每 1000 行的耗时
+#   batch_1k_ms    单次预测 1000 行的延迟 (3 次取最小)
+#   peak_mem_mb    训练与预测期间进程峰值常驻内存相对读入数据后的增量
+#   model_mb       模型序列化后的大小
+#   auc / accuracy 测试集上的指标
+
+# 未安装 LightGBM 时 GenericModel('lgbm') 会退化为随机森林，对比中跳过该候选
+DEFAULT_CANDIDATES = [
+    {'name': 'lgbm', 'algorithm': 'lgbm', 'params': {}},
+    {'name': 'rf_100', 'algorithm': 'rf', 'params': {'n_estimators': 100, 'n_jobs': 1}},
+    {'name': 'rf_300', 'algorithm': 'rf', 'params': {'n_estimators': 300, 'n_jobs': 1}},
+    {'name': 'lr', 'algorithm': 'lr', 'params': {'max_iter': 1000}},
+    {'name': 'sgd', 'algorithm': 'sgd', 'params': {}},
+    {'name': 'knn_5', 'algorithm': 'knn', 'params': {'n_neighbors': 5}},
+    {'name': 'mlp', 'algorithm': 'mlp', 'params': {'hidden_layer_sizes': (100, 50), 'max_iter': 500,
+                                                   'random_state': 42}},
+]
+
+_ARRAYS = ('X_train', 'y_train', 'X_test', 'y_test')
+
+
+def _reset_peak_rss():
+    """Linux: 把进程峰值常驻内存 (VmHWM) 重置为当前值，返回是否成功"""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def _peak_rss_mb():
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    if resource is None:
+        return np.nan
+    # ru_maxrss 在 Linux 上单位为 KB，macOS 上为字节
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 ** 2 if sys.platform == 'darwin' else peak / 1024
+
+
+def _current_rss_mb():
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return _peak_rss_mb()
+
+
+def evaluate_candidate(spec, data_dir, columns):
+    """在工作进程中训练并评估一个候选，失败时在 error 中记录原因"""
+    row = {'name': spec['name'], 'algorithm': spec['algorithm'], 'params': str(spec.get('params', {}))}
+    try:
+        data = {name: np.load(os.path.join(data_dir, f'{name}.npy'), mmap_mode='r') for name in _ARRAYS}
+        X_train = pd.DataFrame(np.asarray(data['X_train']), columns=columns)
+        X_test = pd.DataFrame(np.asarray(data['X_test']), columns=columns)
+        y_train, y_test = np.asarray(data['y_train']), np.asarray(data['y_test'])
+        # 以读入数据后的内存为基准；无法重置峰值时 (非 Linux) 以当前峰值为基准
+        baseline = _current_rss_mb() if _reset_peak_rss() else _peak_rss_mb()
+
+        model = GenericModel(spec['algorithm'], **spec.get('params', {}))
+        start = time.perf_counter()
+        model.train(X_train, y_train)
+        row['fit_s'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        prob = model.predict_proba(X_test)[:, 1]
+        row['ms_per_1k'] = (time.perf_counter() - start) * 1000 / len(X_test) * 1000
+
+        batch = X_test.iloc[:1000]
+        latencies = []
+        for _ in range(3):
+            start = time.perf_counter()
+            model.predict_proba(batch)
+            latencies.append(time.perf_counter() - start)
+        row['batch_1k_ms'] = min(latencies) * 1000
+
+        row['peak_mem_mb'] = _peak_rss_mb() - baseline
+        row['model_mb'] = len(pickle.dumps(model.model, protocol=pickle.HIGHEST_PROTOCOL)) / 1024 ** 2
+        row['auc'] = roc_auc_score(y_test, prob) if len(np.unique(y_test)) > 1 else np.nan
+        row['accuracy'] = accuracy_score(y_test, prob >= 0.5)
+        row['error'] = ''
+        return row, prob
+    except Exception as e:
+        row['error'] = f'{type(e).__name__}: {e}'
+        return row, None
+
+
+def _executor(workers):
+    # spawn: fork 出的子进程会继承父进程的峰值内存记录
+    # 每个进程只执行一个候选，峰值内存不受前一个候选影响
+    context = multiprocessing.get_context('spawn')
+    if sys.version_info >= (3, 11):
+        return ProcessPoolExecutor(workers, mp_context=context, max_tasks_per_child=1)
+    logger.warning("Python < 3.11: worker processes are reused, peak_mem_mb is a running maximum")
+    return ProcessPoolExecutor(workers, mp_context=context)
+
+
+def compare_models(X_train, y_train, X_test, y_test, candidates=None, workers=None):
+    """并行训练、评估候选模型
+
+    返回 (结果表 DataFrame (按 auc 降序), {候选名: 测试集正类概率})。
+    """
+    candidates = candidates or DEFAULT_CANDIDATES
+    if not HAS_LGBM:
+        skipped = [spec['name'] for spec in candidates if spec['algorithm'] == 'lgbm']
+        if skipped:
+            logger.warning(f"LightGBM not installed, skipping candidates: {', '.join(skipped)}")
+            candidates = [spec for spec in candidates if spec['algorithm'] != 'lgbm']
+    if not candidates:
+        raise ValueError("No model candidates to compare")
+    columns = [str(c) for c in X_train.columns] if isinstance(X_train, pd.DataFrame) \
+        else [f'f{i}' for i in range(np.shape(X_train)[1])]
+    workers = min(workers or os.cpu_count() or 1, len(candidates))
+
+    data_dir = tempfile.mkdtemp(prefix='model_compare_')
+    rows, scores = [], {}
+    try:
+        for name, values in zip(_ARRAYS, (X_train, y_train, X_test, y_test)):
+            np.save(os.path.join(data_dir, f'{name}.npy'), np.asarray(values, dtype=np.float64))
+
+        logger.info(f"Comparing {len(candidates)} candidates on {len(X_train)} training rows "
+                    f"with {workers} worker processes")
+        start = time.perf_counter()
+        with _executor(workers) as pool:
+            futures = [pool.submit(evaluate_candidate, spec, data_dir, columns) for spec in candidates]
+            for future in as_completed(futures):
+                row, prob = future.result()
+                if row['error']:
+                    logger.error(f"Candidate {row['name']} failed: {row['error']}")
+                else:
+                    logger.info(f"Candidate {row['name']}: AUC {row['auc']:.4f}, fit {row['fit_s']:.2f}s, "
+                                f"{row['ms_per_1k']:.2f} ms/1k rows")
+                    scores[row['name']] = prob
+                rows.append(row)
+        logger.info(f"Model comparison finished in {time.perf_counter() - start:.1f}s")
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+    table = pd.DataFrame(rows)
+    if 'auc' in table.columns:
+        table = table.sort_values('auc', ascending=False, na_position='last')
+    return table.reset_index(drop=True), scores
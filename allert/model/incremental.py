@@ -0,0 +1,123 @@
+import json
+import os
+import time
+from contextlib import closing
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+from .synth import DataSynthesizer
+
+# 增量训练 (out-of-core)
+#   数据按块送入 GenericModel.partial_train，任何时刻内存中只有一块数据；
+#   块内没有标签列时，真实数据视为正常样本，并按 anomaly_ratio 补充以该块统计量合成的故障样本。
+#   每块训练后写检查点: 模型文件 + <检查点>.json (已完成的数据段、当前段内已训练的块数)，
+#   中断后 resume 从断点继续；对已有检查点追加新的时间段即可在新数据上继续训练。
+
+
+def time_periods(start, end, period='1D'):
+    """把 [start, end) 按 period 对齐切分为数据段 [(段起点, 段终点), ...]"""
+    start, end = pd.Timestamp(start), pd.Timestamp(end)
+    offset = pd.tseries.frequencies.to_offset(period)
+    edges = [start] + [t for t in pd.date_range(start.floor(offset), end, freq=offset) if start < t < end] + [end]
+    return list(zip(edges[:-1], edges[1:]))
+
+
+class IncrementalTrainer:
+    def __init__(self, model, checkpoint_path=None, features=None, anomaly_ratio=0.1, label_column='label',
+                 seed=None):
+        self.model = model
+        self.checkpoint_path = checkpoint_path
+        self.features = list(features) if features else None
+        self.anomaly_ratio = anomaly_ratio
+        self.label_column = label_column
+        self.rng = np.random.default_rng(seed)
+        self.state = {'done': [], 'current': None, 'skip': 0, 'chunks': 0, 'rows': 0}
+
+    @property
+    def state_path(self):
+        return f'{self.checkpoint_path}.json'
+
+    def resume(self):
+        """读取检查点 (模型与进度)，没有检查点时返回 False"""
+        if not self.checkpoint_path or not os.path.exists(self.checkpoint_path) \
+                or not os.path.exists(self.state_path):
+            return False
+        self.model.load(self.checkpoint_path)
+        with open(self.state_path, 'r', encoding='utf-8') as f:
+            self.state = json.load(f)
+        self.features = self.state.get('features') or self.features
+        logger.info(f"Resumed from {self.checkpoint_path}: {self.state['chunks']} chunks, "
+                    f"{self.state['rows']} rows, {len(self.state['done'])} segments done")
+        return True
+
+    def checkpoint(self):
+        if not self.checkpoint_path:
+            return
+        # 先写临时文件再替换，中断时保留上一个完整的检查点
+        tmp_path = f'{self.checkpoint_path}.tmp'
+        self.model.save(tmp_path)
+        os.replace(tmp_path, self.checkpoint_path)
+        with open(f'{self.state_path}.tmp', 'w', encoding='utf-8') as f:
+            json.dump(dict(self.state, features=self.features), f, ensure_ascii=False, default=str)
+        os.replace(f'{self.state_path}.tmp', self.state_path)
+
+    def _select_features(self, chunk):
+        if self.features:
+            missing = [c for c in self.features if c not in chunk.columns]
+            if missing:
+                logger.warning(f"{len(missing)} feature columns missing from chunk, filled with NaN")
+            return self.features
+        # 第一块决定特征: 数值列 (不含打包的位域字 bits_w 与标签列)
+        numeric = chunk.select_dtypes(include=[np.number]).columns
+        self.features = [c for c in numeric if c != self.label_column and not str(c).startswith('bits_')]
+        logger.info(f"Training on {len(self.features)} feature columns")
+        return self.features
+
+    def prepare(self, chunk):
+        """一块数据 -> (X, y)"""
+        features = self._select_features(chunk)
+        X = chunk.reindex(columns=features).astype(np.float64)
+        if self.label_column in chunk.columns:
+            return X.reset_index(drop=True), chunk[self.label_column].to_numpy(dtype=int)
+
+        n_faults = int(round(len(X) * self.anomaly_ratio / (1 - self.anomaly_ratio)))
+        if n_faults == 0:
+            return X.reset_index(drop=True), np.zeros(len(X), dtype=int)
+        # 故障样本以本块的均值/协方差为基础，每块的故障特征不同
+        faults, labels = DataSynthesizer(X).generate(n_faults, 1.0, seed=int(self.rng.integers(2 ** 31)))
+        X = pd.concat([X.reset_index(drop=True), faults[features]], ignore_index=True)
+        return X, np.concatenate([np.zeros(len(chunk), dtype=int), labels])
+
+    def update(self, chunk):
+        start = time.perf_counter()
+        X, y = self.prepare(chunk)
+        self.model.partial_train(X, y)
+        self.state['chunks'] += 1
+        self.state['rows'] += len(chunk)
+        logger.info(f"Trained chunk {self.state['chunks']}: {len(chunk)} rows (+{len(X) - len(chunk)} synthetic) "
+                    f"in {time.perf_counter() - start:.1f}s, {self.state['rows']} rows total")
+
+    def fit(self, segments):
+        """segments: [(段标识, 返回该段数据块迭代器的函数), ...]，已完成的段跳过"""
+        done = set(self.state['done'])
+        for key, make_chunks in segments:
+            key = str(key)
+            if key in done:
+                continue
+            skip = self.state['skip'] if self.state['current'] == key else 0
+            self.state['current'], self.state['skip'] = key, skip
+            with closing(make_chunks()) as chunks:
+                for i, chunk in enumerate(chunks):
+                    if i < skip or chunk.empty:
+                        continue
+                    self.update(chunk)
+                    self.state['skip'] = i + 1
+                    self.checkpoint()
+            self.state['done'].append(key)
+            done.add(key)
+            self.state['current'], self.state['skip'] = None, 0
+            self.checkpoint()
+            logger.info(f"Segment {key} done")
+        return self.model
@@ -0,0 +1,139 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+from .sklearn_model import GenericModel
+
+# 批量打分
+#   特征矩阵: 每块数据按特征顺序逐列写入复用的 float 缓冲区，再零拷贝包装为 DataFrame
+#   并发:     块内按 batch_rows 切分，线程池 (LightGBM/sklearn 预测时释放 GIL) 或
+#             进程池 (每个进程只加载一次模型) 并行调用 predict_proba
+#   输出:     每块打分后立即追加到 CSV，内存占用与总行数无关
+
+DEFAULT_BATCH_ROWS = 50_000
+
+_worker_model = None
+
+
+def _init_worker(model_path):
+    global _worker_model
+    _worker_model = GenericModel()
+    _worker_model.load(model_path)
+
+
+def _score_in_worker(frame):
+    return _worker_model.predict_proba(frame)[:, 1]
+
+
+class FeatureBuffer:
+    """按固定特征顺序构造特征矩阵，缓冲区在各块之间复用"""
+
+    def __init__(self, features, dtype=np.float64):
+        self.features = list(features)
+        self.dtype = dtype
+        self._buffer = np.empty((0, len(self.features)), dtype=dtype)
+        self._warned = set()
+
+    def build(self, df):
+        n = len(df)
+        if self._buffer.shape[0] < n:
+            self._buffer = np.empty((n, len(self.features)), dtype=self.dtype)
+        out = self._buffer[:n]
+        for i, name in enumerate(self.features):
+            if name in df.columns:
+                out[:, i] = df[name].to_numpy(dtype=self.dtype, na_value=np.nan)
+            else:
+                if name not in self._warned:
+                    logger.warning(f"Feature '{name}' missing from input, scored as NaN")
+                    self._warned.add(name)
+                out[:, i] = np.nan
+        # 同类型二维数组构造 DataFrame 不复制数据，保留特征名供模型校验
+        return pd.DataFrame(out, columns=self.features, copy=False)
+
+
+class BatchScorer:
+    """加载一次模型，对数据块分批并行打分"""
+
+    def __init__(self, model_path, features=None, workers=4, batch_rows=DEFAULT_BATCH_ROWS, processes=False):
+        self.model = GenericModel()
+        self.model.load(model_path)
+        self.features = self.model.feature_names() or features
+        if not self.features:
+            raise ValueError("Model does not record its feature names, model.feature_columns is required")
+        self.buffer = FeatureBuffer(self.features)
+        self.batch_rows = batch_rows
+        self.workers = max(workers, 1)
+        if processes:
+            self.executor = ProcessPoolExecutor(self.workers, initializer=_init_worker, initargs=(model_path,))
+            self._score = _score_in_worker
+        else:
+            self.executor = ThreadPoolExecutor(self.workers)
+            self._score = self._score_local
+        self.rows = 0
+        self.seconds = 0.0
+
+    def _score_local(self, frame):
+        return self.model.predict_proba(frame)[:, 1]
+
+    def score(self, df):
+        """返回与 df 行对应的正类概率 (float64 数组)"""
+        start = time.perf_counter()
+        X = self.buffer.build(df)
+        batches = [X.iloc[i:i + self.batch_rows] for i in range(0, len(X), self.batch_rows)]
+        if len(batches) > 1:
+            scores = np.concatenate(list(self.executor.map(self._score, batches)))
+        elif batches:
+            # 只有一批时在当前进程直接打分 (进程池模式下 _score_in_worker 只能在子进程中调用)
+            scores = self._score_local(batches[0])
+        else:
+            scores = np.empty(0)
+        self.rows += len(df)
+        self.seconds += time.perf_counter() - start
+        return scores
+
+    @property
+    def rows_per_s(self):
+        return self.rows / self.seconds if self.seconds else 0.0
+
+    def close(self):
+        self.executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def score_frame(df, scores, threshold=0.5):
+    """打分结果: timestamp, device_id, score, alarm"""
+    out = pd.DataFrame({'score': scores, 'alarm': (scores >= threshold).astype(np.int8)}, index=df.index)
+    if 'device_id' in df.columns:
+        out.insert(0, 'device_id', df['device_id'].to_numpy())
+    return out.reset_index()
+
+
+def write_scores(chunks, scorer, out_path, threshold=0.5):
+    """逐块打分并追加写入 out_path (已存在时覆盖)，返回总行数"""
+    os.makedirs(os.path.dirname(out_path) or '.', exist_ok=True)
+    if os.path.exists(out_path):
+        os.remove(out_path)
+    n_rows = n_alarms = 0
+    start = time.perf_counter()
+    for chunk in chunks:
+        if chunk.empty:
+            continue
+        result = score_frame(chunk, scorer.score(chunk), threshold)
+        result.to_csv(out_path, mode='a', index=False, header=n_rows == 0)
+        n_rows += len(result)
+        n_alarms += int(result['alarm'].sum())
+        logger.info(f"Scored {n_rows} rows ({scorer.rows_per_s:,.0f} rows/s)")
+    elapsed = time.perf_counter() - start
+    logger.info(f"Scoring finished: {n_rows} rows, {n_alarms} above {threshold}, "
+                f"{scorer.rows_per_s:,.0f} rows/s scoring, {n_rows / elapsed if elapsed else 0:,.0f} rows/s "
+                f"end to end, written to {out_path}")
+    return n_rows
@@ -1,7 +1,12 @@
 from .base import BaseModel
 import joblib
+import numpy as np
 from sklearn.ensemble import RandomForestClassifier
-from sklearn.linear_model import LogisticRegression
+from sklearn.linear_model import LogisticRegression, SGDClassifier
+from sklearn.neighbors import KNeighborsClassifier
+from sklearn.neural_network import MLPClassifier
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import FunctionTransformer, StandardScaler
 try:
     import lightgbm as lgb
     HAS_LGBM = True
@@ -10,6 +15,16 @@ except ImportError:
 import os
 from loguru import logger
 
+
+def _scaled(estimator):
+    """标准化 + 缺失值按均值 (0) 处理，用于对量纲敏感的算法"""
+    return Pipeline([
+        ('scale', StandardScaler()),
+        ('fillna', FunctionTransformer(np.nan_to_num)),
+        ('clf', estimator),
+    ])
+
+
 class GenericModel(BaseModel):
     def __init__(self, algorithm='rf', **kwargs):
         self.algorithm = algorithm
@@ -21,12 +36,39 @@ class GenericModel(BaseModel):
             else:
                 logger.warning("LightGBM not installed, falling back to RandomForest")
                 self.model = RandomForestClassifier(**kwargs)
+        elif algorithm == 'sgd':
+            # 支持 partial_fit 的线性模型，标准化参数同样增量更新
+            self.model = _scaled(SGDClassifier(loss='log_loss', **kwargs))
+        elif algorithm == 'knn':
+            self.model = _scaled(KNeighborsClassifier(**kwargs))
+        elif algorithm == 'mlp':
+            self.model = _scaled(MLPClassifier(**kwargs))
         else:
             self.model = LogisticRegression(**kwargs)
 
     def train(self, X, y):
         self.model.fit(X, y)
 
+    def partial_train(self, X, y, classes=(0, 1), trees_per_chunk=20):
+        """用一块数据继续训练，不丢弃之前学到的内容
+
+        sgd 使用 partial_fit；LightGBM 在已有 booster 上继续增加树；
+        随机森林使用 warm_start，每块新增 trees_per_chunk 棵树。
+        """
+        if isinstance(self.model, Pipeline) and hasattr(self.model[-1], 'partial_fit'):
+            self.model.named_steps['scale'].partial_fit(X)
+            self.model[-1].partial_fit(self.model[:-1].transform(X), y, classes=list(classes))
+        elif HAS_LGBM and isinstance(self.model, lgb.LGBMClassifier):
+            init_model = self.model.booster_ if getattr(self.model, 'fitted_', False) else None
+            self.model.fit(X, y, init_model=init_model)
+        elif isinstance(self.model, RandomForestClassifier):
+            fitted = len(getattr(self.model, 'estimators_', []))
+            self.model.set_params(warm_start=True, n_estimators=fitted + trees_per_chunk)
+            self.model.fit(X, y)
+        else:
+            raise ValueError(f"{type(self.model).__name__} does not support incremental training, "
+                             f"use 'sgd', 'lgbm' or 'rf'")
+
     def predict(self, X):
         return self.model.predict(X)
 
@@ -35,6 +77,14 @@ class GenericModel(BaseModel):
             return self.model.predict_proba(X)
         return None
 
+    def feature_names(self):
+        """训练时的特征列顺序，模型未记录时返回 None"""
+        for attr in ('feature_names_in_', 'feature_name_'):
+            names = getattr(self.model, attr, None)
+            if names is not None:
+                return [str(n) for n in names]
+        return None
+
     def save(self, path):
         os.makedirs(os.path.dirname(path), exist_ok=True)
         joblib.dump(self.model, path)
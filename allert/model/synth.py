@@ -1,46 +1,221 @@
 import numpy as np
 import pandas as pd
 from loguru import logger
+from scipy.signal import lfilter
+
+# 合成训练数据
+#   正常样本: 按拟合的均值/协方差一次性生成所有列 (保留测点之间的相关性)，
+#             autocorr > 0 时潜变量按 AR(1) 随时间相关，边缘分布不变
+#   故障样本: 连续的故障片段 (平均长度 fault_length)，每个片段按一种故障特征
+#             (列的随机子集，偏移 ±3 个标准差) 在 ramp 行内逐渐加深
+# 大样本量时用 generate_to_memmap 分块写入磁盘，内存占用与 chunk_rows 成正比。
+
+DEFAULT_CHUNK_ROWS = 100_000
+FAULT_SHIFT = 3.0
+
+
+def _numeric(df):
+    # 紧凑模式下打包的位域字 (bits_w, uint64) 不是数值量，不参与统计
+    numeric = df.select_dtypes(include=[np.number])
+    return numeric[[c for c in numeric.columns if not str(c).startswith('bits_')]]
+
+
+def _pairwise_moments(values):
+    """(n, k) 数组 (可含 NaN) -> 成对有效计数、x*y 之和、y 有效时 x 之和"""
+    present = ~np.isnan(values)
+    filled = np.where(present, values, 0.0)
+    weights = present.astype(np.float64)
+    return weights.T @ weights, filled.T @ filled, filled.T @ weights
+
+
+def _pairwise_cov(n, sxy, sx):
+    """与 DataFrame.cov() 相同的成对协方差: sx[i, j] 为 j 有效时 i 列之和"""
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return (sxy - sx * sx.T / n) / (n - 1)
+
 
 class DataSynthesizer:
     def __init__(self, base_df):
         # 仅从数值列计算统计信息
-        self.numeric_df = base_df.select_dtypes(include=[np.number])
+        self.numeric_df = _numeric(base_df)
         self.stats = self.numeric_df.describe().transpose()
         self.columns = self.numeric_df.columns
+        self.cov = self.numeric_df.astype(np.float64).cov().to_numpy()
+        self._factor = None
 
-    def generate(self, n_samples=1000, anomaly_ratio=0.1):
-        logger.info(f"Synthesizing {n_samples} samples with {anomaly_ratio} anomaly ratio...")
-        data = {}
-        labels = np.zeros(n_samples, dtype=int)
+    @classmethod
+    def from_chunks(cls, chunks):
+        """从分块数据流式累积统计量 (均值/标准差/协方差)，无需把全部数据载入内存"""
+        columns = None
+        n = sxy = sx = None
+        for chunk in chunks:
+            numeric = _numeric(chunk)
+            if columns is None:
+                columns = numeric.columns
+            # 各块列集合不同时按第一块对齐，缺失列视为 NaN
+            values = numeric.reindex(columns=columns).to_numpy(dtype=np.float64)
+            moments = _pairwise_moments(values)
+            if n is None:
+                n, sxy, sx = moments
+            else:
+                n, sxy, sx = n + moments[0], sxy + moments[1], sx + moments[2]
+
+        if columns is None:
+            # 没有任何数据块: 得到零列的生成器
+            columns = pd.Index([])
+            n = sxy = sx = np.zeros((0, 0))
+
+        count = np.diag(n)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = np.diag(sx) / count
+        cov = _pairwise_cov(n, sxy, sx)
+        stats = pd.DataFrame({'count': count, 'mean': mean, 'std': np.sqrt(np.diag(cov).clip(min=0))},
+                             index=columns)
+
+        synth = cls.__new__(cls)
+        synth.numeric_df = None
+        synth.stats = stats
+        synth.columns = stats.index
+        synth.cov = cov
+        synth._factor = None
+        return synth
+
+    def _distribution(self):
+        """(均值, 标准差, 因子 L)，L @ L.T 为修正后的协方差"""
+        if self._factor is not None:
+            return self._factor
+        mean = self.stats['mean'].to_numpy(dtype=np.float64) if len(self.columns) else np.zeros(0)
+        std = self.stats['std'].to_numpy(dtype=np.float64) if len(self.columns) else np.zeros(0)
+
+        # 处理常数或 NaN: 与其他列不相关，标准差按均值的 10% (均值为 0 时取 1)
+        degenerate = np.isnan(std) | (std == 0)
+        std = np.where(degenerate, np.where(mean == 0, 1.0, np.abs(mean * 0.1)), std)
+        mean = np.nan_to_num(mean)
+        std = np.where(np.isnan(std), 1.0, std)
+
+        # 协方差 -> 相关系数矩阵；成对计算的结果不一定半正定，把负特征值截断为 0
+        with np.errstate(invalid='ignore', divide='ignore'):
+            corr = self.cov / np.outer(std, std)
+        corr = np.nan_to_num(corr)
+        corr[degenerate, :] = 0
+        corr[:, degenerate] = 0
+        np.fill_diagonal(corr, 1.0)
+        eigval, eigvec = np.linalg.eigh(corr)
+        root = eigvec * np.sqrt(eigval.clip(min=0))
+        # 截断后对角线略小于 1，按行缩放回单位方差
+        norm = np.sqrt((root ** 2).sum(axis=1))
+        root /= np.where(norm > 0, norm, 1.0)[:, None]
 
+        self._factor = mean, std, std[:, None] * root
+        return self._factor
+
+    def fault_signatures(self, n_types=1, rng=None):
+        """(n_types, k) 的偏移矩阵: 每种故障随机选约一半的列，向上或向下偏移 3 个标准差"""
+        rng = rng or np.random.default_rng()
+        _, std, _ = self._distribution()
+        k = len(std)
+        active = rng.random((n_types, k)) > 0.5
+        direction = np.where(rng.random((n_types, k)) > 0.5, 1.0, -1.0)
+        return active * direction * FAULT_SHIFT * std
+
+    @staticmethod
+    def fault_episodes(n_samples, anomaly_ratio, fault_length=1, n_types=1, rng=None):
+        """在时间轴上随机放置互不重叠的故障片段
+
+        返回 (labels, fault_type, position)；position 为行在所属片段内的序号，正常行为 -1。
+        """
+        rng = rng or np.random.default_rng()
         n_anomalies = int(n_samples * anomaly_ratio)
-        # 前 n_anomalies 个样本为正样本 (1)
-        labels[:n_anomalies] = 1
-
-        for col in self.columns:
-            mean = self.stats.loc[col, 'mean']
-            std = self.stats.loc[col, 'std']
-
-            # 处理常数或 NaN
-            if pd.isna(std) or std == 0:
-                std = 1.0 if mean == 0 else abs(mean * 0.1)
-            if pd.isna(mean):
-                mean = 0
-
-            # 生成基础数据 (正态分布)
-            vals = np.random.normal(loc=mean, scale=std, size=n_samples)
-
-            # 注入异常
-            # 在这个简单的合成器中，我们将异常行的均值偏移 3 个标准差
-            # 我们将此偏移应用于列的随机子集以模拟多变量故障
-            # 但在这里，为了简单起见，我们将其应用于所有列，或者每列有 50% 的随机概率
-            if np.random.random() > 0.5:
-                # 偏移方向：随机向上或向下
-                direction = 1 if np.random.random() > 0.5 else -1
-                vals[:n_anomalies] += (direction * 3 * std)
-
-            data[col] = vals
-
-        df = pd.DataFrame(data)
+        labels = np.zeros(n_samples, dtype=np.int8)
+        fault_type = np.full(n_samples, -1, dtype=np.int16)
+        position = np.full(n_samples, -1, dtype=np.int32)
+        if n_anomalies == 0:
+            return labels, fault_type, position
+
+        # 片段长度服从均值为 fault_length 的几何分布，总长截断为 n_anomalies
+        lengths = rng.geometric(1.0 / max(fault_length, 1), size=n_anomalies)
+        lengths = lengths[:np.searchsorted(np.cumsum(lengths), n_anomalies) + 1]
+        lengths[-1] -= lengths.sum() - n_anomalies
+        n_episodes = len(lengths)
+
+        # 把正常行随机分配到各片段之前的间隔中 (最后一段之后的剩余也是正常行)
+        cuts = np.sort(rng.integers(0, n_samples - n_anomalies + 1, size=n_episodes))
+        starts = cuts + np.concatenate(([0], np.cumsum(lengths)[:-1]))
+
+        episode = np.repeat(np.arange(n_episodes), lengths)
+        rows = np.repeat(starts, lengths) + (np.arange(n_anomalies) - np.repeat(np.cumsum(lengths) - lengths, lengths))
+        labels[rows] = 1
+        fault_type[rows] = rng.integers(0, n_types, size=n_episodes)[episode]
+        position[rows] = rows - starts[episode]
+        return labels, fault_type, position
+
+    def _iter_centered(self, n_samples, anomaly_ratio=0.1, chunk_rows=DEFAULT_CHUNK_ROWS, autocorr=0.0,
+                       fault_length=1, n_fault_types=1, ramp=0, seed=None):
+        """逐块产出 (行切片, 去均值的 float32 样本, labels)；float32 下矩阵乘法约快 3 倍"""
+        rng = np.random.default_rng(seed)
+        _, _, factor = self._distribution()
+        k = factor.shape[0]
+        factor = factor.T.astype(np.float32)
+        signatures = self.fault_signatures(n_fault_types, rng).astype(np.float32)
+        labels, fault_type, position = self.fault_episodes(n_samples, anomaly_ratio, fault_length,
+                                                           n_fault_types, rng)
+        phi = float(np.clip(autocorr, 0.0, 0.999))
+        ar_b = np.array([np.sqrt(1 - phi ** 2)], dtype=np.float32)
+        ar_a = np.array([1.0, -phi], dtype=np.float32)
+        state = rng.standard_normal(k, dtype=np.float32)
+
+        for offset in range(0, n_samples, chunk_rows):
+            n = min(chunk_rows, n_samples - offset)
+            # 潜变量按 (k, n) 存放，AR 滤波沿连续内存的最后一维进行
+            latent = rng.standard_normal((k, n), dtype=np.float32)
+            if phi > 0:
+                # AR(1): z_t = phi * z_{t-1} + sqrt(1 - phi^2) * e_t，块之间延续状态
+                latent = lfilter(ar_b, ar_a, latent, axis=-1, zi=phi * state[:, None])[0]
+                state = latent[:, -1]
+            values = latent.T @ factor
+
+            sl = slice(offset, offset + n)
+            faulty = np.flatnonzero(labels[sl])
+            if len(faulty):
+                shift = signatures[fault_type[sl][faulty]]
+                if ramp > 0:
+                    # 故障开始后 ramp 行内线性加深
+                    shift *= np.minimum((position[sl][faulty] + 1) / ramp, 1.0).astype(np.float32)[:, None]
+                values[faulty] += shift
+            yield sl, values, labels[sl]
+
+    def _fill(self, out, labels_out, n_samples, anomaly_ratio, **kwargs):
+        mean = self._distribution()[0]
+        for sl, values, labels in self._iter_centered(n_samples, anomaly_ratio, **kwargs):
+            # 均值按 float64 加回，避免大数值测点 (电量累计等) 丢失精度
+            np.add(values, mean, out=out[sl], casting='same_kind')
+            labels_out[sl] = labels
+
+    def iter_chunks(self, n_samples, anomaly_ratio=0.1, **kwargs):
+        """逐块产出 (float64 样本矩阵, labels)，各块在时间上连续；kwargs 见 _iter_centered"""
+        mean = self._distribution()[0]
+        for _, values, labels in self._iter_centered(n_samples, anomaly_ratio, **kwargs):
+            yield values + mean, labels
+
+    def generate(self, n_samples=1000, anomaly_ratio=0.1, **kwargs):
+        """返回 (DataFrame, labels)；kwargs 见 _iter_centered"""
+        logger.info(f"Synthesizing {n_samples} samples with {anomaly_ratio} anomaly ratio...")
+        values = np.empty((n_samples, len(self.columns)), dtype=np.float64)
+        labels = np.zeros(n_samples, dtype=int)
+        self._fill(values, labels, n_samples, anomaly_ratio, **kwargs)
+        df = pd.DataFrame(values, columns=self.columns, copy=False)
         return df, labels
+
+    def generate_to_memmap(self, path, n_samples, anomaly_ratio=0.1, dtype=np.float32, **kwargs):
+        """分块生成并写入 .npy 内存映射数组，labels 写入 <path>.labels.npy
+
+        返回 (只读的 memmap 样本矩阵, labels)，列顺序为 self.columns。
+        """
+        logger.info(f"Synthesizing {n_samples} samples to {path}...")
+        out = np.lib.format.open_memmap(path, mode='w+', dtype=dtype, shape=(n_samples, len(self.columns)))
+        labels = np.lib.format.open_memmap(f'{path}.labels.npy', mode='w+', dtype=np.int8, shape=(n_samples,))
+        self._fill(out, labels, n_samples, anomaly_ratio, **kwargs)
+        out.flush()
+        labels.flush()
+        del out, labels
+        return np.load(path, mmap_mode='r'), np.load(f'{path}.labels.npy', mmap_mode='r')
@@ -0,0 +1,340 @@
+import ast
+import functools
+import io
+import re
+import tokenize
+
+import numpy as np
+from loguru import logger
+
+# 规则表达式编译器
+# 在 RuleEngine 初始化时一次性解析全部规则表达式，合并公共子表达式 (CSE)，
+# 运行时每个列只读取一次，每个子表达式只计算一次。
+
+_BACKTICK_RE = re.compile(r'`([^`]+)`')
+
+_CMP_OPS = {
+    ast.Lt: np.less,
+    ast.LtE: np.less_equal,
+    ast.Gt: np.greater,
+    ast.GtE: np.greater_equal,
+    ast.Eq: np.equal,
+    ast.NotEq: np.not_equal,
+}
+# 交换操作数后的等价比较 (0.3 > x  ->  x < 0.3)
+_CMP_SWAP = {'lt': 'gt', 'le': 'ge', 'gt': 'lt', 'ge': 'le', 'eq': 'eq', 'ne': 'ne'}
+_CMP_NAMES = {ast.Lt: 'lt', ast.LtE: 'le', ast.Gt: 'gt', ast.GtE: 'ge', ast.Eq: 'eq', ast.NotEq: 'ne'}
+_CMP_FUNCS = {_CMP_NAMES[k]: v for k, v in _CMP_OPS.items()}
+
+_BIN_FUNCS = {
+    ast.Add: ('add', np.add),
+    ast.Sub: ('sub', np.subtract),
+    ast.Mult: ('mul', np.multiply),
+    ast.Div: ('div', np.true_divide),
+    ast.Mod: ('mod', np.mod),
+    ast.Pow: ('pow', np.power),
+    ast.FloorDiv: ('floordiv', np.floor_divide),
+}
+_BIN_NAMES = {name: func for name, func in _BIN_FUNCS.values()}
+_COMMUTATIVE = {'add', 'mul'}
+# 结果一定是数值 (或布尔) 的二元运算；add/mul/mod 作用于字符串列时结果仍是字符串
+_NUMERIC_BIN = {'sub', 'div', 'pow', 'floordiv'}
+
+# 可以下推到 TDengine 的运算。
+# != 与 not 不下推: pandas 中 NaN != x 为 True，而 SQL 中 NULL != x 为 NULL (被过滤)；
+# 除法不下推: 除零在 pandas 中为 inf，在 SQL 中为 NULL。
+_SQL_CMP = {'lt': '<', 'le': '<=', 'gt': '>', 'ge': '>=', 'eq': '='}
+_SQL_BIN = {'add': '+', 'sub': '-', 'mul': '*'}
+
+
+class UnsupportedExpression(Exception):
+    pass
+
+
+def _preprocess(expr):
+    """与 pandas.eval 保持一致: 反引号列名替换为占位符，& / | 按 and / or 的优先级处理"""
+    quoted = {}
+
+    def _quote(m):
+        placeholder = f'__col_{len(quoted)}'
+        quoted[placeholder] = m.group(1)
+        return placeholder
+
+    source = _BACKTICK_RE.sub(_quote, expr)
+
+    tokens = []
+    for tok in tokenize.generate_tokens(io.StringIO(source).readline):
+        if tok.type == tokenize.OP and tok.string == '&':
+            tokens.append((tokenize.NAME, 'and'))
+        elif tok.type == tokenize.OP and tok.string == '|':
+            tokens.append((tokenize.NAME, 'or'))
+        else:
+            tokens.append((tok.type, tok.string))
+    return tokenize.untokenize(tokens), quoted
+
+
+class RulePlan:
+    """批量规则执行计划
+
+    nodes 中每个节点是一个元组 (op, *args)，子节点以编号引用；
+    相同结构的子表达式只会生成一个节点。
+    """
+
+    def __init__(self, exprs):
+        self.nodes = []
+        self._node_ids = {}
+        self.roots = []
+        for expr in exprs:
+            root = None
+            if expr:
+                try:
+                    source, quoted = _preprocess(str(expr))
+                    tree = ast.parse(source.strip(), mode='eval')
+                    root = self._compile(tree.body, quoted)
+                except (SyntaxError, tokenize.TokenError, UnsupportedExpression) as e:
+                    logger.debug(f"Expression '{expr}' not compiled, falling back to df.eval: {e}")
+                    root = None
+            self.roots.append(root)
+
+        self._prune()
+        self.columns = sorted({node[1] for node in self.nodes if node[0] == 'col'})
+        self._last_use = self._compute_last_use()
+        n_compiled = sum(r is not None for r in self.roots)
+        logger.debug(f"Compiled {n_compiled}/{len(self.roots)} rules into {len(self.nodes)} shared nodes "
+                    f"over {len(self.columns)} columns.")
+
+    def _add(self, node):
+        node_id = self._node_ids.get(node)
+        if node_id is None:
+            node_id = len(self.nodes)
+            self.nodes.append(node)
+            self._node_ids[node] = node_id
+        return node_id
+
+    def _compile(self, node, quoted):
+        if isinstance(node, ast.Name):
+            return self._add(('col', quoted.get(node.id, node.id)))
+
+        if isinstance(node, ast.Constant):
+            if isinstance(node.value, (bool, int, float, str)):
+                return self._add(('const', node.value))
+            raise UnsupportedExpression(f"constant {node.value!r}")
+
+        if isinstance(node, ast.BoolOp):
+            op = 'and' if isinstance(node.op, ast.And) else 'or'
+            children = [child for value in node.values for child in self._bool_parts(value, op, quoted)]
+            return self._add((op,) + tuple(sorted(set(children))))
+
+        if isinstance(node, ast.UnaryOp):
+            operand = self._compile(node.operand, quoted)
+            if isinstance(node.op, (ast.Not, ast.Invert)):
+                return self._add(('not', operand))
+            if isinstance(node.op, ast.USub):
+                return self._add(('neg', operand))
+            if isinstance(node.op, ast.UAdd):
+                return operand
+            raise UnsupportedExpression(type(node.op).__name__)
+
+        if isinstance(node, ast.Compare):
+            parts = self._compare_parts(node, quoted)
+            if len(parts) == 1:
+                return parts[0]
+            return self._add(('and',) + tuple(sorted(set(parts))))
+
+        if isinstance(node, ast.BinOp):
+            if type(node.op) not in _BIN_FUNCS:
+                raise UnsupportedExpression(type(node.op).__name__)
+            name = _BIN_FUNCS[type(node.op)][0]
+            left = self._compile(node.left, quoted)
+            right = self._compile(node.right, quoted)
+            # 只有确定是数值运算时才交换操作数 (字符串 a + b 为拼接，不满足交换律)
+            if name in _COMMUTATIVE and left > right and (self._numeric(left) or self._numeric(right)):
+                left, right = right, left
+            return self._add(('bin', name, left, right))
+
+        raise UnsupportedExpression(type(node).__name__)
+
+    def _numeric(self, node_id):
+        """节点的结果是否一定为数值；列的类型在编译时未知，视为非数值"""
+        node = self.nodes[node_id]
+        op = node[0]
+        if op == 'const':
+            return isinstance(node[1], (bool, int, float))
+        if op in ('cmp', 'and', 'or', 'not', 'neg'):
+            return True
+        if op == 'bin':
+            return node[1] in _NUMERIC_BIN or (self._numeric(node[2]) and self._numeric(node[3]))
+        return False
+
+    def _bool_parts(self, node, op, quoted):
+        """展平嵌套的同类运算: a and (b and c) -> [a, b, c]；被展平的中间节点不注册"""
+        if isinstance(node, ast.BoolOp) and ('and' if isinstance(node.op, ast.And) else 'or') == op:
+            return [child for value in node.values for child in self._bool_parts(value, op, quoted)]
+        if op == 'and' and isinstance(node, ast.Compare) and len(node.ops) > 1:
+            return self._compare_parts(node, quoted)
+        return [self._compile(node, quoted)]
+
+    def _compare_parts(self, node, quoted):
+        # 链式比较 0 < a < 1 等价于 (0 < a) and (a < 1)
+        parts = []
+        left = self._compile(node.left, quoted)
+        for op, comparator in zip(node.ops, node.comparators):
+            if type(op) not in _CMP_NAMES:
+                raise UnsupportedExpression(type(op).__name__)
+            right = self._compile(comparator, quoted)
+            name = _CMP_NAMES[type(op)]
+            # 常量统一放在右侧，便于共享 a < 0.3 与 0.3 > a
+            if self.nodes[left][0] == 'const' and self.nodes[right][0] != 'const':
+                parts.append(self._add(('cmp', _CMP_SWAP[name], right, left)))
+            else:
+                parts.append(self._add(('cmp', name, left, right)))
+            left = right
+        return parts
+
+    def _prune(self):
+        # 编译到一半失败的表达式会留下无人引用的节点；只保留从 roots 可达的节点并重新编号
+        live = [False] * len(self.nodes)
+        for root in self.roots:
+            if root is not None:
+                live[root] = True
+        for node_id in range(len(self.nodes) - 1, -1, -1):
+            if live[node_id]:
+                for child in self._children(self.nodes[node_id]):
+                    live[child] = True
+        if all(live):
+            return
+        remap, nodes = {}, []
+        for node_id, node in enumerate(self.nodes):
+            if live[node_id]:
+                remap[node_id] = len(nodes)
+                # 子节点编号总在元组末尾
+                fixed = len(node) - len(self._children(node))
+                nodes.append(node[:fixed] + tuple(remap[child] for child in node[fixed:]))
+        self.nodes = nodes
+        self._node_ids = {node: node_id for node_id, node in enumerate(nodes)}
+        self.roots = [None if root is None else remap[root] for root in self.roots]
+
+    def to_sql(self, root, resolve):
+        """把一条已编译的规则翻译为 TDengine WHERE 条件，无法等价翻译时返回 None
+
+        resolve(name) 返回规则列名对应的原始列名，未知列返回 None。
+        """
+        if root is None:
+            return None
+        try:
+            return self._emit_sql(root, resolve)
+        except UnsupportedExpression as e:
+            logger.debug(f"Node {self.nodes[root]} cannot be pushed down: {e}")
+            return None
+
+    def _emit_sql(self, node_id, resolve):
+        node = self.nodes[node_id]
+        op = node[0]
+        if op == 'col':
+            raw = resolve(node[1])
+            if raw is None:
+                raise UnsupportedExpression(f"unknown column '{node[1]}'")
+            return f'`{raw}`'
+        if op == 'const':
+            value = node[1]
+            if isinstance(value, str):
+                return "'" + value.replace("'", "''") + "'"
+            if isinstance(value, bool) or not np.isfinite(value):
+                raise UnsupportedExpression(f"constant {value!r}")
+            return repr(value)
+        if op in ('and', 'or'):
+            parts = [self._emit_sql(c, resolve) for c in node[1:]]
+            return '(' + f' {op.upper()} '.join(parts) + ')'
+        if op == 'cmp' and node[1] in _SQL_CMP:
+            return f'{self._emit_sql(node[2], resolve)} {_SQL_CMP[node[1]]} {self._emit_sql(node[3], resolve)}'
+        if op == 'bin' and node[1] in _SQL_BIN:
+            return f'({self._emit_sql(node[2], resolve)} {_SQL_BIN[node[1]]} {self._emit_sql(node[3], resolve)})'
+        if op == 'neg':
+            return f'(-{self._emit_sql(node[1], resolve)})'
+        raise UnsupportedExpression(op if op != 'cmp' and op != 'bin' else node[1])
+
+    def _compute_last_use(self):
+        # 记录每个节点最后被引用的位置，计算完成后及时释放中间结果
+        last_use = {}
+        for node_id, node in enumerate(self.nodes):
+            for child in self._children(node):
+                last_use[child] = node_id
+        for root in self.roots:
+            if root is not None:
+                last_use[root] = len(self.nodes)
+        return last_use
+
+    @staticmethod
+    def _children(node):
+        op = node[0]
+        if op in ('and', 'or', 'not', 'neg'):
+            return node[1:]
+        if op in ('cmp', 'bin'):
+            return node[2:]
+        return ()
+
+    def evaluate(self, df):
+        """按拓扑顺序一次性计算所有节点
+
+        返回与规则一一对应的列表: 布尔数组；未编译的规则为 None；计算失败的规则为对应的异常。
+        """
+        n = len(df)
+        # 每个被引用的列只读取一次，转为连续数组
+        arrays = {}
+        for col in self.columns:
+            if col in df.columns:
+                arrays[col] = np.ascontiguousarray(df[col].to_numpy())
+
+        values = {}
+        failed = {}
+        for node_id, node in enumerate(self.nodes):
+            failed_child = next((c for c in self._children(node) if c in failed), None)
+            if failed_child is not None:
+                # 子表达式失败 (例如列不存在) 时，依赖它的规则一并失败
+                failed[node_id] = failed[failed_child]
+            else:
+                try:
+                    values[node_id] = self._eval_node(node, values, arrays)
+                except Exception as e:
+                    failed[node_id] = e
+
+            for child in self._children(node):
+                if self._last_use.get(child) == node_id:
+                    values.pop(child, None)
+
+        results = []
+        for root in self.roots:
+            if root is None:
+                results.append(None)
+            elif root in failed:
+                results.append(failed[root])
+            else:
+                result = np.asarray(np.broadcast_to(values[root], (n,)))
+                if result.dtype.kind == 'f':
+                    # 与 fillna(False) 一致: NaN 视为未触发
+                    result = np.nan_to_num(result, nan=0.0)
+                results.append(result.astype(bool))
+        return results
+
+    @staticmethod
+    def _eval_node(node, values, arrays):
+        op = node[0]
+        if op == 'col':
+            if node[1] not in arrays:
+                raise KeyError(f"name '{node[1]}' is not defined")
+            return arrays[node[1]]
+        if op == 'const':
+            return node[1]
+        if op == 'and':
+            return functools.reduce(np.logical_and, [values[c] for c in node[1:]])
+        if op == 'or':
+            return functools.reduce(np.logical_or, [values[c] for c in node[1:]])
+        if op == 'not':
+            return np.logical_not(values[node[1]])
+        if op == 'neg':
+            return np.negative(values[node[1]])
+        if op == 'cmp':
+            return _CMP_FUNCS[node[1]](values[node[2]], values[node[3]])
+        if op == 'bin':
+            return _BIN_NAMES[node[1]](values[node[2]], values[node[3]])
+        raise UnsupportedExpression(op)
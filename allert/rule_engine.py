@@ -1,16 +1,131 @@
+import numpy as np
 import pandas as pd
 from loguru import logger
+from .rule_compiler import RulePlan
+
+
+def frame_ts(df):
+    """索引时间戳统一转为 int64 纳秒"""
+    return df.index.to_numpy(dtype='datetime64[ns]').view('i8')
+
+
+def device_codes(device_values):
+    """设备编码: factorize 对缺失值返回 -1，整体 +1 保证编码非负"""
+    codes, uniques = pd.factorize(device_values)
+    return codes.astype(np.int64) + 1, uniques
+
+
+class Timeline:
+    """按 (设备, 时间) 排序一次后的时间轴，支持向量化的组内时间查找。
+
+    时间戳先压缩为全局秩，再与设备编码组合成单调递增的 int64 键，
+    这样组内的 "第一个晚于 t 的位置" 可以用一次 searchsorted 完成，无需逐设备循环。
+    """
+
+    def __init__(self, groups, ts_int, order=None, uniq=None):
+        self.groups = groups
+        self.ts = ts_int
+        self.order = order
+        self.uniq = np.unique(ts_int) if uniq is None else uniq
+        self.stride = np.int64(len(self.uniq) + 1)
+        rank = np.searchsorted(self.uniq, ts_int)
+        self.keys = groups.astype(np.int64) * self.stride + rank
+
+    @classmethod
+    def from_codes(cls, codes, ts_int):
+        order = np.lexsort((ts_int, codes))
+        return cls(codes[order], ts_int[order], order=order)
+
+    @classmethod
+    def from_frame(cls, df):
+        ts_int = frame_ts(df)
+        if 'device_id' in df.columns:
+            codes = device_codes(df['device_id'])[0]
+        else:
+            codes = np.zeros(len(df), dtype=np.int64)
+        return cls.from_codes(codes, ts_int)
+
+    def __len__(self):
+        return len(self.ts)
+
+    def subset(self, positions):
+        """取排序后的子集 (例如触发位置)，复用全局时间秩"""
+        order = None if self.order is None else self.order[positions]
+        return Timeline(self.groups[positions], self.ts[positions], order=order, uniq=self.uniq)
+
+    def first_after(self, query_ts):
+        """对每一行返回同组内第一个时间戳严格大于 query_ts 的位置"""
+        query_rank = np.searchsorted(self.uniq, query_ts, side='right')
+        return np.searchsorted(self.keys, self.groups * self.stride + query_rank, side='left')
+
+    def group_starts(self):
+        n = len(self.groups)
+        if n == 0:
+            return np.empty(0, dtype=np.intp)
+        return np.flatnonzero(np.r_[True, self.groups[1:] != self.groups[:-1]])
+
+
+def window_mask(mask, timeline, duration, func='any'):
+    """组内时间窗口 (t - duration, t]，与 pandas rolling(duration) 语义一致"""
+    start = timeline.first_after(timeline.ts - duration.value)
+    csum = np.concatenate([[0], np.cumsum(mask, dtype=np.int64)])
+    count = csum[1:] - csum[start]
+
+    if func == 'any':
+        return count > 0
+    if func == 'all':
+        return count == (np.arange(1, len(mask) + 1) - start)
+    # 例如 sum: 保持原始结果
+    return mask
+
+
+def dedup_positions(timeline, dedup_delta):
+    """返回组内去重后保留的位置: 与同组上一条保留告警的时间差大于 dedup_delta 才保留。"""
+    n = len(timeline)
+    if n == 0:
+        return np.empty(0, dtype=np.intp)
+
+    # 对每个位置预先计算同组内 "下一条可保留" 的位置
+    next_pos = timeline.first_after(timeline.ts + dedup_delta.value)
+
+    # 所有设备并行沿 next_pos 链跳转，迭代次数等于单台设备保留的最大告警数
+    kept = np.zeros(n, dtype=bool)
+    frontier = timeline.group_starts()
+    while frontier.size:
+        kept[frontier] = True
+        nxt = next_pos[frontier]
+        valid = nxt < n
+        frontier, nxt = frontier[valid], nxt[valid]
+        frontier = nxt[timeline.groups[nxt] == timeline.groups[frontier]]
+    return np.flatnonzero(kept)
+
 
 class Rule:
     def __init__(self, config):
         self.name = config.get('name')
         self.expr = config.get('expr')
+        # 模型规则: model 为 GenericModel 文件路径，正类概率 >= threshold 视为触发
+        self.model_path = config.get('model')
+        self.threshold = float(config.get('threshold', 0.5))
         self.severity = config.get('severity', 'info')
         self.window = config.get('window') # 例如 "5m any"
         self.dedup = config.get('dedup') # 例如 "10m"
         self.message = config.get('message', self.name)
+        self.window_duration, self.window_func = self._parse_window()
 
-    def evaluate(self, df):
+    def _parse_window(self):
+        if not self.window:
+            return None, None
+        try:
+            parts = self.window.split()
+            duration = pd.to_timedelta(parts[0])
+            func = parts[1] if len(parts) > 1 else 'any'
+            return duration, func
+        except Exception as e:
+            logger.error(f"Error parsing window '{self.window}' for rule '{self.name}': {e}")
+            return None, None
+
+    def evaluate_expr(self, df):
         try:
             # 使用 pandas eval。如果安装了 numexpr，它支持 numexpr 后端。
             # engine='numexpr' 更快但类型检查更严格。
@@ -19,82 +134,320 @@ class Rule:
             result_series = df.eval(self.expr)
         except Exception as e:
             logger.error(f"Error evaluating rule '{self.name}' with expr '{self.expr}': {e}")
-            return pd.Series(False, index=df.index)
+            return np.zeros(len(df), dtype=bool)
 
-        # 窗口逻辑
-        if self.window:
-            try:
-                parts = self.window.split()
-                duration = parts[0]
-                func = parts[1] if len(parts) > 1 else 'any'
-
-                # 滑动窗口
-                # 如果需要，将布尔值转换为整数进行计算，但 rolling 大多时候可以将布尔值作为浮点数处理
-                # Rolling max 等同于 'any'，min 等同于 'all'
-                r = result_series.astype(int).rolling(window=duration)
-
-                if func == 'any':
-                    result_series = r.max() > 0
-                elif func == 'all':
-                    result_series = r.min() > 0
-                elif func == 'sum':
-                     # 例如 count > 5
-                     pass
-            except Exception as e:
-                logger.error(f"Error applying window '{self.window}' for rule '{self.name}': {e}")
+        return pd.Series(result_series, index=df.index).fillna(False).to_numpy(dtype=bool)
+
+    def apply_window(self, mask, timeline):
+        # 窗口逻辑 (按设备分组，mask 与 timeline 均为排序后的顺序)
+        if self.window_duration is None:
+            return mask
+        try:
+            # 'any' 等同于 rolling max，'all' 等同于 rolling min
+            return window_mask(mask, timeline, self.window_duration, self.window_func)
+        except Exception as e:
+            logger.error(f"Error applying window '{self.window}' for rule '{self.name}': {e}")
+            return mask
+
+    def evaluate(self, df, timeline=None):
+        if timeline is None:
+            timeline = Timeline.from_frame(df)
+
+        mask = self.evaluate_expr(df)[timeline.order]
+        mask = self.apply_window(mask, timeline)
+
+        # 还原为原始行顺序
+        result = np.empty(len(mask), dtype=bool)
+        result[timeline.order] = mask
+        return pd.Series(result, index=df.index)
+
+
+class ModelScorer:
+    """模型规则使用的模型: 每个文件只加载一次，每个数据块只打分一次"""
+
+    def __init__(self, path):
+        # 只有配置了模型规则时才需要 sklearn/lightgbm
+        from .model.scoring import FeatureBuffer
+        from .model.sklearn_model import GenericModel
+
+        self.path = path
+        self.model = GenericModel()
+        self.model.load(path)
+        self.features = self.model.feature_names()
+        self.buffer = FeatureBuffer(self.features) if self.features else None
+
+    def score(self, df):
+        if self.buffer is None:
+            raise ValueError(f"Model {self.path} does not record its feature names")
+        if df.empty:
+            return np.empty(0)
+        return self.model.predict_proba(self.buffer.build(df))[:, 1]
 
-        return result_series.fillna(False).astype(bool)
 
 class RuleEngine:
     def __init__(self, rules_config):
         self.rules = [Rule(r) for r in rules_config]
+        # 一次性编译全部规则表达式，运行时共享公共子表达式
+        self.plan = RulePlan([rule.expr for rule in self.rules])
+        # 模型规则: 同一模型文件被多条规则引用 (例如不同阈值) 时共享
+        self.models = {}
+        for rule in self.rules:
+            if rule.model_path and rule.model_path not in self.models:
+                try:
+                    self.models[rule.model_path] = ModelScorer(rule.model_path)
+                except Exception as e:
+                    logger.error(f"Failed to load model '{rule.model_path}' for rule '{rule.name}': {e}")
+                    self.models[rule.model_path] = None
+
+    @property
+    def max_window(self):
+        """规则中最大的时间窗口，用于增量模式的尾部保留和查询回看"""
+        windows = [r.window_duration for r in self.rules if r.window_duration is not None]
+        return max(windows) if windows else pd.Timedelta(0)
+
+    def referenced_columns(self):
+        """规则引用的全部列名；存在无法编译的规则时返回 None (无法确定，需要全部列)"""
+        if any(rule.expr and root is None for rule, root in zip(self.rules, self.plan.roots)):
+            return None
+        columns = list(self.plan.columns)
+        for model in self.models.values():
+            if model is None or model.features is None:
+                return None
+            columns.extend(c for c in model.features if c not in columns)
+        return columns
+
+    def pushdown_filter(self, resolve):
+        """把规则翻译为 TDengine WHERE 条件 (各规则 OR 连接)，只拉取可能触发告警的行
+
+        只有全部规则都能下推时才返回条件，否则返回 None (需要全量数据)。
+        窗口规则依赖窗口内未命中的行，因此不能下推。
+        """
+        if not self.rules:
+            return None
+        parts = []
+        for rule, root in zip(self.rules, self.plan.roots):
+            if rule.model_path:
+                logger.info(f"Rule '{rule.name}' is model based, predicate pushdown disabled.")
+                return None
+            if rule.window:
+                logger.info(f"Rule '{rule.name}' has a window, predicate pushdown disabled.")
+                return None
+            sql = self.plan.to_sql(root, resolve)
+            if sql is None:
+                logger.info(f"Rule '{rule.name}' cannot be translated to SQL, predicate pushdown disabled.")
+                return None
+            parts.append(sql)
+        return ' OR '.join(dict.fromkeys(parts))
+
+    def evaluate_rules(self, df):
+        """批量计算所有规则表达式，返回原始行顺序的布尔数组列表"""
+        masks = []
+        scores = self.score_models(df)
+        for rule, result in zip(self.rules, self.plan.evaluate(df)):
+            if rule.model_path:
+                score = scores.get(rule.model_path)
+                masks.append(np.zeros(len(df), dtype=bool) if score is None else score >= rule.threshold)
+            elif result is None:
+                # 编译器不支持的表达式退回 df.eval
+                masks.append(rule.evaluate_expr(df))
+            elif isinstance(result, Exception):
+                logger.error(f"Error evaluating rule '{rule.name}' with expr '{rule.expr}': {result}")
+                masks.append(np.zeros(len(df), dtype=bool))
+            else:
+                masks.append(result)
+        return masks
+
+    def score_models(self, df):
+        """对数据块计算每个模型的正类概率 {模型路径: 数组}，失败的模型不出现在结果中"""
+        scores = {}
+        for path, model in self.models.items():
+            if model is None:
+                continue
+            try:
+                scores[path] = model.score(df)
+            except Exception as e:
+                logger.error(f"Error scoring model '{path}': {e}")
+        return scores
+
+    def stream(self):
+        """创建增量执行器，用于持续监控场景"""
+        return RuleStream(self)
+
+    def detect(self, rule, mask, timeline, eligible=None):
+        """对排序后的 mask 应用窗口和去重，返回最终告警位置对应的 Timeline 子集
+
+        eligible 用于限制可以产生告警的行 (例如增量模式下只有新数据行)。
+        """
+        # 1. 应用窗口
+        mask = rule.apply_window(mask, timeline)
+        if eligible is not None:
+            mask = mask & eligible
+
+        # 2. 提取触发位置
+        triggered = timeline.subset(np.flatnonzero(mask))
+
+        # 3. 按设备去重
+        if rule.dedup and len(triggered):
+            dedup_delta = pd.to_timedelta(rule.dedup)
+            triggered = triggered.subset(dedup_positions(triggered, dedup_delta))
+        return triggered
 
     def run(self, df):
-        all_alerts = []
+        alert_frames = []
+        if df.empty:
+            return pd.DataFrame()
 
-        for rule in self.rules:
-            # 1. 评估规则
-            triggered_series = rule.evaluate(df)
+        # 按 (device_id, timestamp) 只排序一次，所有规则共享
+        timeline = Timeline.from_frame(df)
+        has_device = 'device_id' in df.columns
+        device_values = df['device_id'].to_numpy() if has_device else None
+
+        masks = self.evaluate_rules(df)
 
-            if not triggered_series.any():
+        for rule, mask in zip(self.rules, masks):
+            triggered = self.detect(rule, mask[timeline.order], timeline)
+            if not len(triggered):
                 continue
 
-            # 2. 提取时间戳
-            triggered_indices = triggered_series[triggered_series].index
+            # 告警按时间排序，同一时刻按设备排序
+            rows = triggered.order[np.lexsort((triggered.groups, triggered.ts))]
+
+            # 4. 一次性按位置取值构建告警
+            alert_frames.append(make_alerts(rule, df.index[rows],
+                                            device_values[rows] if has_device else 'unknown'))
+
+        if not alert_frames:
+            return pd.DataFrame()
+
+        return pd.concat(alert_frames, ignore_index=True)
+
+
+def make_alerts(rule, timestamps, device_ids):
+    return pd.DataFrame({
+        'timestamp': timestamps,
+        'device_id': device_ids,
+        'rule_name': rule.name,
+        'severity': rule.severity,
+        'message': rule.message,
+    })
+
+
+class RuleStream:
+    """增量规则执行: 每次 feed 一个数据块，返回该块新产生的告警
+
+    块与块之间只保留两类状态，因此每条新数据的处理成本与已运行时长无关:
+    - 窗口尾部: 每台设备最近 max_window 内的原始规则结果 (不保留原始数据列)
+    - 去重状态: 每条规则、每台设备最后一次告警的时间戳
+    同一设备的数据需按时间顺序送入。
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.max_window = engine.max_window
 
-            # 3. 去重 (离线/批处理模式)
-            # 如果设置了去重，我们遍历并跳过在前一个告警窗口内的告警
+        n_rules = len(engine.rules)
+        self._tail_devices = np.empty(0, dtype=object)
+        self._tail_ts = np.empty(0, dtype=np.int64)
+        self._tail_masks = np.empty((0, n_rules), dtype=bool)
+        # 每条规则: str(device_id) -> 最后告警时间 (int64 纳秒)
+        # 键统一为字符串，与 get_state/set_state 的 JSON 键一致 (TDengine 标签可能是整数)
+        self.last_alert = [pd.Series(dtype=np.int64) for _ in engine.rules]
+
+    def _merge_tail(self, chunk):
+        chunk_ts = frame_ts(chunk)
+        if 'device_id' in chunk.columns:
+            chunk_devices = chunk['device_id'].to_numpy(dtype=object)
+        else:
+            chunk_devices = np.full(len(chunk), 'unknown', dtype=object)
+
+        # 只对新数据计算规则表达式，尾部复用上一块的结果
+        chunk_masks = np.column_stack(self.engine.evaluate_rules(chunk))
+
+        devices = np.concatenate([self._tail_devices, chunk_devices])
+        ts = np.concatenate([self._tail_ts, chunk_ts])
+        masks = np.concatenate([self._tail_masks, chunk_masks])
+
+        codes, uniques = device_codes(devices)
+        timeline = Timeline.from_codes(codes, ts)
+        return chunk_devices, devices, uniques, timeline, masks[timeline.order]
+
+    def prime(self, chunk):
+        """只用历史数据填充窗口尾部，不产生告警也不改变去重状态 (用于重启后的预热)"""
+        if chunk.empty or not self.engine.rules:
+            return
+        _, devices, _, timeline, sorted_masks = self._merge_tail(chunk)
+        self._update_tail(timeline, devices, sorted_masks)
+
+    def feed(self, chunk):
+        if chunk.empty or not self.engine.rules:
+            return pd.DataFrame()
+
+        n_tail = len(self._tail_ts)
+        chunk_devices, devices, uniques, timeline, sorted_masks = self._merge_tail(chunk)
+        is_new = timeline.order >= n_tail
+        keys = pd.Index(uniques).astype(str)
+
+        alert_frames = []
+        for i, rule in enumerate(self.engine.rules):
+            eligible = is_new
             if rule.dedup:
-                kept_indices = []
-                last_ts = None
-                dedup_delta = pd.to_timedelta(rule.dedup)
+                # 早于 "上次告警 + dedup" 的行不能再次告警
+                dedup_delta = pd.to_timedelta(rule.dedup).value
+                last = self.last_alert[i].reindex(keys, fill_value=np.iinfo(np.int64).min)
+                prior = np.concatenate([[np.iinfo(np.int64).min], last.to_numpy(dtype=np.int64)])
+                eligible = eligible & (timeline.ts - dedup_delta > prior[timeline.groups])
 
-                for ts in triggered_indices:
-                    if last_ts is None or (ts - last_ts) > dedup_delta:
-                        kept_indices.append(ts)
-                        last_ts = ts
+            triggered = self.engine.detect(rule, sorted_masks[:, i], timeline, eligible)
+            if not len(triggered):
+                continue
 
-                final_indices = kept_indices
-            else:
-                final_indices = triggered_indices
-
-            # 4. 创建告警对象
-            for ts in final_indices:
-                row = df.loc[ts]
-                # row 可能是 Series (单行) 或 DataFrame (重复索引)
-                # 为简单起见，假设索引唯一或取第一条
-                if isinstance(row, pd.DataFrame):
-                    row = row.iloc[0]
-
-                alert = {
-                    'timestamp': ts,
-                    'device_id': row.get('device_id', 'unknown'),
-                    'rule_name': rule.name,
-                    'severity': rule.severity,
-                    'message': rule.message,
-                    # 可选: 捕获相关数值？
-                    # 自动从表达式解析比较复杂，但很有价值。
-                }
-                all_alerts.append(alert)
-
-        return pd.DataFrame(all_alerts)
+            if rule.dedup:
+                self._update_last_alert(i, triggered, keys)
+
+            rows = triggered.order[np.lexsort((triggered.groups, triggered.ts))] - n_tail
+            alert_frames.append(make_alerts(rule, chunk.index[rows], chunk_devices[rows]))
+
+        self._update_tail(timeline, devices, sorted_masks)
+
+        if not alert_frames:
+            return pd.DataFrame()
+        return pd.concat(alert_frames, ignore_index=True)
+
+    def get_state(self):
+        """导出去重状态: {规则名: {device_id: 最后告警时间 (ISO 字符串)}}"""
+        state = {}
+        for rule, last in zip(self.engine.rules, self.last_alert):
+            if len(last):
+                state[rule.name] = {device: pd.Timestamp(ts).isoformat() for device, ts in last.items()}
+        return state
+
+    def set_state(self, state):
+        for i, rule in enumerate(self.engine.rules):
+            last = state.get(rule.name)
+            if last:
+                values = pd.to_datetime(list(last.values())).to_numpy(dtype='datetime64[ns]').view('i8')
+                self.last_alert[i] = pd.Series(values, index=[str(k) for k in last], dtype=np.int64)
+
+    def _update_last_alert(self, i, triggered, keys):
+        # triggered 按 (设备, 时间) 排序，每组最后一条即最新告警
+        ends = np.r_[triggered.group_starts()[1:], len(triggered)] - 1
+        groups = triggered.groups[ends]
+        valid = groups > 0  # 缺失的 device_id 不记录状态
+        update = pd.Series(triggered.ts[ends][valid], index=keys[groups[valid] - 1])
+
+        last = self.last_alert[i]
+        self.last_alert[i] = pd.concat([last[~last.index.isin(update.index)], update])
+
+    def _update_tail(self, timeline, devices, sorted_masks):
+        if self.max_window <= pd.Timedelta(0):
+            return
+
+        # 保留每台设备最新时间戳之前 max_window 内的行
+        starts = timeline.group_starts()
+        ends = np.r_[starts[1:], len(timeline)] - 1
+        latest = np.repeat(timeline.ts[ends], np.diff(np.r_[starts, len(timeline)]))
+        keep = timeline.ts > latest - self.max_window.value
+
+        self._tail_devices = devices[timeline.order[keep]]
+        self._tail_ts = timeline.ts[keep]
+        self._tail_masks = sorted_masks[keep]
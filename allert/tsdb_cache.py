@@ -0,0 +1,108 @@
+import hashlib
+import json
+import os
+
+import pandas as pd
+from loguru import logger
+
+from .data_loader import TSDB_TABLE, build_query
+from .tsdb_fetch import fetch_many, merge_frames
+
+# TDengine 查询结果的本地 Parquet 缓存
+# 目录结构: <root>/<查询键>/<设备>/<分区起点>.parquet
+#   查询键 = 数据源 + 表名 + SELECT 列 + WHERE 条件 规范化后的哈希 (query.json 中保存原文)
+#   设备   = equ_code，未按设备拆分时为 _all
+# 已封闭 (分区终点早于 now - settle) 的分区写入磁盘后不再查询；
+# 仍在写入的分区每次重新拉取，且不落盘。
+
+
+def _normalize_condition(cond):
+    return ' '.join(cond.split())
+
+
+def query_key(table=TSDB_TABLE, columns=None, where=None, source=''):
+    """规范化查询 (数据源、表、列集合、条件集合) 并返回 (键, 规范化描述)"""
+    conditions = [] if not where else ([where] if isinstance(where, str) else list(where))
+    spec = {
+        # 只保留 host:port，不把账号密码写入 query.json
+        'source': source.split('@')[-1],
+        'table': table.lower(),
+        'columns': sorted(columns) if columns else '*',
+        'where': sorted(_normalize_condition(c) for c in conditions),
+    }
+    digest = hashlib.sha1(json.dumps(spec, ensure_ascii=False, sort_keys=True).encode('utf-8')).hexdigest()
+    return digest[:16], spec
+
+
+class ParquetCache:
+    """按时间分区缓存 TDengine 查询结果"""
+
+    def __init__(self, root, source='', partition='1D', settle='10m'):
+        import pyarrow  # noqa: F401  缺少 Parquet 引擎时尽早报错
+        self.root = root
+        self.source = source
+        self.partition = pd.tseries.frequencies.to_offset(partition)
+        self.settle = pd.to_timedelta(settle)
+
+    def partitions(self, start, end):
+        """覆盖 [start, end) 的分区起止时间列表"""
+        first = pd.Timestamp(start).floor(self.partition)
+        last = max(pd.Timestamp(end).ceil(self.partition), first + self.partition)
+        edges = pd.date_range(first, last, freq=self.partition)
+        return list(zip(edges[:-1], edges[1:]))
+
+    def _path(self, key, device, part_start):
+        return os.path.join(self.root, key, device or '_all', part_start.strftime('%Y%m%dT%H%M%S') + '.parquet')
+
+    def _write_spec(self, key, spec):
+        path = os.path.join(self.root, key, 'query.json')
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(spec, f, ensure_ascii=False, indent=2)
+
+    def _write(self, path, df):
+        # 先写临时文件再替换，避免中断时留下不完整的分区
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # 临时文件名带进程号，多个进程同时填充同一分区时互不覆盖
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        df.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, path)
+
+    def load(self, connect, start, end, table=TSDB_TABLE, columns=None, where=None, devices=None, workers=4):
+        """返回 [start, end) 的原始查询结果 (未标准化)，只拉取缺失或仍在写入的分区"""
+        key, spec = query_key(table, columns, where, self.source)
+        self._write_spec(key, spec)
+        base_where = [] if not where else ([where] if isinstance(where, str) else list(where))
+        partitions = self.partitions(start, end)
+        # 与分区边界使用同一时区 (start 不带时区时为本地时间)
+        closed_before = pd.Timestamp.now(tz=partitions[0][0].tz) - self.settle
+
+        frames = {}
+        missing = []
+        for part_start, part_end in partitions:
+            for device in (devices or [None]):
+                path = self._path(key, device, part_start)
+                if part_end <= closed_before and os.path.exists(path):
+                    frames[path] = pd.read_parquet(path)
+                    continue
+                conditions = base_where + ([f"equ_code = '{device}'"] if device else [])
+                sql = build_query(table, columns, part_start, part_end, conditions)
+                missing.append((path, part_end <= closed_before, sql))
+
+        logger.info(f"TSDB cache {key}: {len(frames)} partitions from disk, {len(missing)} to fetch")
+        if missing:
+            fetched = fetch_many(connect, [sql for _, _, sql in missing], workers)
+            for (path, closed, _), df in zip(missing, fetched):
+                if closed:
+                    self._write(path, df)
+                frames[path] = df
+
+        df = merge_frames([frames[p] for p in sorted(frames)])
+        if 'ts' in df.columns and not df.empty:
+            ts = pd.to_datetime(df['ts'])
+            lo, hi = pd.Timestamp(start), pd.Timestamp(end)
+            if ts.dt.tz is not None:
+                lo, hi = lo.tz_localize(ts.dt.tz), hi.tz_localize(ts.dt.tz)
+            df = df[(ts >= lo) & (ts < hi)].reset_index(drop=True)
+        return df
@@ -0,0 +1,315 @@
+import itertools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+# TDengine 结果集的列式读取
+# taosws 的游标只提供按行的元组，这里按块 (fetchmany) 读取后立即按列转换为
+# 类型化的 NumPy 数组，不再经过 pandas 对 "元组列表" 的逐单元格类型推断:
+#   TIMESTAMP -> datetime64[ns]
+#   DOUBLE    -> float64 (可选 float32)
+#   FLOAT     -> float32
+#   整数       -> int64 (含 NULL 时为 float64)
+#   BOOL      -> bool (含 NULL 时为 float64)
+#   NCHAR/VARCHAR/BINARY (标签) -> category
+
+DEFAULT_BLOCK_ROWS = 65536
+
+_STRING_TYPES = ('NCHAR', 'VARCHAR', 'BINARY', 'JSON', 'GEOMETRY', 'VARBINARY')
+_INT_TYPES = ('TINYINT', 'SMALLINT', 'INT', 'BIGINT')
+
+
+def _type_name(description_item):
+    # DB-API description: (name, type_code, ...)；不同版本的 taosws 中 type_code 可能是字符串或整数
+    if len(description_item) > 1 and isinstance(description_item[1], str):
+        return description_item[1].upper()
+    return None
+
+
+def _column_kind(name, type_name, sample):
+    if type_name:
+        if 'TIMESTAMP' in type_name:
+            return 'ts'
+        if type_name.startswith(_STRING_TYPES):
+            return 'str'
+        if type_name == 'FLOAT':
+            return 'float32'
+        if type_name == 'DOUBLE':
+            return 'float'
+        if type_name.startswith(_INT_TYPES):
+            return 'int'
+        if type_name == 'BOOL':
+            return 'bool'
+    # 无类型信息时按列名与首个非空值推断
+    if name == 'ts' or name == '_wstart':
+        return 'ts'
+    if isinstance(sample, str):
+        return 'str'
+    if isinstance(sample, (bool, np.bool_)):
+        return 'bool'
+    if isinstance(sample, (int, np.integer)):
+        return 'int'
+    if isinstance(sample, (float, np.floating)):
+        return 'float'
+    return 'object'
+
+
+def _has_null(values):
+    # 对象数组上 pd.isna 在 C 层逐元素判断，不经过 Python 循环
+    return bool(pd.isna(values).any())
+
+
+def _convert_column(values, kind):
+    if kind == 'ts':
+        # 返回 DatetimeIndex 以保留可能存在的时区信息
+        return pd.DatetimeIndex(pd.to_datetime(values))
+    if kind in ('int', 'bool'):
+        # 含 NULL 时为 float64 (NaN)，与 pandas 读取整数列的约定一致
+        if _has_null(values):
+            return _to_float(values, np.float64)
+        return values.astype(np.int64 if kind == 'int' else np.bool_)
+    return values
+
+
+def _to_float(values, dtype):
+    # 列序 (F) 存储，保证取出的每一列都是连续内存
+    try:
+        return values.astype(dtype, order='F')
+    except TypeError:
+        # 存在 NULL (None) 时先替换为 NaN
+        values = values.copy()
+        values[pd.isna(values)] = np.nan
+        return values.astype(dtype, order='F')
+
+
+def _concat(arrays):
+    if isinstance(arrays[0], pd.Index):
+        return arrays[0].append(arrays[1:])
+    return np.concatenate(arrays)
+
+
+def _object_matrix(rows, n_cols):
+    # 行元组展平后由 fromiter 直接填充对象矩阵，比 np.array(rows, dtype=object) 少一次形状推断
+    flat = itertools.chain.from_iterable(rows)
+    return np.fromiter(flat, dtype=object, count=len(rows) * n_cols).reshape(len(rows), n_cols)
+
+
+class FetchStats:
+    def __init__(self):
+        self.rows = 0
+        self.bytes = 0
+        self.seconds = 0.0
+
+    @property
+    def rows_per_s(self):
+        return self.rows / self.seconds if self.seconds else 0.0
+
+    @property
+    def mb_per_s(self):
+        return self.bytes / 1024 ** 2 / self.seconds if self.seconds else 0.0
+
+    def log(self, label='Fetched'):
+        logger.info(f"{label} {self.rows} rows, {self.bytes / 1024 ** 2:.2f} MB in {self.seconds:.2f}s "
+                    f"({self.rows_per_s:,.0f} rows/s, {self.mb_per_s:.2f} MB/s)")
+
+
+class ColumnarFetcher:
+    """按块读取游标结果，转换为列式 NumPy 数组"""
+
+    def __init__(self, cursor, block_rows=DEFAULT_BLOCK_ROWS, float_dtype=np.float64):
+        self.cursor = cursor
+        self.block_rows = block_rows
+        self.float_dtype = float_dtype
+        self.fields = [field[0] for field in cursor.description]
+        self.type_names = [_type_name(field) for field in cursor.description]
+        self.kinds = None
+        # 没有类型信息且到目前为止全为 NULL 的列，在后续块中继续推断
+        self.unresolved = set()
+        # 推断结果晚于首块确定的列，fetch_frame 合并后整列重新转换
+        self.late = set()
+        self.float_groups = {}
+        self.stats = FetchStats()
+
+    def _resolve_kinds(self, rows):
+        if self.kinds is None:
+            self.kinds = [None] * len(self.fields)
+            pending = range(len(self.fields))
+        else:
+            pending = sorted(self.unresolved)
+        for i in pending:
+            name, type_name = self.fields[i], self.type_names[i]
+            sample = next((row[i] for row in rows if row[i] is not None), None)
+            kind = _column_kind(name, type_name, sample)
+            if type_name is None and sample is None:
+                self.unresolved.add(i)
+            else:
+                if i in self.unresolved:
+                    self.unresolved.discard(i)
+                    self.late.add(i)
+            self.kinds[i] = kind
+
+        # 浮点列按目标类型分组，每组一次性转换
+        self.float_groups = {}
+        for i, kind in enumerate(self.kinds):
+            if kind == 'float':
+                self.float_groups.setdefault(np.dtype(self.float_dtype), []).append(i)
+            elif kind == 'float32':
+                self.float_groups.setdefault(np.dtype(np.float32), []).append(i)
+
+    def _convert_block(self, rows):
+        block = {}
+        # 整块只拷贝一次对象指针，随后数值列以二维切片一次性转换为类型化数组，
+        # 不再逐单元格经过 pandas 的对象推断
+        matrix = _object_matrix(rows, len(self.fields))
+        for dtype, idx in self.float_groups.items():
+            floats = _to_float(matrix[:, idx], dtype)
+            for j, i in enumerate(idx):
+                block[self.fields[i]] = floats[:, j]
+        for i, (name, kind) in enumerate(zip(self.fields, self.kinds)):
+            if name not in block:
+                block[name] = _convert_column(matrix[:, i], kind)
+        return block
+
+    def iter_blocks(self):
+        """逐块产出 {列名: 数组}"""
+        while True:
+            start = time.perf_counter()
+            rows = self.cursor.fetchmany(self.block_rows)
+            if not rows:
+                break
+            if self.kinds is None or self.unresolved:
+                self._resolve_kinds(rows)
+            block = self._convert_block(rows)
+
+            self.stats.rows += len(rows)
+            self.stats.bytes += sum(arr.nbytes for arr in block.values())
+            self.stats.seconds += time.perf_counter() - start
+            yield block
+
+    def _to_frame(self, columns):
+        columns = dict(columns)
+        for name, kind in zip(self.fields, self.kinds or []):
+            if kind == 'str':
+                # 直接由对象数组构造 Categorical，避免先推断为字符串列再转换
+                columns[name] = pd.Categorical(columns[name])
+        return pd.DataFrame(columns, columns=self.fields, copy=False)
+
+    def iter_frames(self):
+        for block in self.iter_blocks():
+            yield self._to_frame(block)
+
+    def fetch_frame(self):
+        blocks = list(self.iter_blocks())
+        if not blocks:
+            return pd.DataFrame(columns=self.fields)
+        start = time.perf_counter()
+        columns = {name: _concat([b[name] for b in blocks]) for name in self.fields}
+        for i in self.late:
+            # 首块中全为 NULL 的列，按后续块推断的类型整列转换
+            name, kind = self.fields[i], self.kinds[i]
+            values = np.asarray(columns[name], dtype=object)
+            if kind in ('float', 'float32'):
+                columns[name] = _to_float(values, np.float32 if kind == 'float32' else self.float_dtype)
+            else:
+                columns[name] = _convert_column(values, kind)
+        df = self._to_frame(columns)
+        self.stats.seconds += time.perf_counter() - start
+        return df
+
+
+def fetch_frame(cursor, block_rows=DEFAULT_BLOCK_ROWS, float_dtype=np.float64):
+    """读取整个结果集为 DataFrame，并记录吞吐量"""
+    fetcher = ColumnarFetcher(cursor, block_rows, float_dtype)
+    df = fetcher.fetch_frame()
+    fetcher.stats.log()
+    return df
+
+
+def iter_frames(cursor, block_rows=DEFAULT_BLOCK_ROWS, float_dtype=np.float64):
+    """逐块读取结果集，每块一个 DataFrame，结束时记录吞吐量"""
+    fetcher = ColumnarFetcher(cursor, block_rows, float_dtype)
+    yield from fetcher.iter_frames()
+    fetcher.stats.log()
+
+
+def split_time_range(start, end, n_shards):
+    """把 [start, end) 等分为 n_shards 个左闭右开的时间段"""
+    edges = pd.date_range(pd.Timestamp(start), pd.Timestamp(end), periods=max(int(n_shards), 1) + 1)
+    return list(zip(edges[:-1], edges[1:]))
+
+
+def merge_frames(frames):
+    """合并各分片结果并按 ts 排序 (稳定排序，同一时刻保持分片顺序)"""
+    non_empty = [df for df in frames if not df.empty]
+    if not non_empty:
+        return frames[0] if frames else pd.DataFrame()
+    if len(non_empty) == 1:
+        df = non_empty[0]
+    else:
+        categorical = [name for name in non_empty[0].columns
+                       if isinstance(non_empty[0][name].dtype, pd.CategoricalDtype)]
+        df = pd.concat(non_empty, ignore_index=True)
+        # 各分片的类别集合不同，合并后会退化为 object
+        for name in categorical:
+            df[name] = df[name].astype('category')
+    if 'ts' in df.columns:
+        df = df.sort_values('ts', kind='stable', ignore_index=True)
+    return df
+
+
+def fetch_many(connect, queries, workers=4, block_rows=DEFAULT_BLOCK_ROWS, float_dtype=np.float64):
+    """在有界连接池上并行执行多个查询，按查询顺序返回各自的 DataFrame
+
+    connect 为无参的连接工厂时，每个工作线程持有一个 taosws 连接并在查询之间复用，
+    同时打开的连接数不超过 workers，结束时全部关闭；
+    connect 为共享连接池 (allert.tsdb_pool.ConnectionPool) 时，每个查询从池中借用连接，用完归还。
+    """
+    local = threading.local()
+    connections = []
+    lock = threading.Lock()
+    pooled = hasattr(connect, 'connection')
+
+    def execute(conn, sql):
+        cursor = conn.cursor()
+        try:
+            cursor.execute(sql)
+            fetcher = ColumnarFetcher(cursor, block_rows, float_dtype)
+            return fetcher.fetch_frame(), fetcher.stats
+        finally:
+            cursor.close()
+
+    def run(sql):
+        if pooled:
+            with connect.connection() as conn:
+                return execute(conn, sql)
+        conn = getattr(local, 'conn', None)
+        if conn is None:
+            conn = local.conn = connect()
+            with lock:
+                connections.append(conn)
+        return execute(conn, sql)
+
+    start = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=max(min(workers, len(queries)), 1)) as pool:
+            results = list(pool.map(run, queries))
+    finally:
+        for conn in connections:
+            conn.close()
+
+    stats = FetchStats()
+    stats.rows = sum(s.rows for _, s in results)
+    stats.bytes = sum(s.bytes for _, s in results)
+    stats.seconds = time.perf_counter() - start
+    label = 'a shared pool' if pooled else f'{len(connections)} connections'
+    stats.log(f"Fetched {len(queries)} queries on {label}:")
+    return [frame for frame, _ in results]
+
+
+def fetch_sharded(connect, queries, workers=4, block_rows=DEFAULT_BLOCK_ROWS, float_dtype=np.float64):
+    """并行执行分片查询，按 ts 合并为一个 DataFrame"""
+    return merge_frames(fetch_many(connect, queries, workers, block_rows, float_dtype))
@@ -0,0 +1,237 @@
+import atexit
+import threading
+import time
+from contextlib import contextmanager
+
+import pandas as pd
+from loguru import logger
+
+# 进程级 taosws 连接池
+#   get_pool(dsn) 按 DSN 返回同一个连接池，CLI 加载器与 Streamlit 各会话共享
+#   会话复用: 空闲连接记录当前数据库，优先取出已 USE 目标库的连接，避免每次查询重复 USE
+#   健康检查: 空闲超过 health_check 或上次使用中出错的连接，取出前先执行 SELECT SERVER_STATUS()
+#   空闲回收: 空闲超过 max_idle 的连接被关闭
+#   统计:     hits (复用空闲连接) / misses (新建连接) / 等待次数与等待时间 等，见 stats()
+
+HEALTH_CHECK_SQL = 'SELECT SERVER_STATUS()'
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+class _Session:
+    __slots__ = ('conn', 'database', 'created', 'last_used', 'suspect')
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.database = None
+        self.created = self.last_used = time.monotonic()
+        self.suspect = False
+
+
+def _close(conn):
+    try:
+        conn.close()
+    except Exception as e:
+        logger.debug(f"Error closing TDengine connection: {e}")
+
+
+class ConnectionPool:
+    """线程安全的 taosws 连接池，同时打开的连接不超过 max_size"""
+
+    def __init__(self, dsn, max_size=8, max_idle='5m', health_check='30s', timeout=30, connect=None):
+        self.dsn = dsn
+        self.max_size = max_size
+        self.max_idle = pd.to_timedelta(max_idle).total_seconds()
+        self.health_check = pd.to_timedelta(health_check).total_seconds()
+        self.timeout = timeout
+        self._connect = connect or self._taosws_connect
+        self._idle = []
+        self._size = 0
+        self._cond = threading.Condition()
+        self._stats = {'hits': 0, 'misses': 0, 'db_switches': 0, 'health_checks': 0, 'broken': 0,
+                       'evicted': 0, 'waits': 0, 'wait_seconds': 0.0, 'max_wait_seconds': 0.0}
+
+    def _taosws_connect(self):
+        import taosws
+        return taosws.connect(self.dsn)
+
+    def _evict_idle(self, now):
+        # 调用方持有锁
+        keep = []
+        for session in self._idle:
+            if now - session.last_used > self.max_idle:
+                _close(session.conn)
+                self._size -= 1
+                self._stats['evicted'] += 1
+            else:
+                keep.append(session)
+        self._idle = keep
+
+    def _take_idle(self, database):
+        # 调用方持有锁；优先取当前库相同且最近使用的连接
+        best = None
+        for i, session in enumerate(self._idle):
+            if database is None or session.database == database:
+                best = i
+        if best is None and self._idle:
+            best = len(self._idle) - 1
+        return None if best is None else self._idle.pop(best)
+
+    def _healthy(self, session):
+        cursor = None
+        try:
+            cursor = session.conn.cursor()
+            cursor.execute(HEALTH_CHECK_SQL)
+            cursor.fetchall()
+            return True
+        except Exception as e:
+            logger.warning(f"Dropping unhealthy TDengine connection: {e}")
+            return False
+        finally:
+            if cursor is not None:
+                try:
+                    cursor.close()
+                except Exception:
+                    pass
+
+    def acquire(self, database=None, timeout=None):
+        """取出一个连接 (已 USE database)，用完必须 release"""
+        timeout = self.timeout if timeout is None else timeout
+        start = time.monotonic()
+        waited = False
+        while True:
+            with self._cond:
+                self._evict_idle(time.monotonic())
+                session = self._take_idle(database)
+                create = session is None and self._size < self.max_size
+                if create:
+                    self._size += 1
+                elif session is None:
+                    remaining = timeout - (time.monotonic() - start)
+                    if remaining <= 0:
+                        raise PoolTimeout(f"No TDengine connection available within {timeout}s "
+                                          f"({self.max_size} in use)")
+                    waited = True
+                    self._cond.wait(remaining)
+                    continue
+
+            if create:
+                try:
+                    session = _Session(self._connect())
+                except Exception:
+                    with self._cond:
+                        self._size -= 1
+                        self._cond.notify()
+                    raise
+            elif session.suspect or time.monotonic() - session.last_used > self.health_check:
+                self._count('health_checks')
+                if not self._healthy(session):
+                    self._discard(session)
+                    continue
+                session.suspect = False
+
+            try:
+                if database and session.database != database:
+                    cursor = session.conn.cursor()
+                    cursor.execute(f'USE {database}')
+                    cursor.close()
+                    session.database = database
+                    self._count('db_switches')
+            except Exception:
+                self._discard(session)
+                raise
+
+            wait = time.monotonic() - start if waited else 0.0
+            with self._cond:
+                self._stats['hits' if not create else 'misses'] += 1
+                if waited:
+                    self._stats['waits'] += 1
+                    self._stats['wait_seconds'] += wait
+                    self._stats['max_wait_seconds'] = max(self._stats['max_wait_seconds'], wait)
+            return session
+
+    def release(self, session, failed=False):
+        """归还连接；failed 时下次取出前先做健康检查"""
+        session.last_used = time.monotonic()
+        session.suspect = session.suspect or failed
+        with self._cond:
+            self._idle.append(session)
+            self._cond.notify()
+
+    def _discard(self, session):
+        _close(session.conn)
+        with self._cond:
+            self._size -= 1
+            self._stats['broken'] += 1
+            self._cond.notify()
+
+    def _count(self, name):
+        with self._cond:
+            self._stats[name] += 1
+
+    @contextmanager
+    def connection(self, database=None, timeout=None):
+        """with pool.connection('station_data') as conn: ..."""
+        session = self.acquire(database, timeout)
+        failed = False
+        try:
+            yield session.conn
+        except GeneratorExit:
+            # 外层生成器被提前关闭，连接本身无异常
+            raise
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            self.release(session, failed)
+
+    def stats(self):
+        with self._cond:
+            stats = dict(self._stats)
+            stats['open'] = self._size
+            stats['idle'] = len(self._idle)
+        stats['in_use'] = stats['open'] - stats['idle']
+        requests = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / requests if requests else 0.0
+        stats['avg_wait_ms'] = stats['wait_seconds'] / stats['waits'] * 1000 if stats['waits'] else 0.0
+        return stats
+
+    def log_stats(self):
+        s = self.stats()
+        logger.info(f"TDengine pool {self.dsn.split('@')[-1]}: {s['hits']} hits / {s['misses']} misses "
+                    f"({s['hit_rate']:.0%}), {s['db_switches']} USE, {s['waits']} waits "
+                    f"(avg {s['avg_wait_ms']:.1f} ms, max {s['max_wait_seconds'] * 1000:.1f} ms), "
+                    f"{s['broken']} broken, {s['evicted']} evicted, {s['open']} open")
+
+    def close(self):
+        """关闭全部空闲连接 (使用中的连接归还后仍会进入空闲列表)"""
+        with self._cond:
+            idle, self._idle = self._idle, []
+            self._size -= len(idle)
+        for session in idle:
+            _close(session.conn)
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(dsn, **kwargs):
+    """进程内按 DSN 共享的连接池；首次创建时的参数生效"""
+    with _pools_lock:
+        pool = _pools.get(dsn)
+        if pool is None:
+            pool = _pools[dsn] = ConnectionPool(dsn, **kwargs)
+        return pool
+
+
+@atexit.register
+def _close_pools():
+    with _pools_lock:
+        pools = list(_pools.values())
+    for pool in pools:
+        if pool.stats()['hits'] + pool.stats()['misses']:
+            pool.log_stats()
+        pool.close()
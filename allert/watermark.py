@@ -0,0 +1,75 @@
+import json
+import os
+
+import pandas as pd
+from loguru import logger
+
+
+class WatermarkStore:
+    """持久化的增量轮询状态
+
+    - watermarks: 每台设备已处理的最大 ts (高水位)，键为 str(device_id)，与 JSON 中的键一致
+    - last_alert: 规则去重状态，重启后不会重复告警
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.watermarks = {}
+        self.last_alert = {}
+        if os.path.exists(path):
+            self.load()
+
+    def load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except Exception as e:
+            logger.error(f"Failed to load watermark state from {self.path}: {e}")
+            return
+        self.watermarks = {k: pd.Timestamp(v) for k, v in state.get('watermarks', {}).items()}
+        self.last_alert = state.get('last_alert', {})
+        logger.info(f"Loaded watermarks for {len(self.watermarks)} devices from {self.path}")
+
+    def save(self):
+        state = {
+            'watermarks': {k: v.isoformat() for k, v in self.watermarks.items()},
+            'last_alert': self.last_alert,
+        }
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        # 先写临时文件再替换，避免进程中断时损坏状态文件
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def lower_bound(self, max_lag=None):
+        """本次轮询的起点: 活跃设备中最小的水位
+
+        落后最新水位超过 max_lag 的设备 (例如已停机) 不参与计算，避免一直重复扫描旧数据。
+        """
+        if not self.watermarks:
+            return None
+        marks = pd.Series(self.watermarks)
+        if max_lag is not None:
+            marks = marks[marks >= marks.max() - max_lag]
+        return marks.min()
+
+    def split(self, df):
+        """按设备水位拆分: 返回 (已处理过的历史行, 新行)"""
+        if not self.watermarks or 'device_id' not in df.columns:
+            return df.iloc[:0], df
+        marks = pd.to_datetime(df['device_id'].astype(str).map(self.watermarks)).to_numpy()
+        # 没有水位的设备 (NaT) 比较结果为 False，全部视为新行
+        seen = df.index.to_numpy() <= marks
+        return df[seen], df[~seen]
+
+    def advance(self, df):
+        if df.empty or 'device_id' not in df.columns:
+            return
+        latest = df.index.to_series().groupby(df['device_id'].to_numpy()).max()
+        for device, ts in latest.items():
+            # CSV 输入等场景下 equ_code 可能是整数，统一按字符串保存，重启后仍能匹配
+            device = str(device)
+            current = self.watermarks.get(device)
+            if current is None or ts > current:
+                self.watermarks[device] = ts
@@ -14,8 +14,9 @@ from plus.memory import init_dialog_state, get_persistent_memory, set_persistent
 from plus.context import parse_query_slots, merge_with_memory
 from plus.mapping import load_mapping, get_relevant_columns
 from plus.llm import build_schema_info, generate_sql
-from plus.db import execute_query
-from plus.ui import render_sidebar, show_applied_context, render_chart, inject_history_js
+from plus.db import paged_query, downsample_query
+from plus.paging import SessionMemory
+from plus.ui import render_sidebar, show_applied_context, render_result, inject_history_js
 
 st.set_page_config(page_title="光伏数据 AI 助手 Plus", page_icon="☀️", layout="wide")
 if "messages" not in st.session_state:
@@ -39,19 +40,24 @@ database = "station_data"
 
 mapping = load_mapping()
 
+# 本会话已加载查询结果的内存上限 (MB)
+if "result_memory" not in st.session_state:
+    st.session_state.result_memory = SessionMemory(config.get("session_memory_mb", 256))
+result_memory = st.session_state.result_memory
+
 st.title("☀️ 光伏场站数据智能助手 Plus")
 st.markdown(
     "直接输入问题，例如：*“查询 F01 设备 2026-01-28 一整天的发电机有功功率 曲线”* 或 *“查询 gtjjlfgdzf 2026-01-28 一整天的风速, 线图”*")
 
-for msg in st.session_state.messages:
+for i, msg in enumerate(st.session_state.messages):
     with st.chat_message(msg.get("role", "assistant")):
         st.markdown(msg.get("content", ""))
+        if msg.get("note"):
+            st.info(msg["note"])
         if "sql" in msg:
             st.code(msg["sql"], language="sql")
-        if "data" in msg:
-            df = msg["data"]
-            st.dataframe(df)
-            render_chart(df, msg.get("chart_type", "line"))
+        if "result" in msg:
+            render_result(msg["result"], msg.get("chart_type", "line"), i, result_memory)
 
 if prompt := st.chat_input("请输入您的问题..."):
     # Print user query to console
@@ -71,7 +77,16 @@ if prompt := st.chat_input("请输入您的问题..."):
     # Print generated SQL to console
     print(f"\n[Generated SQL]:\n{sql}\n{'-'*50}")
 
-    df = execute_query(sql, td_host, td_port, td_user, td_pass, database, mapping)
+    # 明细行数超过图表点数上限时改写为窗口聚合
+    sql, downsample_note = downsample_query(sql, td_host, td_port, td_user, td_pass, database,
+                                            config.get("point_budget", 5000))
+    if downsample_note:
+        print(f"[Downsampled SQL]:\n{sql}\n{'-'*50}")
+
+    # 总行数受 LIMIT 约束 (缺失时注入，过大时截断)，首页立即读取，其余按需加载
+    result = paged_query(sql, td_host, td_port, td_user, td_pass, database, mapping,
+                         config.get("page_rows", 10_000), config.get("max_rows", 1_000_000))
+    result_memory.fetch(result)
 
     # Determine chart type
     chart_type = "line"
@@ -82,15 +97,17 @@ if prompt := st.chat_input("请输入您的问题..."):
 
     with st.chat_message("assistant"):
         show_applied_context(context)
+        if downsample_note:
+            st.info(downsample_note)
         st.code(sql, language="sql")
-        st.dataframe(df)
-        render_chart(df, chart_type)
+        render_result(result, chart_type, len(st.session_state.messages), result_memory)
 
     st.session_state.messages.append({
         "role": "assistant",
         "content": "查询完成。",
         "sql": sql,
-        "data": df,
+        "note": downsample_note,
+        "result": result,
         "chart_type": chart_type
     })
     config = maybe_summarize_history(load_config(), api_key, base_url, model_name)
@@ -0,0 +1,55 @@
+import time
+
+import click
+import numpy as np
+import pandas as pd
+
+from .downsample import downsample_frame
+
+# Plus 性能基准测试 (不依赖 Streamlit)
+# 用法: python -m plus.benchmark <command>
+
+
+@click.group()
+def cli():
+    pass
+
+
+def _timeit(func, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+@cli.command()
+@click.option('--points', default=10_000_000, help='Points per series')
+@click.option('--series', default=1, help='Number of numeric series')
+@click.option('--max-points', default=2000, help='Points kept per series')
+def downsample(points, series, max_points):
+    """Time LTTB and min/max-envelope chart downsampling (plus.downsample)"""
+    rng = np.random.default_rng(0)
+    index = pd.date_range('2026-01-01', periods=points, freq='s')
+    # 随机游走 + 偶发尖峰
+    values = np.cumsum(rng.standard_normal((points, series)), axis=0)
+    values[rng.integers(0, points, points // 100_000 + 1)] += 50
+    df = pd.DataFrame(values, index=index, columns=[f's{i}' for i in range(series)])
+    payload = df.memory_usage(index=True).sum() / 1024 ** 2
+    print(f"{points:,} points x {series} series ({payload:.0f} MB)")
+    for method in ('lttb', 'minmax'):
+        result = [None]
+
+        def run():
+            result[0] = downsample_frame(df, max_points, method)
+
+        elapsed = _timeit(run)
+        kept = result[0]
+        spike_kept = np.isclose(kept.to_numpy().max(axis=0), df.max().to_numpy()).all()
+        print(f"{method:7s} {elapsed * 1000:8.1f} ms ({points * series / elapsed / 1e6:,.0f} M points/s), "
+              f"{len(kept):,} rows kept, max preserved: {spike_kept}")
+
+
+if __name__ == '__main__':
+    cli()
@@ -0,0 +1,118 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+
+import pandas as pd
+
+# 查询结果缓存 (进程内，所有 Streamlit 会话共享)
+#   键:   连接 + 数据库 + 规范化后的 SQL (字符串常量外的空白合并、转小写、去掉结尾分号)
+#   TTL:  查询范围已结束 (时间上界早于 now - settle) 的结果不会再变化，缓存 closed_ttl；
+#         引用 NOW/TODAY 或没有时间上界的查询缓存 live_ttl
+#   容量: 按 DataFrame 内存占用累计，超过 max_mb 时淘汰最久未使用的结果
+
+STRING_LITERAL = re.compile(r"('(?:[^']|'')*'|\"(?:[^\"]|\"\")*\")")
+_LIVE = re.compile(r"\bnow\b|\btoday\s*\(")
+# 时间上界: ts < '...' / ts <= '...' / ts = '...' / BETWEEN '...' AND '...'
+_UPPER_BOUND = re.compile(r"(?:<=?|(?<![<>!])=|\band)\s*'(\d{4}-\d{2}-\d{2}[^']*)'")
+
+
+def normalize_sql(sql):
+    parts = STRING_LITERAL.split(sql.strip().rstrip(';').strip())
+    out = []
+    for i, part in enumerate(parts):
+        # 奇数位为字符串常量，保持原样
+        out.append(part if i % 2 else re.sub(r"\s+", " ", part).lower())
+    return "".join(out).strip()
+
+
+def query_end(normalized):
+    """查询的时间上界；引用 NOW/TODAY 或没有上界时返回 None"""
+    if _LIVE.search(STRING_LITERAL.sub("''", normalized)):
+        return None
+    ends = []
+    for value in _UPPER_BOUND.findall(normalized):
+        try:
+            ends.append(pd.Timestamp(value))
+        except ValueError:
+            pass
+    return max(ends) if ends else None
+
+
+class ResultCache:
+    def __init__(self, max_mb=256, live_ttl=30, closed_ttl=24 * 3600, settle="10m"):
+        self.max_bytes = int(max_mb * 1024 ** 2)
+        self.live_ttl = live_ttl
+        self.closed_ttl = closed_ttl
+        self.settle = pd.to_timedelta(settle)
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "expired": 0, "evicted": 0}
+
+    def key(self, source, database, sql):
+        return (source, database, normalize_sql(sql))
+
+    def ttl(self, key):
+        end = query_end(key[2])
+        if end is not None and end.tz_localize(None) < pd.Timestamp.now() - self.settle:
+            return self.closed_ttl
+        return self.live_ttl
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] < time.monotonic():
+                self._drop(key)
+                self._stats["expired"] += 1
+                entry = None
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+        # 浅拷贝: 调用方增删列不影响缓存中的结果
+        return entry[0].copy(deep=False)
+
+    def put(self, key, df):
+        size = int(df.memory_usage(index=True, deep=True).sum())
+        if size > self.max_bytes:
+            return
+        expires = time.monotonic() + self.ttl(key)
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (df, expires, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+                self._stats["evicted"] += 1
+
+    def _drop(self, key):
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats, entries=len(self._entries), mb=self._bytes / 1024 ** 2)
+        requests = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / requests if requests else 0.0
+        return stats
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_result_cache(**kwargs):
+    # 首次创建时的参数生效
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResultCache(**kwargs)
+        return _cache
@@ -1,22 +1,91 @@
 import taosws
 import pandas as pd
+from allert.tsdb_fetch import fetch_frame
+from allert.tsdb_pool import get_pool
+from .cache import get_result_cache
+from .rewrite import parse_raw_select, count_query, interval_for, downsample_sql
+from .paging import PagedQuery
+
+# 连接池与查询结果缓存在进程内共享，所有 Streamlit 会话复用同一组连接和缓存结果
+
+def _dsn(td_host, td_port, td_user, td_pass):
+    return f"taosws://{td_user}:{td_pass}@{td_host}:{td_port}"
 
 def get_db_connection(td_host, td_port, td_user, td_pass):
-    dsn = f"taosws://{td_user}:{td_pass}@{td_host}:{td_port}"
-    return taosws.connect(dsn)
-
-def execute_query(sql, td_host, td_port, td_user, td_pass, database, column_mapping):
-    conn = get_db_connection(td_host, td_port, td_user, td_pass)
-    cur = conn.cursor()
-    cur.execute(f"USE {database}")
-    cur.execute(sql)
-    fields = [f[0] for f in cur.description]
-    data = cur.fetchall()
-    cur.close()
-    conn.close()
-    df = pd.DataFrame(data, columns=fields)
+    return taosws.connect(_dsn(td_host, td_port, td_user, td_pass))
+
+def get_connection_pool(td_host, td_port, td_user, td_pass):
+    return get_pool(_dsn(td_host, td_port, td_user, td_pass))
+
+def pool_stats(td_host, td_port, td_user, td_pass):
+    return get_connection_pool(td_host, td_port, td_user, td_pass).stats()
+
+def cache_stats():
+    return get_result_cache().stats()
+
+def execute_query(sql, td_host, td_port, td_user, td_pass, database, column_mapping, use_cache=True):
+    cache = get_result_cache()
+    key = cache.key(f"{td_user}@{td_host}:{td_port}", database, sql)
+    if use_cache:
+        df = cache.get(key)
+        if df is not None:
+            return df
+    df = _run_query(sql, td_host, td_port, td_user, td_pass, database, column_mapping)
+    if use_cache:
+        cache.put(key, df)
+    return df
+
+def _run_query(sql, td_host, td_port, td_user, td_pass, database, column_mapping):
+    pool = get_connection_pool(td_host, td_port, td_user, td_pass)
+    # 借出的连接已 USE database；同一库的连续查询不再重复 USE
+    with pool.connection(database) as conn:
+        cur = conn.cursor()
+        try:
+            cur.execute(sql)
+            df = fetch_frame(cur)
+        finally:
+            cur.close()
     if column_mapping:
-        rename = {k: v for k, v in column_mapping.items() if k in df.columns}
+        rename = {}
+        for c in df.columns:
+            if c in column_mapping:
+                rename[c] = column_mapping[c]
+            elif c.endswith(("_min", "_max")) and c[:-4] in column_mapping:
+                # 降采样查询的包络列 (见 downsample_query)
+                rename[c] = f"{column_mapping[c[:-4]]}{c[-4:]}"
         if rename:
             df = df.rename(columns=rename)
     return df
+
+def paged_query(sql, td_host, td_port, td_user, td_pass, database, column_mapping,
+                page_rows=10_000, max_rows=1_000_000):
+    """按页读取的查询结果 (见 plus.paging)，每页单独经过结果缓存"""
+    def run(page_sql):
+        return execute_query(page_sql, td_host, td_port, td_user, td_pass, database, column_mapping)
+    return PagedQuery(sql, run, page_rows, max_rows)
+
+def downsample_query(sql, td_host, td_port, td_user, td_pass, database, point_budget=5000):
+    """单个序列行数超过 point_budget 的原始明细查询改写为 INTERVAL 聚合
+
+    先按序列 (选择的标签列) 分组执行 COUNT(*)，返回 (sql, 提示信息)；未改写时提示信息为 None。
+    带 LIMIT 的查询不改写。
+    """
+    parsed = parse_raw_select(sql)
+    if parsed is None or parsed["limit"] is not None:
+        return sql, None
+    stats = execute_query(count_query(parsed), td_host, td_port, td_user, td_pass, database, None)
+    if stats.empty:
+        return sql, None
+    counts = pd.to_numeric(stats.iloc[:, 0], errors="coerce").fillna(0)
+    per_series = int(counts.max())
+    if per_series <= point_budget:
+        return sql, None
+    span = (pd.Timestamp(stats.iloc[:, 2].max()) - pd.Timestamp(stats.iloc[:, 1].min())).total_seconds()
+    interval = interval_for(span, point_budget)
+    rewritten = downsample_sql(parsed, interval)
+    if rewritten is None:
+        return sql, None
+    series = f"{len(stats)} 个序列，" if len(stats) > 1 else ""
+    note = (f"查询结果约 {int(counts.sum()):,} 行 ({series}单个序列最多 {per_series:,} 行)，"
+            f"超过图表点数上限 {point_budget:,}，已按 {interval} 窗口降采样为平均值及最小/最大值包络。")
+    return rewritten, note
@@ -0,0 +1,99 @@
+import numpy as np
+import pandas as pd
+
+# 图表降采样 (客户端，绘图前逐个数值序列执行)
+#   lttb:   Largest-Triangle-Three-Buckets，每个桶保留与前一选中点、后一桶均值构成三角形面积最大的点，
+#           保持曲线形状；桶均值用前缀和一次算出，桶内面积按 NumPy 向量计算
+#   minmax: 每个桶保留最小值与最大值点 (包络)，不丢失尖峰；等长桶 reshape 后按行 argmin/argmax
+# 两者都返回所选点在原序列中的下标 (升序)，取回的都是真实数据点
+
+METHODS = ("lttb", "minmax")
+
+
+def lttb_indices(x, y, n_out):
+    """x 升序；返回 n_out 个点的下标 (含首尾点)"""
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=np.float64)
+    x = x - x[0]
+    y = np.asarray(y, dtype=np.float64)
+
+    # 首尾点固定，中间 n-2 个点均分为 n_out-2 个桶
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    counts = np.diff(edges)
+    cx = np.concatenate(([0.0], np.cumsum(x)))
+    cy = np.concatenate(([0.0], np.cumsum(y)))
+    avg_x = (cx[edges[1:]] - cx[edges[:-1]]) / counts
+    avg_y = (cy[edges[1:]] - cy[edges[:-1]]) / counts
+    # 第 i 个桶的参照点为第 i+1 个桶的均值，最后一个桶参照终点
+    next_x = np.append(avg_x[1:], x[-1])
+    next_y = np.append(avg_y[1:], y[-1])
+
+    out = np.empty(n_out, dtype=np.int64)
+    out[0], out[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        ax, ay = x[a], y[a]
+        # 三角形面积的 2 倍 (常数因子不影响 argmax)
+        area = np.abs((ax - next_x[i]) * (y[lo:hi] - ay) - (ax - x[lo:hi]) * (next_y[i] - ay))
+        a = lo + int(np.argmax(area))
+        out[i + 1] = a
+    return out
+
+
+def minmax_indices(y, n_out):
+    """每个桶的最小/最大值点及首尾点，共约 n_out 个下标"""
+    n = len(y)
+    if n_out >= n:
+        return np.arange(n)
+    y = np.asarray(y, dtype=np.float64)
+    size = -(-n // max(n_out // 2, 1))
+    m = n // size * size
+    body = y[:m].reshape(-1, size)
+    offsets = np.arange(0, m, size)
+    lo, hi = body, body
+    has_nan = np.isnan(y).any()
+    if has_nan:
+        lo = np.where(np.isnan(body), np.inf, body)
+        hi = np.where(np.isnan(body), -np.inf, body)
+    parts = [offsets + lo.argmin(axis=1), offsets + hi.argmax(axis=1), [0, n - 1]]
+    if m < n:
+        tail = y[m:]
+        parts.append([m + np.nanargmin(tail), m + np.nanargmax(tail)] if not np.isnan(tail).all() else [])
+    idx = np.unique(np.concatenate(parts).astype(np.int64))
+    # 全部为 NaN 的桶 argmin 落在 NaN 点上，与 NaN 首尾点一起去掉
+    return idx[~np.isnan(y[idx])] if has_nan else idx
+
+
+def series_indices(x, y, n_out, method="lttb"):
+    """单个序列的降采样下标；NaN 点不参与选择"""
+    y = np.asarray(y, dtype=np.float64)
+    valid = ~np.isnan(y)
+    if valid.all():
+        keep = np.arange(len(y))
+    else:
+        keep = np.flatnonzero(valid)
+        x, y = np.asarray(x)[keep], y[keep]
+    if method == "minmax":
+        return keep[minmax_indices(y, n_out)]
+    return keep[lttb_indices(x, y, n_out)]
+
+
+def downsample_frame(df, max_points=2000, method="lttb"):
+    """按时间索引升序的 DataFrame，每个数值列各自降采样后取下标并集，返回原始行的子集"""
+    if len(df) <= max_points:
+        return df
+    if method not in METHODS:
+        raise ValueError(f"Unknown downsampling method: {method}")
+    index = df.index
+    if isinstance(index, pd.DatetimeIndex):
+        x = index.asi8
+    elif pd.api.types.is_numeric_dtype(index):
+        x = index.to_numpy(dtype=np.float64)
+    else:
+        x = np.arange(len(df))
+    selected = [series_indices(x, df[col].to_numpy(dtype=np.float64, na_value=np.nan), max_points, method)
+                for col in df.columns]
+    return df.iloc[np.unique(np.concatenate(selected))]
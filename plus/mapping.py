@@ -1,22 +1,20 @@
-import json
 import os
 
+from allert.mapping_artifact import load_compiled_mapping
+
 def load_mapping():
+    # 读取编译后的映射表 (源文件未变化时不再解析 JSON)
     primary = "column_mapping.json"
     backup = "db_column_mapping.json"
     mapping = {}
-    if os.path.exists(primary):
-        try:
-            with open(primary, "r", encoding="utf-8") as f:
-                mapping = json.load(f)
-        except:
-            mapping = {}
-    if not mapping and os.path.exists(backup):
-        try:
-            with open(backup, "r", encoding="utf-8") as f:
-                mapping = json.load(f)
-        except:
-            mapping = {}
+    for path in (primary, backup):
+        if os.path.exists(path):
+            try:
+                mapping = load_compiled_mapping(path).forward
+            except Exception:
+                mapping = {}
+        if mapping:
+            break
     return mapping
 
 SYNONYMS_TO_KEYS = {
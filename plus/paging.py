@@ -0,0 +1,136 @@
+import pandas as pd
+
+from allert.tsdb_fetch import iter_frames
+from .rewrite import split_limit, limit_sql
+
+# 有界分页查询
+#   生成的 SQL 先拆出结尾的 LIMIT，总行数不超过 max_rows (原语句没有 LIMIT 时注入，超过时截断)；
+#   每页以 LIMIT page_rows OFFSET k 单独查询，首页立即返回，后续页在用户请求时再取。
+#   同一会话已加载的结果占用内存超过上限时，先释放最早的结果，仍超出则丢弃当前页并停止加载。
+#   不带 ORDER BY 的超级表查询在数据不变时按子表顺序返回，分页结果是稳定的。
+
+
+def frame_bytes(df):
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+class PagedQuery:
+    def __init__(self, sql, run, page_rows=10_000, max_rows=1_000_000):
+        self.sql = sql
+        # run(sql) -> DataFrame，例如绑定了连接参数的 plus.db.execute_query
+        self.run = run
+        self.page_rows = page_rows
+        self.base, limit, self.offset = split_limit(sql)
+        self.capped = limit is None or limit > max_rows
+        self.end = self.offset + (max_rows if self.capped else limit)
+        self.pages = []
+        self.done = False
+        self.released = False
+        self.memory_limited = False
+        self._frame = None
+
+    @property
+    def rows(self):
+        return sum(len(p) for p in self.pages)
+
+    @property
+    def nbytes(self):
+        return sum(frame_bytes(p) for p in self.pages)
+
+    @property
+    def frame(self):
+        if self._frame is None:
+            if not self.pages:
+                self._frame = pd.DataFrame()
+            elif len(self.pages) == 1:
+                self._frame = self.pages[0]
+            else:
+                self._frame = pd.concat(self.pages, ignore_index=True)
+        return self._frame
+
+    def next_sql(self):
+        start = self.offset + self.rows
+        return limit_sql(self.base, min(self.page_rows, self.end - start), start)
+
+    def fetch_next(self):
+        """读取下一页，返回该页 DataFrame；已读完时返回 None"""
+        if self.done:
+            return None
+        start = self.offset + self.rows
+        n = min(self.page_rows, self.end - start)
+        page = self.run(self.next_sql())
+        self.pages.append(page)
+        self._frame = None
+        self.released = False
+        if len(page) < n or start + len(page) >= self.end:
+            self.done = True
+        return page
+
+    def drop_last_page(self):
+        self.pages.pop()
+        self._frame = None
+
+    def release(self):
+        """释放已加载的数据，保留 SQL，之后可从首页重新加载"""
+        self.pages = []
+        self._frame = None
+        self.done = False
+        self.released = True
+        self.memory_limited = False
+
+    def status(self):
+        text = f"已加载 {self.rows:,} 行"
+        if self.memory_limited:
+            text += "，已达到会话内存上限，停止加载"
+        elif not self.done:
+            text += f"，每页 {self.page_rows:,} 行，可继续加载"
+        elif self.capped and self.offset + self.rows >= self.end:
+            text += f"，已达到单次查询 {self.end - self.offset:,} 行上限 (已自动添加 LIMIT)"
+        return text
+
+
+class SessionMemory:
+    """一个会话中所有分页结果的内存上限"""
+
+    def __init__(self, max_mb=256):
+        self.max_bytes = int(max_mb * 1024 ** 2)
+        self.results = []
+
+    @property
+    def used(self):
+        return sum(r.nbytes for r in self.results)
+
+    def clear(self):
+        self.results = []
+
+    def fetch(self, result):
+        if result not in self.results:
+            self.results.append(result)
+        page = result.fetch_next()
+        if page is None:
+            return None
+        # 先释放最早的其他结果
+        for other in self.results:
+            if self.used <= self.max_bytes:
+                break
+            if other is not result and other.pages:
+                other.release()
+        if self.used > self.max_bytes:
+            result.drop_last_page()
+            result.done = True
+            result.memory_limited = True
+            return None
+        return page
+
+
+def fetch_bounded(cursor, page_rows=10_000, max_bytes=256 * 1024 ** 2):
+    """按块读取游标结果，累计内存超过 max_bytes 时停止，返回 (DataFrame, 是否截断)"""
+    frames, total = [], 0
+    for df in iter_frames(cursor, block_rows=page_rows):
+        total += frame_bytes(df)
+        if total > max_bytes:
+            return (pd.concat(frames, ignore_index=True) if frames else df.iloc[:0]), True
+        frames.append(df)
+    if not frames:
+        return pd.DataFrame(columns=[d[0] for d in cursor.description]), False
+    return (frames[0] if len(frames) == 1 else pd.concat(frames, ignore_index=True)), False
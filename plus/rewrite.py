@@ -0,0 +1,141 @@
+import math
+import re
+
+from .cache import STRING_LITERAL
+
+# 超大图表查询的降采样改写
+#   只处理形如 SELECT ts, col1, col2 FROM t [WHERE ...] [ORDER BY ...] 的原始明细查询；
+#   已含聚合、窗口、GROUP BY/PARTITION BY、JOIN、UNION、LIMIT 或 SELECT * 的查询保持原样
+#   (LIMIT 限定的是部分明细行，改写为整个时间范围的聚合会改变查询含义)。
+#   选择了标签列 (equ_code 等) 时每个标签值为一个序列，点数预算按序列计算。
+#   改写为 SELECT _wstart, AVG(c) AS c, MIN(c) AS c_min, MAX(c) AS c_max ... INTERVAL(...)，
+#   窗口长度按 时间跨度 / 点数预算 向上取整到常用时间粒度。
+
+TAG_COLUMNS = ("equ_code", "station_code")
+
+_IDENT = re.compile(r"^`?([A-Za-z_]\w*)`?$")
+_SELECT = re.compile(r"^\s*select\s+(?P<cols>.+?)\s+from\s+(?P<table>[\w.`]+)(?P<rest>.*?)\s*;?\s*$",
+                     re.I | re.S)
+_CLAUSES = re.compile(r"^(?:\s+where\s+(?P<where>.+?))?"
+                      r"(?:\s+order\s+by\s+(?P<order>.+?))?"
+                      r"(?:\s+limit\s+(?P<limit>\d+)(?:\s*(?:,|offset)\s*\d+)?)?$", re.I | re.S)
+_UNSUPPORTED = re.compile(r"\b(interval|group\s+by|partition\s+by|join|union|state_window|session|"
+                          r"event_window|count_window|fill|slimit|soffset)\b", re.I)
+
+# 常用窗口粒度 (秒)
+_STEPS = [1, 2, 5, 10, 15, 30, 60, 120, 300, 600, 900, 1800, 3600, 7200, 10800, 21600, 43200, 86400]
+
+
+def _mask_literals(sql):
+    # 字符串常量替换为等长占位，按位置在原 SQL 上切片
+    return STRING_LITERAL.sub(lambda m: "'" + "_" * (len(m.group(0)) - 2) + "'", sql)
+
+
+def parse_raw_select(sql):
+    """解析原始明细查询，返回 {columns, table, where, order, limit}；无法安全改写时返回 None"""
+    masked = _mask_literals(sql)
+    m = _SELECT.match(masked)
+    if not m:
+        return None
+    rest = m.group("rest")
+    clauses = _CLAUSES.match(rest)
+    if not clauses or _UNSUPPORTED.search(masked[m.start("cols"):m.end("cols")] + rest):
+        return None
+
+    columns = []
+    for col in masked[m.start("cols"):m.end("cols")].split(","):
+        ident = _IDENT.match(col.strip())
+        if not ident:
+            return None
+        columns.append(ident.group(1))
+
+    offset = m.start("rest")
+
+    def part(name):
+        if clauses.group(name) is None:
+            return None
+        return sql[offset + clauses.start(name):offset + clauses.end(name)].strip()
+
+    return {
+        "columns": columns,
+        "table": m.group("table"),
+        "where": part("where"),
+        "order": part("order"),
+        "limit": int(clauses.group("limit")) if clauses.group("limit") else None,
+    }
+
+
+def series_tags(parsed):
+    return [c for c in parsed["columns"] if c.lower() in TAG_COLUMNS]
+
+
+def count_query(parsed):
+    """每个序列一行: COUNT(*), FIRST(ts), LAST(ts)"""
+    where = f" WHERE {parsed['where']}" if parsed["where"] else ""
+    tags = series_tags(parsed)
+    partition = f" PARTITION BY {', '.join(tags)}" if tags else ""
+    return f"SELECT COUNT(*), FIRST(ts), LAST(ts) FROM {parsed['table']}{where}{partition}"
+
+
+def interval_for(span_seconds, budget):
+    """每个序列不超过 budget 个窗口的最小常用粒度，如 '30s'、'5m'、'1h'、'2d'"""
+    step = max(span_seconds / max(budget, 1), 1)
+    seconds = next((s for s in _STEPS if s >= step), None)
+    if seconds is None:
+        return f"{math.ceil(step / 86400)}d"
+    for unit, size in (("d", 86400), ("h", 3600), ("m", 60)):
+        if seconds % size == 0:
+            return f"{seconds // size}{unit}"
+    return f"{seconds}s"
+
+
+def downsample_sql(parsed, interval):
+    """原始明细查询 -> 按 interval 聚合的 avg/min/max 查询；没有可聚合的数值列时返回 None"""
+    tags = series_tags(parsed)
+    values = [c for c in parsed["columns"] if c.lower() != "ts" and c.lower() not in TAG_COLUMNS]
+    if not values:
+        return None
+    select = ["_wstart"] + tags
+    for c in values:
+        select += [f"AVG({c}) AS {c}", f"MIN({c}) AS {c}_min", f"MAX({c}) AS {c}_max"]
+    sql = f"SELECT {', '.join(select)} FROM {parsed['table']}"
+    if parsed["where"]:
+        sql += f" WHERE {parsed['where']}"
+    if tags:
+        sql += f" PARTITION BY {', '.join(tags)}"
+    sql += f" INTERVAL({interval})"
+    if parsed["order"] and re.search(r"\bdesc\b", parsed["order"], re.I):
+        sql += " ORDER BY _wstart DESC"
+    return sql
+
+
+_TRAILING_LIMIT = re.compile(r"\s+limit\s+(\d+)(?:\s*,\s*(\d+)|\s+offset\s+(\d+))?\s*;?\s*$", re.I)
+_SLIMIT = re.compile(r"\b(slimit|soffset)\b", re.I)
+
+
+def split_limit(sql):
+    """拆出结尾的 LIMIT 子句，返回 (不含 LIMIT 的 SQL, limit, offset)；没有 LIMIT 时 limit 为 None"""
+    masked = _mask_literals(sql)
+    if _SLIMIT.search(masked):
+        # 含 SLIMIT/SOFFSET 时不改动原语句，分页在外层子查询上进行
+        return f"SELECT * FROM ({sql.strip().rstrip(';')})", None, 0
+    m = _TRAILING_LIMIT.search(masked)
+    if not m:
+        return sql.strip().rstrip(";").strip(), None, 0
+    base = sql[:m.start()].strip()
+    if m.group(2) is not None:
+        # LIMIT offset, count
+        return base, int(m.group(2)), int(m.group(1))
+    return base, int(m.group(1)), int(m.group(3) or 0)
+
+
+def limit_sql(base, limit, offset=0):
+    return f"{base} LIMIT {limit}" + (f" OFFSET {offset}" if offset else "")
+
+
+def bound_sql(sql, max_rows):
+    """返回 (行数不超过 max_rows 的 SQL, 是否注入/截断了 LIMIT)"""
+    base, limit, offset = split_limit(sql)
+    if limit is not None and limit <= max_rows:
+        return sql, False
+    return limit_sql(base, max_rows, offset), True
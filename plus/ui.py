@@ -3,6 +3,8 @@ import streamlit.components.v1 as components
 import json
 from openai import OpenAI
 from .config import load_config, save_config
+from .db import pool_stats, cache_stats
+from .downsample import downsample_frame
 
 def render_sidebar():
     st.header("🔧 设置")
@@ -72,8 +74,28 @@ def render_sidebar():
         config.update(new_config)
         st.success("✅ 设置已保存")
 
+    with st.expander("📊 连接池状态"):
+        stats = pool_stats(td_host, td_port, td_user, td_pass)
+        c1, c2, c3 = st.columns(3)
+        c1.metric("命中", stats["hits"])
+        c2.metric("新建", stats["misses"])
+        c3.metric("命中率", f"{stats['hit_rate']:.0%}")
+        st.caption(f"打开 {stats['open']} (使用中 {stats['in_use']})，等待 {stats['waits']} 次，"
+                   f"平均 {stats['avg_wait_ms']:.1f} ms，最长 {stats['max_wait_seconds'] * 1000:.1f} ms；"
+                   f"失效 {stats['broken']}，回收 {stats['evicted']}")
+
+    with st.expander("🗃️ 查询缓存"):
+        stats = cache_stats()
+        c1, c2, c3 = st.columns(3)
+        c1.metric("命中", stats["hits"])
+        c2.metric("未命中", stats["misses"])
+        c3.metric("命中率", f"{stats['hit_rate']:.0%}")
+        st.caption(f"{stats['entries']} 个结果，{stats['mb']:.1f} MB；过期 {stats['expired']}，淘汰 {stats['evicted']}")
+
     if st.button("🗑️ 清除聊天记录"):
         st.session_state.messages = []
+        if "result_memory" in st.session_state:
+            st.session_state.result_memory.clear()
         # 可选：是否也要清除上下文记忆？目前暂只清除显示的消息
         st.rerun()
 
@@ -83,11 +105,12 @@ def render_sidebar():
 def show_applied_context(context):
     st.info(f"已应用上下文: station={context.get('station_code')}, equip={','.join(context.get('equ_codes', []))}, start={context.get('date_start')}, end={context.get('date_end')}")
 
-def render_chart(df, chart_type="line"):
+def render_chart(df, chart_type="line", max_points=2000, method="lttb"):
     """
     统一的图表渲染函数
-    :param df: 数据 DataFrame
+    :param df: 数据 DataFrame (不修改，表格与下载仍使用完整数据)
     :param chart_type: 'line', 'bar', 'area'
+    :param max_points: 每个数值序列最多绘制的点数，超过时按 method ('lttb' / 'minmax') 降采样
     """
     # 如果是窗口聚合查询，TDengine 返回 _wstart，统一重命名为 ts 以便绘图
     if "_wstart" in df.columns:
@@ -95,12 +118,16 @@ def render_chart(df, chart_type="line"):
 
     if "ts" in df.columns and len(df) > 1:
         # 清理列名中的特殊字符，避免 Altair 报错
-        df.columns = [str(col).replace("(", "_").replace(")", "") for col in df.columns]
+        df = df.rename(columns=lambda col: str(col).replace("(", "_").replace(")", ""))
 
         numeric_cols = df.select_dtypes(include=["float", "int"]).columns
         # 排除非数值列或不需要绘图的列
         if len(numeric_cols) > 0:
             chart_data = df.set_index("ts")[numeric_cols]
+            if len(chart_data) > max_points:
+                total = len(chart_data)
+                chart_data = downsample_frame(chart_data.sort_index(kind="stable"), max_points, method)
+                st.caption(f"图表按 {method.upper()} 降采样显示 {len(chart_data):,} / {total:,} 个点，表格保留完整数据")
             if chart_type == "bar":
                 st.bar_chart(chart_data)
             elif chart_type == "area":
@@ -108,6 +135,26 @@ def render_chart(df, chart_type="line"):
             else:
                 st.line_chart(chart_data)
 
+def render_result(result, chart_type, key, memory):
+    """
+    展示分页查询结果 (plus.paging.PagedQuery)：已加载部分的表格与图表，按需继续加载
+    :param key: 结果在消息列表中的位置，用作按钮的 key
+    :param memory: 会话的 plus.paging.SessionMemory
+    """
+    if result.released:
+        st.caption("结果数据已释放以满足会话内存上限")
+        if st.button("🔄 重新加载", key=f"reload_{key}"):
+            memory.fetch(result)
+            st.rerun()
+        return
+    df = result.frame
+    st.dataframe(df)
+    render_chart(df, chart_type)
+    st.caption(result.status())
+    if not result.done and st.button("⬇️ 加载更多", key=f"more_{key}"):
+        memory.fetch(result)
+        st.rerun()
+
 def inject_history_js(history_messages):
     """
     注入 JavaScript 以支持在 chat_input 中使用上下箭头回填历史记录
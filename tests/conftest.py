@@ -0,0 +1,27 @@
+import os
+import sys
+
+import pytest
+from loguru import logger
+
+# 测试直接导入仓库内的 allert / plus 包
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(autouse=True)
+def quiet_logs():
+    logger.disable('allert')
+    yield
+    logger.enable('allert')
+
+
+@pytest.fixture
+def mapping(tmp_path):
+    """小型映射表: a -> 电流, b -> 电压, c 保持原名"""
+    import json
+
+    from allert.mapping_loader import MappingLoader
+
+    path = tmp_path / 'mapping.json'
+    path.write_text(json.dumps({'a': '电流', 'b': '电压', 'c': 'c'}, ensure_ascii=False), encoding='utf-8')
+    return MappingLoader(str(path))
@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+
+from allert.compact import compact_frame, pack_bits, unpack_bits
+
+
+class MetaLoader:
+    meta = {
+        'a': {'type': 'float', 'factor': 1.0},
+        'scaled': {'type': 'float', 'factor': 0.1},
+        'energy': {'type': 'int', 'factor': 1.0},
+    }
+
+    def get_meta(self, name):
+        return self.meta.get(name)
+
+
+def test_float32_only_for_unscaled_float_points():
+    df = pd.DataFrame({'a': [1.5], 'scaled': [0.1], 'energy': [3.0], 'unknown': [1.0], 'device_id': ['F01']})
+    out = compact_frame(df, MetaLoader(), keep_bits=None, report=False)
+    assert out['a'].dtype == np.float32
+    assert out['scaled'].dtype == np.float64
+    assert out['energy'].dtype == np.float64
+    assert out['unknown'].dtype == np.float64
+    assert isinstance(out['device_id'].dtype, pd.CategoricalDtype)
+
+
+def test_pack_bits_roundtrip():
+    rng = np.random.default_rng(0)
+    bits = pd.DataFrame(rng.integers(0, 2, (50, 70)).astype(np.uint8), columns=[f'bit_{i}' for i in range(70)])
+    df = pd.concat([pd.DataFrame({'a': rng.random(50)}), bits], axis=1)
+    packed = pack_bits(df, keep=['bit_3'])
+    assert 'bit_3' in packed.columns and 'bit_4' not in packed.columns
+    restored = unpack_bits(packed, bits.columns)
+    pd.testing.assert_frame_equal(restored[bits.columns], bits, check_dtype=False)
+
+
+def test_compact_loader_uses_point_table_metadata(mapping):
+    from allert.data_loader import DataLoader
+
+    mapping.column_meta = {'a': {'type': 'float', 'factor': 1.0}, 'b': {'type': 'float', 'factor': 0.01}}
+    df = pd.DataFrame({'电流': [1.0, 2.0], '电压': [0.01, 0.02], 'device_id': ['F01', 'F02']})
+    compacted = DataLoader(mapping, compact=True)._compact(df, report=False)
+    assert compacted['电流'].dtype == np.float32
+    assert compacted['电压'].dtype == np.float64
+    assert compacted['device_id'].dtype == 'category'
@@ -0,0 +1,62 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from allert.model import compare
+from allert.model.compare import compare_models, evaluate_candidate
+
+
+@pytest.fixture
+def data():
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame(rng.normal(size=(1200, 3)), columns=['电流', '电压', '温度'])
+    y = (X['电流'] + 0.5 * X['电压'] > 0).astype(int).to_numpy()
+    return X.iloc[:1000], y[:1000], X.iloc[1000:], y[1000:]
+
+
+def save_arrays(tmp_path, arrays):
+    for name, values in zip(compare._ARRAYS, arrays):
+        np.save(os.path.join(tmp_path, f'{name}.npy'), np.asarray(values, dtype=np.float64))
+    return str(tmp_path)
+
+
+def test_evaluate_candidate(tmp_path, data):
+    data_dir = save_arrays(tmp_path, data)
+    row, prob = evaluate_candidate({'name': 'lr', 'algorithm': 'lr', 'params': {}}, data_dir, list(data[0].columns))
+    assert row['error'] == ''
+    assert row['auc'] > 0.95 and row['accuracy'] > 0.9
+    assert row['fit_s'] >= 0 and row['ms_per_1k'] > 0 and row['batch_1k_ms'] > 0 and row['model_mb'] > 0
+    assert prob.shape == (200,)
+
+
+def test_evaluate_candidate_records_errors(tmp_path, data):
+    data_dir = save_arrays(tmp_path, data)
+    row, prob = evaluate_candidate({'name': 'bad', 'algorithm': 'rf', 'params': {'n_estimators': -1}},
+                                   data_dir, list(data[0].columns))
+    assert prob is None
+    assert row['error'].startswith('InvalidParameterError')
+
+
+def test_compare_models_in_worker_processes(monkeypatch, data):
+    # 未安装 LightGBM 时跳过 lgbm 候选，而不是让它退化为随机森林参与对比
+    monkeypatch.setattr(compare, 'HAS_LGBM', False)
+    candidates = [
+        {'name': 'lgbm', 'algorithm': 'lgbm', 'params': {}},
+        {'name': 'lr', 'algorithm': 'lr', 'params': {'max_iter': 1000}},
+        {'name': 'bad', 'algorithm': 'rf', 'params': {'n_estimators': -1}},
+        {'name': 'rf', 'algorithm': 'rf', 'params': {'n_estimators': 10, 'n_jobs': 1, 'random_state': 0}},
+    ]
+    table, scores = compare_models(*data, candidates=candidates, workers=2)
+    assert list(table['name'])[-1] == 'bad' and table['error'].iloc[-1]
+    assert table['auc'].iloc[:2].is_monotonic_decreasing
+    assert set(table['name']) == {'lr', 'rf', 'bad'}
+    assert set(scores) == {'lr', 'rf'}
+    assert all(prob.shape == (200,) for prob in scores.values())
+
+
+def test_lgbm_is_skipped_without_lightgbm(monkeypatch, data):
+    monkeypatch.setattr(compare, 'HAS_LGBM', False)
+    with pytest.raises(ValueError):
+        compare_models(*data, candidates=[{'name': 'lgbm', 'algorithm': 'lgbm', 'params': {}}])
@@ -0,0 +1,188 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from allert.data_loader import DataLoader, build_query, resolve_inputs, rows_for_budget
+from allert.rule_engine import RuleEngine
+from allert.tsdb_pool import ConnectionPool
+
+
+def test_project_columns(mapping):
+    loader = DataLoader(mapping)
+    assert loader.project_columns(['电流', 'device_id', 'c', '不存在', '电流']) == ['ts', 'equ_code', 'a', 'c']
+    assert loader.project_columns(None) is None
+    # 一个都无法解析时退回 SELECT *
+    assert loader.project_columns(['不存在']) is None
+
+
+def test_referenced_columns_drive_the_select_list(mapping):
+    loader = DataLoader(mapping)
+    engine = RuleEngine([{'name': 'r', 'expr': '电流 > 1 and 电压 < 2'}])
+    columns = loader.project_columns(engine.referenced_columns())
+    assert build_query('t', columns=columns, limit=10) == 'SELECT ts, equ_code, b, a FROM t LIMIT 10'
+    # 无法编译的规则可能引用任意列
+    assert RuleEngine([{'name': 'r', 'expr': 'device_id in ["F01"]'}]).referenced_columns() is None
+
+
+class FakeCursor:
+    def __init__(self, conn, n_blocks):
+        self.conn = conn
+        self.description = [('ts', 'TIMESTAMP'), ('equ_code', 'NCHAR'), ('a', 'DOUBLE')]
+        self.n_blocks = n_blocks
+        self.closed = False
+
+    def execute(self, sql):
+        pass
+
+    def fetchmany(self, size):
+        if not self.n_blocks:
+            return []
+        self.n_blocks -= 1
+        start = 1_767_225_600_000 + (5 - self.n_blocks) * size * 1000
+        return [(start + i * 1000, 'F01', float(i)) for i in range(size)]
+
+    def close(self):
+        self.closed = True
+
+
+class FakeConnection:
+    def __init__(self):
+        self.cursors = []
+        self.closed = False
+
+    def cursor(self):
+        cursor = FakeCursor(self, n_blocks=5)
+        self.cursors.append(cursor)
+        return cursor
+
+    def close(self):
+        self.closed = True
+
+
+def test_rows_for_budget():
+    assert rows_for_budget(100, 256) > rows_for_budget(200, 256)
+    assert rows_for_budget(10_000, 1) == 1000
+
+
+def test_iter_from_tsdb_yields_normalized_chunks(mapping):
+    loader = DataLoader(mapping)
+    loader._connect = FakeConnection
+    chunks = list(loader.iter_from_tsdb('SELECT', chunk_rows=10))
+    assert [len(chunk) for chunk in chunks] == [10] * 5
+    assert list(chunks[0].columns) == ['电流', 'device_id']
+    assert chunks[0].index.name == 'timestamp' and chunks[0].index.is_monotonic_increasing
+
+
+def test_iter_from_tsdb_closes_connection_on_early_stop(mapping):
+    loader = DataLoader(mapping)
+    opened = []
+    loader._connect = lambda: opened.append(FakeConnection()) or opened[-1]
+
+    chunks = loader.iter_from_tsdb('SELECT', chunk_rows=10)
+    next(chunks)
+    chunks.close()
+    assert opened[0].closed and opened[0].cursors[0].closed
+
+    with pytest.raises(ValueError):
+        for _ in loader.iter_from_tsdb('SELECT', chunk_rows=10):
+            raise ValueError
+    assert opened[1].closed
+
+
+def test_iter_from_tsdb_returns_pooled_connection(mapping):
+    loader = DataLoader(mapping, pool=ConnectionPool('taosws://u:p@host:6041', max_size=1, connect=FakeConnection))
+    for _ in loader.iter_from_tsdb('SELECT', chunk_rows=10):
+        break
+    with pytest.raises(ValueError):
+        for _ in loader.iter_from_tsdb('SELECT', chunk_rows=10):
+            raise ValueError
+    stats = loader.pool.stats()
+    assert stats['in_use'] == 0 and stats['open'] == 1
+
+
+def test_compaction_reported_once_per_stream(mapping):
+    from loguru import logger
+
+    loader = DataLoader(mapping, compact=True)
+    loader._connect = FakeConnection
+    messages = []
+    logger.enable('allert')
+    sink = logger.add(lambda m: messages.append(m.record['message']), level='INFO')
+    try:
+        chunks = list(loader.iter_from_tsdb('SELECT', chunk_rows=10))
+    finally:
+        logger.remove(sink)
+    assert isinstance(chunks[0]['device_id'].dtype, pd.CategoricalDtype)
+    assert sum(m.startswith('Compact mode') for m in messages) == 1
+
+
+def write_export_csv(path, n_rows=1000, n_devices=3, n_bits=5, seed=0):
+    """场站导出格式: PK (设备|时间), 测点列, bit (0|1|...)"""
+    rng = np.random.default_rng(seed)
+    rows = np.arange(n_rows)
+    ts = pd.Timestamp('2025-12-15') + pd.to_timedelta(rows // n_devices, unit='s')
+    df = pd.DataFrame({
+        'PK': [f'F{d + 1:02d}|{t:%Y-%m-%d%H:%M:%S}' for d, t in zip(rows % n_devices, ts)],
+        'a': rng.random(n_rows).round(3) * 100,
+        'b': rng.random(n_rows).round(3),
+        'c': rng.integers(0, 1000, n_rows),
+        'bit': ['|'.join(map(str, bits)) for bits in rng.integers(0, 2, (n_rows, n_bits))],
+    })
+    # 缺失值与乱序行
+    df.loc[5, 'a'] = np.nan
+    df = pd.concat([df.iloc[10:], df.iloc[:10]])
+    df.to_csv(path, index=False)
+
+
+def by_time_and_device(df):
+    # load_csv 的 sort_index 不稳定，同一时刻的行按设备排序后再比较
+    return df.reset_index().sort_values(['timestamp', 'device_id'], kind='stable').reset_index(drop=True)
+
+
+@pytest.mark.parametrize('chunk_rows', [64, 1000, 100_000])
+def test_fast_csv_matches_load_csv(tmp_path, mapping, chunk_rows):
+    loader = DataLoader(mapping)
+    path = tmp_path / 'export.csv'
+    write_export_csv(path)
+    expected = loader.load_csv(str(path))
+    fast = loader.load_csv(str(path), fast=True, chunk_rows=chunk_rows)
+    assert list(fast.columns) == list(expected.columns)
+    assert fast.index.is_monotonic_increasing
+    assert fast['bit_0'].dtype == np.uint8
+    # 快速路径的位域列为 uint8、时间精度为 ns，数值一致即可
+    pd.testing.assert_frame_equal(by_time_and_device(fast), by_time_and_device(expected), check_dtype=False)
+
+
+def test_fast_csv_with_iso_timestamps(tmp_path, mapping):
+    # PK 时间不是定宽格式时退回通用解析
+    path = tmp_path / 'iso.csv'
+    pd.DataFrame({'PK': ['F01|2025-12-15 00:00:01', 'F02|2025-12-15T00:00:00'], 'a': [1.0, 2.0]}).to_csv(
+        path, index=False)
+    loader = DataLoader(mapping)
+    pd.testing.assert_frame_equal(by_time_and_device(loader.load_csv(str(path), fast=True)),
+                                  by_time_and_device(loader.load_csv(str(path))), check_dtype=False)
+
+
+def test_resolve_inputs(tmp_path):
+    for name in ('b.csv', 'a.csv', 'notes.txt'):
+        (tmp_path / name).write_text('PK\n', encoding='utf-8')
+    (tmp_path / 'sub.csv').mkdir()
+    expected = [str(tmp_path / 'a.csv'), str(tmp_path / 'b.csv')]
+    assert resolve_inputs(str(tmp_path)) == expected
+    assert resolve_inputs(str(tmp_path / '*.csv')) == expected
+    assert resolve_inputs(str(tmp_path), '*.txt') == [str(tmp_path / 'notes.txt')]
+    assert resolve_inputs(str(tmp_path / 'missing.csv')) == [str(tmp_path / 'missing.csv')]
+
+
+@pytest.mark.parametrize('fast', [False, True])
+def test_load_csv_files_matches_single_loads(tmp_path, mapping, fast):
+    paths = []
+    for seed in range(3):
+        path = tmp_path / f'export_{seed}.csv'
+        write_export_csv(path, n_rows=300, seed=seed)
+        paths.append(str(path))
+    loader = DataLoader(mapping)
+    merged = loader.load_csv_files(paths, workers=2, fast=fast)
+    expected = pd.concat([loader.load_csv(path, fast=fast) for path in paths])
+    assert merged.index.is_monotonic_increasing
+    pd.testing.assert_frame_equal(by_time_and_device(merged), by_time_and_device(expected))
@@ -0,0 +1,115 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from allert.model.incremental import IncrementalTrainer, time_periods
+from allert.model.sklearn_model import GenericModel
+
+
+def make_chunk(n=200, seed=0, labelled=True):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({'电流': rng.normal(10, 1, n), '电压': rng.normal(220, 5, n),
+                       'bits_0': np.zeros(n, dtype=np.uint64), 'device_id': 'd1'})
+    if labelled:
+        df['label'] = (df['电流'] > 10.5).astype(int)
+    return df
+
+
+class Segment:
+    """按段产出数据块，记录产出与关闭情况；fail_after 模拟训练中断"""
+
+    def __init__(self, n_chunks, seed=0, fail_after=None):
+        self.chunks = [make_chunk(seed=seed * 100 + i) for i in range(n_chunks)]
+        self.fail_after = fail_after
+        self.yielded = 0
+        self.closed = 0
+
+    def __call__(self):
+        try:
+            for i, chunk in enumerate(self.chunks):
+                if self.fail_after is not None and i == self.fail_after:
+                    raise RuntimeError('connection lost')
+                self.yielded += 1
+                yield chunk
+        finally:
+            self.closed += 1
+
+
+def trainer(tmp_path, **kwargs):
+    return IncrementalTrainer(GenericModel('sgd', random_state=0), str(tmp_path / 'ckpt' / 'model.pkl'), **kwargs)
+
+
+def test_time_periods_align_to_period():
+    periods = time_periods('2026-01-01 06:00', '2026-01-03 12:00', '1D')
+    assert periods == [
+        (pd.Timestamp('2026-01-01 06:00'), pd.Timestamp('2026-01-02')),
+        (pd.Timestamp('2026-01-02'), pd.Timestamp('2026-01-03')),
+        (pd.Timestamp('2026-01-03'), pd.Timestamp('2026-01-03 12:00')),
+    ]
+    assert time_periods('2026-01-01', '2026-01-01 05:00', '1D') == [
+        (pd.Timestamp('2026-01-01'), pd.Timestamp('2026-01-01 05:00'))]
+
+
+def test_fit_writes_checkpoint(tmp_path):
+    t = trainer(tmp_path)
+    segments = [('s1', Segment(2, seed=1)), ('s2', Segment(3, seed=2))]
+    t.fit(segments)
+    assert all(segment.closed == 1 for _, segment in segments)
+    with open(t.state_path, encoding='utf-8') as f:
+        state = json.load(f)
+    assert state['done'] == ['s1', 's2'] and state['current'] is None
+    assert state['chunks'] == 5 and state['rows'] == 1000
+    # 特征只取数值列，不含位域字和标签
+    assert state['features'] == ['电流', '电压']
+
+
+def test_resume_continues_after_interruption(tmp_path):
+    first = trainer(tmp_path)
+    interrupted = Segment(4, seed=2, fail_after=2)
+    with pytest.raises(RuntimeError):
+        first.fit([('s1', Segment(1, seed=1)), ('s2', interrupted)])
+    assert interrupted.closed == 1
+
+    resumed = trainer(tmp_path)
+    assert resumed.resume()
+    assert resumed.state['done'] == ['s1'] and resumed.state['current'] == 's2' and resumed.state['skip'] == 2
+    done, retry = Segment(1, seed=1), Segment(4, seed=2)
+    trained = []
+    update = resumed.update
+    resumed.update = lambda chunk: trained.append(chunk) or update(chunk)
+    resumed.fit([('s1', done), ('s2', retry), ('s3', Segment(1, seed=3))])
+    # 已完成的段不再读取，中断的段跳过已训练的块
+    assert done.yielded == 0
+    assert len(trained) == 3
+    pd.testing.assert_frame_equal(trained[0], retry.chunks[2])
+    assert resumed.state['chunks'] == 6 and resumed.state['done'] == ['s1', 's2', 's3']
+
+
+def test_resume_without_checkpoint(tmp_path):
+    assert not trainer(tmp_path).resume()
+    assert not IncrementalTrainer(GenericModel('sgd')).resume()
+
+
+def test_unlabelled_chunks_get_synthetic_faults(tmp_path):
+    t = trainer(tmp_path, anomaly_ratio=0.2, seed=0)
+    chunk = make_chunk(400, labelled=False)
+    X, y = t.prepare(chunk)
+    assert list(X.columns) == ['电流', '电压']
+    assert len(X) == len(y) == 500
+    assert y[:400].sum() == 0 and y[400:].sum() == 100
+    X, y = IncrementalTrainer(GenericModel('sgd'), anomaly_ratio=0.0).prepare(chunk)
+    assert len(X) == 400 and y.sum() == 0
+
+
+def test_missing_features_are_nan(tmp_path):
+    t = trainer(tmp_path, features=['电流', '温度'])
+    X, _ = t.prepare(make_chunk(10))
+    assert list(X.columns) == ['电流', '温度'] and X['温度'].isna().all()
+
+
+def test_random_forest_grows_per_chunk(tmp_path):
+    t = IncrementalTrainer(GenericModel('rf', random_state=0))
+    t.fit([('s1', Segment(3, seed=4))])
+    assert len(t.model.model.estimators_) == 60
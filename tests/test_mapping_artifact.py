@@ -0,0 +1,102 @@
+import json
+import os
+
+import pytest
+
+from allert import mapping_artifact
+from allert.mapping_artifact import artifact_path, load_compiled_mapping, reverse_mapping
+from allert.mapping_loader import MappingLoader
+
+
+@pytest.fixture
+def sources(tmp_path):
+    mapping = tmp_path / 'column_mapping.json'
+    mapping.write_text(json.dumps({'a': '电流', 'b': '电压', 'c': '电流'}, ensure_ascii=False), encoding='utf-8')
+    meta = tmp_path / 'jjl.csv'
+    meta.write_text('index,type,factor,说明\nA,float,1,电流\nb,float,0.1,电压\nc,int,,电量\n', encoding='gbk')
+    return str(mapping), str(meta)
+
+
+@pytest.fixture
+def builds(monkeypatch):
+    """记录实际解析源文件 (编译) 的次数"""
+    calls = []
+    build = mapping_artifact.CompiledMapping.build.__func__
+
+    def counting_build(cls, *args, **kwargs):
+        calls.append(args)
+        return build(cls, *args, **kwargs)
+
+    monkeypatch.setattr(mapping_artifact.CompiledMapping, 'build', classmethod(counting_build))
+    return calls
+
+
+def test_compiled_artifact_is_plain_json(sources):
+    mapping_path, meta_path = sources
+    compiled = load_compiled_mapping(mapping_path, meta_path, meta_encoding='gbk')
+    with open(artifact_path(mapping_path, meta_path, meta_encoding='gbk'), encoding='utf-8') as f:
+        data = json.load(f)
+    assert data['forward'] == compiled.forward
+    assert data['encodings'] == {'mapping': 'utf-8', 'meta': 'gbk'}
+    assert compiled.columns['a'] == {'type': 'float', 'factor': 1.0, 'dtype': 'float32'}
+    assert compiled.columns['b']['dtype'] == 'float64'
+
+
+def test_plus_and_cli_loads_do_not_invalidate_each_other(sources, builds):
+    mapping_path, meta_path = sources
+    for _ in range(3):
+        # Plus: 只读映射；CLI: 按配置带点表元数据 (gbk)
+        plus = load_compiled_mapping(mapping_path)
+        cli = load_compiled_mapping(mapping_path, meta_path, 'utf-8', 'gbk')
+        assert plus.columns == {} and cli.columns['a']['dtype'] == 'float32'
+    assert len(builds) == 2
+    assert artifact_path(mapping_path) != artifact_path(mapping_path, meta_path, 'utf-8', 'gbk')
+    assert artifact_path(mapping_path).endswith('column_mapping.compiled.json')
+
+
+def test_recompiles_only_when_content_changes(sources, builds):
+    mapping_path, _ = sources
+    load_compiled_mapping(mapping_path)
+    # 只改 mtime: 内容哈希相同，继续使用产物
+    stat = os.stat(mapping_path)
+    os.utime(mapping_path, (stat.st_atime, stat.st_mtime + 10))
+    load_compiled_mapping(mapping_path)
+    load_compiled_mapping(mapping_path)
+    assert len(builds) == 1
+
+    with open(mapping_path, 'w', encoding='utf-8') as f:
+        json.dump({'a': '新电流'}, f, ensure_ascii=False)
+    assert load_compiled_mapping(mapping_path).forward == {'a': '新电流'}
+    assert len(builds) == 2
+
+
+def test_stale_version_and_corrupt_artifacts_are_rebuilt(sources, builds):
+    mapping_path, _ = sources
+    load_compiled_mapping(mapping_path)
+    path = artifact_path(mapping_path)
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+    data['version'] = 0
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+    load_compiled_mapping(mapping_path)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('{')
+    assert load_compiled_mapping(mapping_path).forward['a'] == '电流'
+    assert len(builds) == 3
+
+
+def test_reverse_mapping_keeps_first_duplicate():
+    reverse, duplicates = reverse_mapping({'a': '电流', 'b': '电压', 'c': '电流'})
+    assert reverse == {'电流': 'a', '电压': 'b'}
+    assert duplicates == {'电流': ['a', 'c']}
+
+
+def test_mapping_loader(sources):
+    mapping_path, meta_path = sources
+    loader = MappingLoader(mapping_path, meta_path=meta_path, meta_encoding='gbk')
+    assert loader.resolve_column('电流') == 'a'
+    assert loader.resolve_column('device_id') == 'equ_code'
+    assert loader.resolve_column('b') == 'b'
+    assert loader.resolve_column('未知') is None
+    assert loader.get_meta('电压') == {'type': 'float', 'factor': 0.1, 'dtype': 'float64'}
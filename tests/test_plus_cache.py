@@ -0,0 +1,95 @@
+import pandas as pd
+import pytest
+
+import plus.cache as cache_module
+from plus.cache import ResultCache, normalize_sql, query_end
+
+
+def test_normalize_sql_keeps_literals():
+    assert normalize_sql("SELECT  *\n FROM T WHERE s = 'A  B';") == "select * from t where s = 'A  B'"
+
+
+@pytest.mark.parametrize('sql', [
+    "select * from t where ts > now - 1h",
+    "select * from t where ts > now() - 1h",
+    "select * from t where ts > NOW",
+    "select * from t where ts >= today()",
+    "select * from t where ts >= today ( ) and ts < '2020-01-02'",
+])
+def test_live_queries_have_no_end(sql):
+    assert query_end(normalize_sql(sql)) is None
+
+
+@pytest.mark.parametrize('sql, expected', [
+    ("select * from t where ts < '2020-01-02'", '2020-01-02'),
+    ("select * from t where ts <= '2020-01-02 10:00:00' and ts > '2019-12-01'", '2020-01-02 10:00:00'),
+    ("select * from t where ts between '2020-01-01' and '2020-01-03'", '2020-01-03'),
+    # 字符串常量中的 now 不是 NOW 函数
+    ("select * from t where note = 'now' and ts < '2020-01-02'", '2020-01-02'),
+    ("select * from t", None),
+])
+def test_query_end(sql, expected):
+    end = query_end(normalize_sql(sql))
+    assert end == (pd.Timestamp(expected) if expected else None)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache_module.time, 'monotonic', lambda: now[0])
+    return now
+
+
+def frame(n=10):
+    return pd.DataFrame({'a': range(n)})
+
+
+def test_ttl_closed_and_live():
+    cache = ResultCache(live_ttl=30, closed_ttl=3600, settle='10m')
+    closed = cache.key('src', 'db', "select * from t where ts < '2020-01-02'")
+    live = cache.key('src', 'db', "select * from t where ts > now - 1h")
+    unbounded = cache.key('src', 'db', "select * from t")
+    assert cache.ttl(closed) == 3600
+    assert cache.ttl(live) == 30
+    assert cache.ttl(unbounded) == 30
+
+
+def test_ttl_recent_end_is_live_until_settled():
+    cache = ResultCache(live_ttl=30, closed_ttl=3600, settle='10m')
+    recent = (pd.Timestamp.now() - pd.Timedelta('5m')).strftime('%Y-%m-%d %H:%M:%S')
+    settled = (pd.Timestamp.now() - pd.Timedelta('15m')).strftime('%Y-%m-%d %H:%M:%S')
+    assert cache.ttl(cache.key('src', 'db', f"select * from t where ts < '{recent}'")) == 30
+    assert cache.ttl(cache.key('src', 'db', f"select * from t where ts < '{settled}'")) == 3600
+
+
+def test_entries_expire(clock):
+    cache = ResultCache(live_ttl=30)
+    key = cache.key('src', 'db', 'select * from t where ts > now - 1h')
+    cache.put(key, frame())
+    clock[0] += 29
+    assert cache.get(key) is not None
+    clock[0] += 2
+    assert cache.get(key) is None
+    assert cache.stats()['expired'] == 1
+
+
+def test_get_returns_copy(clock):
+    cache = ResultCache()
+    key = cache.key('src', 'db', 'select * from t')
+    cache.put(key, frame())
+    df = cache.get(key)
+    df['b'] = 1
+    assert list(cache.get(key).columns) == ['a']
+
+
+def test_lru_eviction_by_size(clock):
+    size = frame(10_000).memory_usage(index=True, deep=True).sum()
+    cache = ResultCache(max_mb=2.5 * size / 1024 ** 2)
+    keys = [cache.key('src', 'db', f'select {i} from t') for i in range(3)]
+    cache.put(keys[0], frame(10_000))
+    cache.put(keys[1], frame(10_000))
+    cache.get(keys[0])
+    cache.put(keys[2], frame(10_000))
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[0]) is not None and cache.get(keys[2]) is not None
+    assert cache.stats()['evicted'] == 1
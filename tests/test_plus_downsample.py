@@ -0,0 +1,99 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from plus.downsample import downsample_frame, lttb_indices, minmax_indices, series_indices
+
+
+def reference_lttb(x, y, n_out):
+    """逐点计算的 LTTB，桶划分与 lttb_indices 相同"""
+    n = len(y)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    out, a = [0], 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        if i + 2 < len(edges):
+            nx, ny = np.mean(x[hi:edges[i + 2]]), np.mean(y[hi:edges[i + 2]])
+        else:
+            nx, ny = x[-1], y[-1]
+        best, best_area = lo, -1.0
+        for j in range(lo, hi):
+            area = abs((x[a] - nx) * (y[j] - y[a]) - (x[a] - x[j]) * (ny - y[a]))
+            if area > best_area:
+                best, best_area = j, area
+        out.append(best)
+        a = best
+    return np.array(out + [n - 1])
+
+
+@pytest.fixture
+def walk():
+    rng = np.random.default_rng(0)
+    x = np.cumsum(rng.integers(1, 5, 5000)).astype(np.float64)
+    return x, np.cumsum(rng.normal(size=5000))
+
+
+@pytest.mark.parametrize('n_out', [3, 10, 501, 4999])
+def test_lttb_matches_reference(walk, n_out):
+    x, y = walk
+    idx = lttb_indices(x, y, n_out)
+    assert len(idx) == n_out and idx[0] == 0 and idx[-1] == len(y) - 1
+    assert (np.diff(idx) > 0).all()
+    np.testing.assert_array_equal(idx, reference_lttb(x, y, n_out))
+
+
+def test_lttb_keeps_short_series(walk):
+    x, y = walk
+    np.testing.assert_array_equal(lttb_indices(x[:50], y[:50], 100), np.arange(50))
+    np.testing.assert_array_equal(lttb_indices(x, y, 2), np.arange(len(y)))
+
+
+@pytest.mark.parametrize('n', [1000, 1003])
+def test_minmax_keeps_extremes_and_spikes(n):
+    y = np.sin(np.linspace(0, 20, n))
+    y[777] = 50.0
+    y[n - 2] = -50.0
+    idx = minmax_indices(y, 100)
+    assert len(idx) <= 104 and idx[0] == 0 and idx[-1] == n - 1
+    assert {777, n - 2} <= set(idx)
+    assert (np.diff(idx) > 0).all()
+    # 每个桶都保留了自己的最小值与最大值
+    size = -(-n // 50)
+    for start in range(0, n, size):
+        bucket = y[start:start + size]
+        assert start + bucket.argmin() in idx and start + bucket.argmax() in idx
+
+
+def test_minmax_ignores_nan_in_buckets():
+    y = np.arange(100, dtype=np.float64)
+    y[10:20] = np.nan
+    y[[0, 95, 96, 97, 98, 99]] = np.nan
+    idx = minmax_indices(y, 20)
+    assert not np.isnan(y[idx]).any()
+    assert {1, 9, 20, 29, 90, 94} <= set(idx)
+
+
+def test_series_indices_skip_nan(walk):
+    x, y = walk
+    y = y.copy()
+    y[::7] = np.nan
+    for method in ('lttb', 'minmax'):
+        idx = series_indices(x, y, 200, method)
+        assert not np.isnan(y[idx]).any()
+    # 全部为 NaN
+    assert len(series_indices(x, np.full(len(x), np.nan), 200)) == 0
+
+
+def test_downsample_frame(walk):
+    x, y = walk
+    df = pd.DataFrame({'a': y, 'b': -y * 2, 'c': pd.array(np.arange(len(y)), dtype='Int64')},
+                      index=pd.to_datetime(x.astype(np.int64), unit='s'))
+    out = downsample_frame(df, max_points=300)
+    assert out.index.is_monotonic_increasing and out.index.isin(df.index).all()
+    assert 300 <= len(out) <= 900
+    # 各列所选下标的并集
+    selected = set(lttb_indices(df.index.asi8, y, 300))
+    assert selected <= set(df.index.get_indexer(out.index))
+    assert len(downsample_frame(df.iloc[:300], max_points=300)) == 300
+    with pytest.raises(ValueError):
+        downsample_frame(df, method='avg')
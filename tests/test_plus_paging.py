@@ -0,0 +1,130 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from plus.paging import PagedQuery, SessionMemory, fetch_bounded, frame_bytes
+from plus.rewrite import bound_sql, split_limit
+
+
+@pytest.mark.parametrize('sql, expected', [
+    ("SELECT * FROM t", ("SELECT * FROM t", None, 0)),
+    ("SELECT * FROM t LIMIT 10;", ("SELECT * FROM t", 10, 0)),
+    ("SELECT * FROM t LIMIT 10 OFFSET 20", ("SELECT * FROM t", 10, 20)),
+    ("SELECT * FROM t LIMIT 20, 10", ("SELECT * FROM t", 10, 20)),
+    ("SELECT * FROM t WHERE s = 'a limit 5'", ("SELECT * FROM t WHERE s = 'a limit 5'", None, 0)),
+    ("SELECT * FROM t PARTITION BY equ_code SLIMIT 2",
+     ("SELECT * FROM (SELECT * FROM t PARTITION BY equ_code SLIMIT 2)", None, 0)),
+])
+def test_split_limit(sql, expected):
+    assert split_limit(sql) == expected
+
+
+def test_bound_sql():
+    assert bound_sql("SELECT * FROM t LIMIT 50", 100) == ("SELECT * FROM t LIMIT 50", False)
+    assert bound_sql("SELECT * FROM t LIMIT 500 OFFSET 5", 100) == ("SELECT * FROM t LIMIT 100 OFFSET 5", True)
+    assert bound_sql("SELECT * FROM t;", 100) == ("SELECT * FROM t LIMIT 100", True)
+
+
+class Table:
+    """按 LIMIT/OFFSET 返回切片的假查询函数，记录执行过的 SQL"""
+
+    def __init__(self, n_rows):
+        self.df = pd.DataFrame({'ts': np.arange(n_rows), 'v': np.random.default_rng(0).random(n_rows)})
+        self.queries = []
+
+    def __call__(self, sql):
+        self.queries.append(sql)
+        _, limit, offset = split_limit(sql)
+        return self.df.iloc[offset:offset + limit].reset_index(drop=True)
+
+
+def load_all(query):
+    while query.fetch_next() is not None:
+        pass
+    return query
+
+
+def test_paged_query_injects_max_rows():
+    table = Table(250)
+    query = PagedQuery("SELECT * FROM t", table, page_rows=100, max_rows=220)
+    first = query.fetch_next()
+    assert len(first) == 100 and not query.done
+    assert '可继续加载' in query.status()
+    load_all(query)
+    assert table.queries == ["SELECT * FROM t LIMIT 100", "SELECT * FROM t LIMIT 100 OFFSET 100",
+                             "SELECT * FROM t LIMIT 20 OFFSET 200"]
+    pd.testing.assert_frame_equal(query.frame, table.df.iloc[:220])
+    assert query.done and '已自动添加 LIMIT' in query.status()
+
+
+def test_paged_query_respects_own_limit_and_offset():
+    table = Table(1000)
+    query = load_all(PagedQuery("SELECT * FROM t LIMIT 150 OFFSET 30", table, page_rows=100))
+    assert table.queries == ["SELECT * FROM t LIMIT 100 OFFSET 30", "SELECT * FROM t LIMIT 50 OFFSET 130"]
+    pd.testing.assert_frame_equal(query.frame, table.df.iloc[30:180].reset_index(drop=True))
+    assert not query.capped and '上限' not in query.status()
+
+
+def test_paged_query_stops_on_short_page():
+    table = Table(150)
+    query = load_all(PagedQuery("SELECT * FROM t", table, page_rows=100))
+    assert len(table.queries) == 2 and query.rows == 150
+    assert query.fetch_next() is None
+
+
+def test_release_reloads_from_first_page():
+    table = Table(300)
+    query = PagedQuery("SELECT * FROM t", table, page_rows=100)
+    query.fetch_next()
+    query.fetch_next()
+    query.release()
+    assert query.rows == 0 and query.frame.empty and query.released
+    query.fetch_next()
+    assert table.queries[-1] == "SELECT * FROM t LIMIT 100"
+
+
+def test_session_memory_releases_oldest_result_first():
+    table = Table(1000)
+    page_bytes = frame_bytes(table.df.iloc[:100])
+    memory = SessionMemory(max_mb=2.5 * page_bytes / 1024 ** 2)
+    old = PagedQuery("SELECT * FROM t", table, page_rows=100)
+    new = PagedQuery("SELECT * FROM t WHERE v > 0", table, page_rows=100)
+    memory.fetch(old)
+    memory.fetch(old)
+    memory.fetch(new)
+    assert old.released and old.rows == 0 and new.rows == 100
+    memory.fetch(new)
+    # 当前结果自身超出上限: 丢弃该页并停止加载
+    assert memory.fetch(new) is None
+    assert new.rows == 200 and new.done and new.memory_limited
+    assert '会话内存上限' in new.status()
+    assert memory.fetch(new) is None
+    assert memory.used <= memory.max_bytes
+
+
+class Cursor:
+    def __init__(self, rows):
+        self.rows = rows
+        self.description = [('ts', 'BIGINT'), ('v', 'DOUBLE')]
+        self._pos = 0
+
+    def fetchmany(self, size):
+        rows = self.rows[self._pos:self._pos + size]
+        self._pos += size
+        return rows
+
+
+def test_fetch_bounded():
+    rows = [(i, float(i)) for i in range(50)]
+    df, truncated = fetch_bounded(Cursor(rows), page_rows=10)
+    assert not truncated and len(df) == 50 and list(df.columns) == ['ts', 'v']
+
+    block_bytes = frame_bytes(fetch_bounded(Cursor(rows[:10]))[0])
+    df, truncated = fetch_bounded(Cursor(rows), page_rows=10, max_bytes=int(2.5 * block_bytes))
+    assert truncated and len(df) == 20
+
+    df, truncated = fetch_bounded(Cursor(rows), page_rows=10, max_bytes=1)
+    assert truncated and df.empty and list(df.columns) == ['ts', 'v']
+
+    df, truncated = fetch_bounded(Cursor([]))
+    assert not truncated and df.empty and list(df.columns) == ['ts', 'v']
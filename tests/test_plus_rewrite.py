@@ -0,0 +1,105 @@
+import sys
+import types
+
+import pandas as pd
+import pytest
+
+from plus.rewrite import count_query, downsample_sql, interval_for, parse_raw_select
+
+
+def test_parse_raw_select():
+    parsed = parse_raw_select("SELECT ts, `a1`, equ_code FROM station_data.t "
+                              "WHERE ts >= '2026-01-01' AND note = 'x, limit 5' ORDER BY ts DESC")
+    assert parsed == {
+        'columns': ['ts', 'a1', 'equ_code'],
+        'table': 'station_data.t',
+        'where': "ts >= '2026-01-01' AND note = 'x, limit 5'",
+        'order': 'ts DESC',
+        'limit': None,
+    }
+    assert parse_raw_select("select ts, a1 from t limit 100")['limit'] == 100
+
+
+@pytest.mark.parametrize('sql', [
+    "SELECT * FROM t",
+    "SELECT AVG(a1) FROM t",
+    "SELECT ts, a1 FROM t INTERVAL(1m)",
+    "SELECT ts, a1 FROM t PARTITION BY equ_code",
+    "SELECT ts, a1 FROM t1 JOIN t2 ON t1.ts = t2.ts",
+])
+def test_parse_raw_select_rejects_non_raw_queries(sql):
+    assert parse_raw_select(sql) is None
+
+
+def test_count_and_downsample_partition_by_series_tags():
+    parsed = parse_raw_select("SELECT ts, equ_code, a1 FROM t WHERE ts > '2026-01-01' ORDER BY ts DESC")
+    assert count_query(parsed) == ("SELECT COUNT(*), FIRST(ts), LAST(ts) FROM t "
+                                   "WHERE ts > '2026-01-01' PARTITION BY equ_code")
+    assert downsample_sql(parsed, '1m') == (
+        "SELECT _wstart, equ_code, AVG(a1) AS a1, MIN(a1) AS a1_min, MAX(a1) AS a1_max FROM t "
+        "WHERE ts > '2026-01-01' PARTITION BY equ_code INTERVAL(1m) ORDER BY _wstart DESC")
+    assert count_query(parse_raw_select("SELECT ts, a1 FROM t")) == "SELECT COUNT(*), FIRST(ts), LAST(ts) FROM t"
+    assert downsample_sql(parse_raw_select("SELECT ts, equ_code FROM t"), '1m') is None
+
+
+@pytest.mark.parametrize('span, budget, expected', [
+    (3600, 5000, '1s'),
+    (86400, 5000, '30s'),
+    (30 * 86400, 5000, '10m'),
+    (365 * 86400, 100, '4d'),
+])
+def test_interval_for(span, budget, expected):
+    assert interval_for(span, budget) == expected
+
+
+@pytest.fixture
+def db(monkeypatch):
+    # plus.db 在导入时需要 taosws 驱动，这里只测试不连库的部分
+    monkeypatch.setitem(sys.modules, 'taosws', types.SimpleNamespace(connect=None))
+    monkeypatch.delitem(sys.modules, 'plus.db', raising=False)
+    import plus.db
+    return plus.db
+
+
+def fake_counts(db, monkeypatch, counts, first='2026-01-01', last='2026-01-02'):
+    queries = []
+
+    def execute_query(sql, *args, **kwargs):
+        queries.append(sql)
+        return pd.DataFrame({'count(*)': counts, 'first(ts)': pd.Timestamp(first), 'last(ts)': pd.Timestamp(last)})
+
+    monkeypatch.setattr(db, 'execute_query', execute_query)
+    return queries
+
+
+def downsample(db, sql, budget=5000):
+    return db.downsample_query(sql, 'host', 6041, 'root', 'taosdata', 'station_data', point_budget=budget)
+
+
+def test_downsample_query_skips_limit(db, monkeypatch):
+    queries = fake_counts(db, monkeypatch, [1_000_000])
+    sql = "SELECT ts, a1 FROM t LIMIT 1000"
+    assert downsample(db, sql) == (sql, None)
+    assert queries == []
+
+
+def test_downsample_query_budget_is_per_series(db, monkeypatch):
+    sql = "SELECT ts, equ_code, a1 FROM t"
+    # 20 个序列共 6 万行，单个序列 3000 行未超过预算
+    fake_counts(db, monkeypatch, [3000] * 20)
+    assert downsample(db, sql) == (sql, None)
+
+    queries = fake_counts(db, monkeypatch, [86400] * 3)
+    rewritten, note = downsample(db, sql)
+    assert queries == ["SELECT COUNT(*), FIRST(ts), LAST(ts) FROM t PARTITION BY equ_code"]
+    assert rewritten.endswith("PARTITION BY equ_code INTERVAL(30s)")
+    assert note is not None
+
+
+def test_downsample_query_leaves_other_queries(db, monkeypatch):
+    queries = fake_counts(db, monkeypatch, [])
+    assert downsample(db, "SELECT AVG(a1) FROM t") == ("SELECT AVG(a1) FROM t", None)
+    assert queries == []
+    # 没有匹配的行
+    assert downsample(db, "SELECT ts, a1 FROM t") == ("SELECT ts, a1 FROM t", None)
+    assert len(queries) == 1
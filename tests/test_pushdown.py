@@ -0,0 +1,70 @@
+import sqlite3
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from allert.rule_compiler import RulePlan
+from allert.rule_engine import RuleEngine
+
+RAW = {'电流': 'a1', '电压': 'a2', '功率': 'a3'}
+
+
+def resolve(name):
+    return RAW.get(name)
+
+
+@pytest.mark.parametrize('expr, sql', [
+    ('电流 > 0.5', '`a1` > 0.5'),
+    ('0.5 < 电流', '`a1` > 0.5'),
+    ('电流 > 0.5 and (电压 < 3 or 功率 >= 1)', '(`a1` > 0.5 AND (`a2` < 3 OR `a3` >= 1))'),
+    ('电流 * 2 - 电压 <= -1', '((`a1` * 2) - `a2`) <= (-1)'),
+    ('电流 == "x\'y"', "`a1` = 'x''y'"),
+])
+def test_to_sql(expr, sql):
+    plan = RulePlan([expr])
+    assert plan.to_sql(plan.roots[0], resolve) == sql
+
+
+@pytest.mark.parametrize('expr', [
+    '电流 != 0.5',       # NaN != x 在 pandas 中为 True，在 SQL 中为 NULL
+    'not 电流 > 0.5',
+    '电流 / 电压 > 1',   # 除零语义不同
+    '未知列 > 1',
+    '电流 > True',
+])
+def test_to_sql_refuses_unequal_semantics(expr):
+    plan = RulePlan([expr])
+    assert plan.to_sql(plan.roots[0], resolve) is None
+
+
+def test_pushdown_filter_needs_every_rule():
+    rules = [{'name': 'r1', 'expr': '电流 > 0.5'}, {'name': 'r2', 'expr': '电流 > 0.5'},
+             {'name': 'r3', 'expr': '电压 < 0.1'}]
+    assert RuleEngine(rules).pushdown_filter(resolve) == '`a1` > 0.5 OR `a2` < 0.1'
+    assert RuleEngine(rules + [{'name': 'w', 'expr': '电流 > 0.9', 'window': '5min any'}]).pushdown_filter(
+        resolve) is None
+    assert RuleEngine(rules + [{'name': 'ne', 'expr': '电流 != 1'}]).pushdown_filter(resolve) is None
+    assert RuleEngine([]).pushdown_filter(resolve) is None
+
+
+def test_pushed_down_rows_give_the_same_alerts():
+    rng = np.random.default_rng(0)
+    n = 2000
+    df = pd.DataFrame({'电流': rng.random(n), '电压': rng.random(n) * 5, '功率': rng.random(n),
+                       'device_id': rng.choice(['F01', 'F02'], n)},
+                      index=pd.date_range('2026-01-01', periods=n, freq='7s', name='timestamp'))
+    df.iloc[::50, 0] = np.nan
+    rules = [{'name': 'r1', 'expr': '电流 > 0.9 and 电压 < 2', 'dedup': '5min'},
+             {'name': 'r2', 'expr': '功率 * 2 - 电压 > 1.5'}]
+    engine = RuleEngine(rules)
+    where = engine.pushdown_filter(resolve)
+    assert where is not None
+
+    # 用 SQLite 执行同一 WHERE 条件 (NULL 比较结果同样被过滤)
+    raw = df.rename(columns=RAW).reset_index(drop=True)
+    with sqlite3.connect(':memory:') as conn:
+        raw.to_sql('t', conn, index_label='row')
+        rows = [r[0] for r in conn.execute(f'SELECT row FROM t WHERE {where}')]
+    assert 0 < len(rows) < n
+    pd.testing.assert_frame_equal(engine.run(df.iloc[rows]), engine.run(df))
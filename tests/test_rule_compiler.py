@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+
+from allert.rule_compiler import RulePlan
+
+
+def reachable(plan):
+    seen = set()
+    stack = [root for root in plan.roots if root is not None]
+    while stack:
+        node_id = stack.pop()
+        if node_id not in seen:
+            seen.add(node_id)
+            stack.extend(plan._children(plan.nodes[node_id]))
+    return seen
+
+
+def test_shared_subexpressions():
+    plan = RulePlan(['a < 0.3 and b > 1', '0.3 > a', 'b > 1 and a < 0.3', 'a + 1 > 2', '1 + a > 2'])
+    assert plan.roots[0] == plan.roots[2]
+    assert plan.nodes[plan.roots[1]] in [plan.nodes[c] for c in plan.nodes[plan.roots[0]][1:]]
+    assert plan.roots[3] == plan.roots[4]
+    assert plan.columns == ['a', 'b']
+
+
+def test_every_node_is_reachable():
+    # 嵌套的同类 and/or、链式比较被展平，编译失败的表达式不留下节点
+    plan = RulePlan(['a > 1 and (b > 2 and c > 3)', '0 < a < 1 and b > 2', 'x > 5 and y in [1, 2]',
+                     'a > 1 or (b > 2 or (c > 3 or d > 4))', 'a >'])
+    assert plan.roots[2] is None and plan.roots[4] is None
+    assert reachable(plan) == set(range(len(plan.nodes)))
+    assert 'x' not in plan.columns and 'y' not in plan.columns
+    assert [plan.nodes[root][0] for root in (plan.roots[0], plan.roots[3])] == ['and', 'or']
+    assert len(plan.nodes[plan.roots[0]]) == 4 and len(plan.nodes[plan.roots[3]]) == 5
+
+    df = pd.DataFrame({'a': [0.5, 2.0], 'b': [3.0, 3.0], 'c': [0.0, 4.0], 'd': [0.0, 0.0]})
+    results = plan.evaluate(df)
+    assert results[0].tolist() == [False, True]
+    assert results[1].tolist() == [True, False]
+    assert results[3].tolist() == [True, True]
+
+
+def test_evaluate_reports_missing_columns_per_rule():
+    plan = RulePlan(['a > 1', 'missing > 1 and a > 1'])
+    results = plan.evaluate(pd.DataFrame({'a': [0.0, 2.0]}))
+    assert results[0].tolist() == [False, True]
+    assert isinstance(results[1], KeyError)
+
+
+def test_nan_is_not_triggered():
+    plan = RulePlan(['a * 2', 'a > 1'])
+    results = plan.evaluate(pd.DataFrame({'a': [np.nan, 2.0]}))
+    assert results[0].tolist() == [False, True]
+    assert results[1].tolist() == [False, True]
+
+
+def test_cse_keeps_string_concatenation_order():
+    plan = RulePlan(["b + a == 'yx'", "a + b == 'yx'"])
+    df = pd.DataFrame({'a': np.array(['x'], dtype=object), 'b': np.array(['y'], dtype=object)})
+    results = plan.evaluate(df)
+    assert results[0].tolist() == [True]
+    assert results[1].tolist() == [False]
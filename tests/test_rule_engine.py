@@ -0,0 +1,233 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from allert.model.sklearn_model import GenericModel
+from allert.rule_engine import ModelScorer, RuleEngine
+
+RULES = [
+    {'name': 'low', 'expr': 'a < 0.2', 'severity': 'high'},
+    {'name': 'combo', 'expr': 'a < 0.5 and `电流` > 0.5', 'dedup': '2min'},
+    {'name': 'swapped', 'expr': '0.5 > a & b > 0.3', 'window': '3min any'},
+    {'name': 'sustained', 'expr': 'b > 0.2', 'window': '2min all', 'dedup': '5min'},
+    {'name': 'arith', 'expr': 'a * 2 + b > 1.8 or -b < -0.95'},
+    {'name': 'chain', 'expr': '0.1 < a < 0.3', 'window': '1min any', 'dedup': '1min'},
+]
+
+
+def make_frame(n_rows=3000, devices=('F01', 'F02', 'F03'), seed=0):
+    rng = np.random.default_rng(seed)
+    # 不规则采样间隔，各设备交错
+    ts = pd.Timestamp('2026-01-01') + pd.to_timedelta(np.cumsum(rng.integers(1, 20, n_rows)), unit='s')
+    df = pd.DataFrame({
+        'a': rng.random(n_rows),
+        'b': rng.random(n_rows),
+        '电流': rng.random(n_rows),
+        'device_id': rng.choice(np.array(devices, dtype=object), n_rows),
+    }, index=pd.DatetimeIndex(ts, name='timestamp'))
+    df.loc[df.sample(frac=0.02, random_state=seed).index, 'a'] = np.nan
+    return df
+
+
+def reference_alerts(rules, df):
+    """逐设备 df.eval + rolling + 逐条去重的直接实现"""
+    alerts = []
+    for config in rules:
+        expr = config['expr']
+        for device, group in df.groupby('device_id', sort=False):
+            group = group.sort_index(kind='stable')
+            mask = group.eval(expr).fillna(False).astype(bool)
+            if 'window' in config:
+                duration, func = config['window'].split()
+                rolling = mask.astype(int).rolling(duration)
+                mask = rolling.max() > 0 if func == 'any' else rolling.min() > 0
+            hits = group.index[mask.to_numpy()]
+            if 'dedup' in config:
+                delta, last, kept = pd.to_timedelta(config['dedup']), None, []
+                for ts in hits:
+                    if last is None or ts - last > delta:
+                        kept.append(ts)
+                        last = ts
+                hits = kept
+            alerts.extend((ts, device, config['name']) for ts in hits)
+    return sorted(alerts)
+
+
+def alert_keys(alerts):
+    if alerts.empty:
+        return []
+    return sorted(zip(alerts['timestamp'], alerts['device_id'], alerts['rule_name']))
+
+
+def test_run_matches_reference():
+    df = make_frame()
+    alerts = RuleEngine(RULES).run(df)
+    assert len(alerts)
+    assert alert_keys(alerts) == reference_alerts(RULES, df)
+
+
+def test_run_orders_alerts_by_time():
+    alerts = RuleEngine(RULES).run(make_frame())
+    assert list(alerts.columns) == ['timestamp', 'device_id', 'rule_name', 'severity', 'message']
+    for _, group in alerts.groupby('rule_name'):
+        assert group['timestamp'].is_monotonic_increasing
+
+
+def test_run_without_alerts():
+    df = make_frame(n_rows=50)
+    assert RuleEngine([{'name': 'never', 'expr': 'a > 2'}]).run(df).empty
+    assert RuleEngine(RULES).run(df.iloc[:0]).empty
+
+
+def test_window_and_dedup_are_per_device():
+    index = pd.DatetimeIndex(pd.to_datetime(['2026-01-01 00:00:00', '2026-01-01 00:00:30',
+                                             '2026-01-01 00:01:00', '2026-01-01 00:01:30']), name='timestamp')
+    df = pd.DataFrame({'a': [1.0, 0.0, 1.0, 0.0], 'device_id': ['F01', 'F02', 'F02', 'F01']}, index=index)
+    engine = RuleEngine([
+        {'name': 'dedup', 'expr': 'a > 0.5', 'dedup': '10min'},
+        {'name': 'window', 'expr': 'a > 0.5', 'window': '5min any'},
+    ])
+    alerts = alert_keys(engine.run(df))
+    # 去重只抑制同一设备的后续告警
+    assert [(ts, d) for ts, d, rule in alerts if rule == 'dedup'] == [
+        (index[0], 'F01'), (index[2], 'F02')]
+    # F01 的命中只延续到 F01 自己的后续行，不会让 F02 在 00:00:30 触发
+    assert [(ts, d) for ts, d, rule in alerts if rule == 'window'] == [
+        (index[0], 'F01'), (index[2], 'F02'), (index[3], 'F01')]
+
+
+def test_rows_without_device_share_one_group():
+    df = make_frame(n_rows=200).drop(columns='device_id')
+    alerts = RuleEngine(RULES).run(df)
+    assert (alerts['device_id'] == 'unknown').all()
+    expected = reference_alerts(RULES, df.assign(device_id='unknown'))
+    assert alert_keys(alerts) == expected
+
+
+def test_plan_matches_df_eval():
+    df = make_frame()
+    engine = RuleEngine(RULES)
+    assert all(root is not None for root in engine.plan.roots)
+    for rule, mask in zip(engine.rules, engine.plan.evaluate(df)):
+        np.testing.assert_array_equal(mask, rule.evaluate_expr(df), err_msg=rule.name)
+
+
+def test_uncompiled_rule_falls_back_to_df_eval():
+    df = make_frame(n_rows=200)
+    rules = [{'name': 'isin', 'expr': 'device_id in ["F01", "F02"] and a > 0.5'}]
+    engine = RuleEngine(rules)
+    assert engine.plan.roots == [None]
+    assert alert_keys(engine.run(df)) == reference_alerts(rules, df)
+
+
+@pytest.mark.parametrize('chunk_rows', [13, 97, 1000, 5000])
+def test_stream_matches_run(chunk_rows):
+    df = make_frame()
+    engine = RuleEngine(RULES)
+    stream = engine.stream()
+    ordered = df.sort_index(kind='stable')
+    frames = [stream.feed(ordered.iloc[i:i + chunk_rows]) for i in range(0, len(ordered), chunk_rows)]
+    streamed = pd.concat(frames, ignore_index=True)
+    assert alert_keys(streamed) == alert_keys(engine.run(df))
+
+
+def test_stream_tail_is_bounded_by_max_window():
+    engine = RuleEngine(RULES)
+    stream = engine.stream()
+    ordered = make_frame().sort_index(kind='stable')
+    for i in range(0, len(ordered), 500):
+        stream.feed(ordered.iloc[i:i + 500])
+    latest = ordered.groupby('device_id').apply(lambda g: g.index.max())
+    tail = pd.Series(pd.to_datetime(stream._tail_ts), index=stream._tail_devices)
+    for device, ts in tail.items():
+        assert ts > latest[device] - engine.max_window
+
+
+def test_stream_state_survives_restart_with_integer_devices():
+    df = make_frame(devices=(7, 8, 9))
+    engine = RuleEngine(RULES)
+    ordered = df.sort_index(kind='stable')
+    first, second = ordered.iloc[:1500], ordered.iloc[1500:]
+
+    continuous = engine.stream()
+    continuous.feed(first)
+    expected = continuous.feed(second)
+
+    before = engine.stream()
+    before.feed(first)
+    state = json.loads(json.dumps(before.get_state()))
+    restarted = engine.stream()
+    restarted.set_state(state)
+    # 窗口尾部由预热重建，去重状态来自 JSON
+    restarted.prime(first)
+    assert alert_keys(restarted.feed(second)) == alert_keys(expected)
+
+
+@pytest.fixture
+def model_path(tmp_path):
+    df = make_frame(n_rows=500, seed=1)
+    model = GenericModel('sgd', random_state=0)
+    model.train(df[['a', '电流']], (df['a'].fillna(0) + df['电流'] > 1).astype(int))
+    path = str(tmp_path / 'model.pkl')
+    model.save(path)
+    return path
+
+
+def model_rules(path):
+    return [
+        {'name': 'model_high', 'model': path, 'threshold': 0.8, 'severity': 'high'},
+        {'name': 'model_low', 'model': path, 'threshold': 0.3, 'window': '2min all', 'dedup': '5min'},
+        {'name': 'expr', 'expr': 'b > 0.9'},
+    ]
+
+
+def scored_reference(path, df):
+    """模型规则等价于对正类概率列的阈值表达式"""
+    model = GenericModel()
+    model.load(path)
+    scored = df.assign(proba=model.predict_proba(df[['a', '电流']])[:, 1])
+    rules = [{**r, 'expr': f"proba >= {r['threshold']}"} if 'model' in r else r for r in model_rules(path)]
+    return reference_alerts(rules, scored)
+
+
+def test_model_rules_match_thresholded_scores(model_path, monkeypatch):
+    calls = []
+    score = ModelScorer.score
+    monkeypatch.setattr(ModelScorer, 'score', lambda self, df: calls.append(len(df)) or score(self, df))
+    df = make_frame()
+    engine = RuleEngine(model_rules(model_path))
+    # 两条规则共享同一个模型文件: 只加载一次，每个数据块只打分一次
+    assert list(engine.models) == [model_path]
+    alerts = engine.run(df)
+    assert calls == [len(df)]
+    assert {'model_high', 'model_low'} <= set(alerts['rule_name'])
+    assert alert_keys(alerts) == scored_reference(model_path, df)
+
+
+def test_model_rules_in_stream(model_path):
+    df = make_frame()
+    engine = RuleEngine(model_rules(model_path))
+    stream = engine.stream()
+    ordered = df.sort_index(kind='stable')
+    streamed = pd.concat([stream.feed(ordered.iloc[i:i + 400]) for i in range(0, len(ordered), 400)],
+                         ignore_index=True)
+    assert alert_keys(streamed) == scored_reference(model_path, df)
+
+
+def test_model_features_are_referenced_and_disable_pushdown(model_path):
+    engine = RuleEngine(model_rules(model_path))
+    assert engine.referenced_columns() == ['b', 'a', '电流']
+    assert engine.pushdown_filter(lambda name: name) is None
+
+
+def test_missing_model_never_fires(tmp_path):
+    df = make_frame(n_rows=200)
+    engine = RuleEngine([{'name': 'broken', 'model': str(tmp_path / 'missing.pkl')},
+                         {'name': 'expr', 'expr': 'b > 0.9'}])
+    assert engine.models == {str(tmp_path / 'missing.pkl'): None}
+    # 无法确定模型特征时需要全部列
+    assert engine.referenced_columns() is None
+    alerts = engine.run(df)
+    assert set(alerts['rule_name']) == {'expr'}
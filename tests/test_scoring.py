@@ -0,0 +1,95 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from allert.model.scoring import BatchScorer, FeatureBuffer, score_frame, write_scores
+from allert.model.sklearn_model import GenericModel
+
+FEATURES = ['电流', '电压', '温度']
+
+
+def make_frame(n, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame(rng.normal(0, 1, (n, len(FEATURES))), columns=FEATURES)
+    df['device_id'] = rng.choice(['d1', 'd2'], n)
+    df.index = pd.date_range('2024-01-01', periods=n, freq='s', name='timestamp')
+    return df
+
+
+@pytest.fixture(scope='module')
+def model_path(tmp_path_factory):
+    df = make_frame(500)
+    model = GenericModel('logistic')
+    model.train(df[FEATURES], (df['电流'] + df['电压'] > 0).astype(int))
+    path = str(tmp_path_factory.mktemp('model') / 'model.pkl')
+    model.save(path)
+    return path
+
+
+@pytest.fixture(scope='module')
+def reference(model_path):
+    model = GenericModel()
+    model.load(model_path)
+    return lambda df: model.predict_proba(df[FEATURES])[:, 1]
+
+
+def test_feature_buffer_orders_and_fills_missing():
+    buffer = FeatureBuffer(['b', 'a', 'missing'])
+    X = buffer.build(pd.DataFrame({'a': [1, 2], 'b': pd.array([3, None], dtype='Int64'), 'x': [0, 0]}))
+    assert list(X.columns) == ['b', 'a', 'missing']
+    np.testing.assert_array_equal(X.to_numpy(), [[3, 1, np.nan], [np.nan, 2, np.nan]])
+    # 缓冲区在较小的块之间复用
+    first = buffer._buffer
+    buffer.build(pd.DataFrame({'a': [1]}))
+    assert buffer._buffer is first
+
+
+@pytest.mark.parametrize('n', [0, 7, 50, 123])
+def test_threads_match_single_call(model_path, reference, n):
+    df = make_frame(n, seed=1)
+    with BatchScorer(model_path, batch_rows=50, workers=2) as scorer:
+        scores = scorer.score(df)
+    assert scores.shape == (n,)
+    np.testing.assert_allclose(scores, reference(df) if n else [])
+
+
+@pytest.mark.parametrize('n', [30, 123])
+def test_processes_match_single_call(model_path, reference, n):
+    # 30 行小于 batch_rows: 只有一批时也不能在父进程里调用子进程的打分函数
+    df = make_frame(n, seed=2)
+    with BatchScorer(model_path, batch_rows=50, workers=2, processes=True) as scorer:
+        np.testing.assert_allclose(scorer.score(df), reference(df))
+        assert scorer.rows == n
+
+
+@pytest.mark.filterwarnings('ignore:X has feature names')
+def test_model_without_feature_names_needs_features(tmp_path):
+    model = GenericModel('logistic')
+    model.train(np.random.default_rng(0).normal(size=(20, 2)), [0, 1] * 10)
+    path = str(tmp_path / 'model.pkl')
+    model.save(path)
+    with pytest.raises(ValueError):
+        BatchScorer(path)
+    with BatchScorer(path, features=['x', 'y']) as scorer:
+        assert scorer.score(pd.DataFrame({'x': [0.0], 'y': [1.0]})).shape == (1,)
+
+
+def test_write_scores(model_path, reference, tmp_path):
+    df = make_frame(90, seed=3)
+    out = str(tmp_path / 'out' / 'scores.csv')
+    chunks = [df.iloc[:40], df.iloc[40:40], df.iloc[40:]]
+    with BatchScorer(model_path, batch_rows=25) as scorer:
+        assert write_scores(chunks, scorer, out, threshold=0.5) == 90
+        # 再次运行覆盖旧文件
+        assert write_scores(chunks, scorer, out, threshold=0.5) == 90
+    result = pd.read_csv(out)
+    assert list(result.columns) == ['timestamp', 'device_id', 'score', 'alarm']
+    assert len(result) == 90
+    np.testing.assert_allclose(result['score'], reference(df))
+    assert (result['alarm'] == (result['score'] >= 0.5)).all()
+
+
+def test_score_frame_without_device():
+    df = pd.DataFrame({'a': [1, 2]}, index=pd.Index([10, 20], name='timestamp'))
+    out = score_frame(df, np.array([0.2, 0.9]), threshold=0.5)
+    assert out.to_dict('list') == {'timestamp': [10, 20], 'score': [0.2, 0.9], 'alarm': [0, 1]}
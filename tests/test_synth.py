@@ -0,0 +1,117 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from allert.model.synth import DataSynthesizer
+
+
+@pytest.fixture
+def base_df():
+    rng = np.random.default_rng(0)
+    x = rng.normal(10, 2, 2000)
+    return pd.DataFrame({
+        '电流': x,
+        '电压': 3 * x + rng.normal(0, 0.5, 2000),
+        '常数': np.full(2000, 5.0),
+        '稀疏': np.where(rng.random(2000) < 0.3, np.nan, rng.normal(0, 1, 2000)),
+        'bits_0': np.zeros(2000, dtype=np.uint64),
+        'device_id': 'd1',
+    })
+
+
+def test_statistics_skip_non_numeric_and_bit_words(base_df):
+    synth = DataSynthesizer(base_df)
+    assert list(synth.columns) == ['电流', '电压', '常数', '稀疏']
+    assert synth.cov.shape == (4, 4)
+
+
+def test_from_chunks_matches_batch_statistics(base_df):
+    batch = DataSynthesizer(base_df)
+    streamed = DataSynthesizer.from_chunks(base_df.iloc[i:i + 300] for i in range(0, len(base_df), 300))
+    assert list(streamed.columns) == list(batch.columns)
+    for name in ['count', 'mean', 'std']:
+        np.testing.assert_allclose(streamed.stats[name].to_numpy(dtype=float),
+                                   batch.stats[name].to_numpy(dtype=float), rtol=1e-9, atol=1e-12)
+    np.testing.assert_allclose(streamed.cov, batch.cov, rtol=1e-9, atol=1e-12)
+
+
+def test_from_chunks_empty():
+    synth = DataSynthesizer.from_chunks(iter([]))
+    df, labels = synth.generate(5, 0.0, seed=0)
+    assert df.shape == (5, 0) and labels.sum() == 0
+
+
+def test_generate_keeps_distribution_and_correlation(base_df):
+    synth = DataSynthesizer(base_df)
+    df, labels = synth.generate(20_000, 0.0, seed=1, chunk_rows=3000)
+    assert df.shape == (20_000, 4) and list(df.columns) == list(synth.columns)
+    assert not df.isna().any().any()
+    np.testing.assert_allclose(df.mean(), synth.stats['mean'].fillna(0), atol=0.1)
+    assert df['电流'].corr(df['电压']) > 0.95
+    # 常数列: 标准差取均值的 10%，与其他列不相关
+    assert df['常数'].std() == pytest.approx(0.5, rel=0.05)
+    assert abs(df['常数'].corr(df['电流'])) < 0.05
+
+
+def test_generate_is_reproducible_and_chunk_size_independent(base_df):
+    synth = DataSynthesizer(base_df)
+    a, la = synth.generate(1000, 0.1, seed=3, chunk_rows=1000)
+    b, lb = synth.generate(1000, 0.1, seed=3, chunk_rows=1000)
+    pd.testing.assert_frame_equal(a, b)
+    np.testing.assert_array_equal(la, lb)
+
+
+def test_fault_episodes():
+    rng = np.random.default_rng(0)
+    labels, fault_type, position = DataSynthesizer.fault_episodes(1000, 0.2, fault_length=10, n_types=3, rng=rng)
+    assert labels.sum() == 200
+    assert ((fault_type >= 0) == (labels == 1)).all()
+    assert ((position >= 0) == (labels == 1)).all()
+    # 片段内的行序号从 0 连续递增
+    starts = np.flatnonzero(position == 0)
+    assert 1 < len(starts) < 200
+    assert (np.diff(position)[labels[1:] == 1][position[1:][labels[1:] == 1] > 0] == 1).all()
+
+
+def test_faults_shift_labelled_rows_by_signature(base_df):
+    synth = DataSynthesizer(base_df)
+    df, labels = synth.generate(5000, 0.3, seed=7, fault_length=20)
+    assert labels.sum() == 1500
+    # 生成时第一次从 rng 取随机数的是故障特征
+    signature = synth.fault_signatures(1, np.random.default_rng(7))[0]
+    assert np.abs(signature).max() > 0
+    shift = (df[labels == 1].mean() - df[labels == 0].mean()).to_numpy()
+    np.testing.assert_allclose(shift, signature, atol=0.3 * synth.stats['std'].fillna(0).max())
+
+
+def test_ramp_deepens_faults_gradually(base_df):
+    synth = DataSynthesizer(base_df)
+    rng = np.random.default_rng(8)
+    signature = synth.fault_signatures(1, rng)[0]
+    labels, _, position = DataSynthesizer.fault_episodes(4000, 0.5, 200, 1, rng)
+    column = int(np.argmax(np.abs(signature)))
+    df, generated = synth.generate(4000, 0.5, seed=8, fault_length=200, ramp=100)
+    np.testing.assert_array_equal(generated, labels)
+    values = df.iloc[:, column].to_numpy() - synth.stats['mean'].iloc[column]
+    early = values[(position >= 0) & (position < 10)].mean()
+    late = values[position >= 100].mean()
+    assert abs(early) < abs(late) / 3
+    assert late == pytest.approx(signature[column], rel=0.15)
+
+
+def test_autocorrelation(base_df):
+    synth = DataSynthesizer(base_df)
+    df, _ = synth.generate(5000, 0.0, seed=4, autocorr=0.9, chunk_rows=700)
+    assert df['电流'].autocorr() == pytest.approx(0.9, abs=0.05)
+    assert df['电流'].std() == pytest.approx(synth.stats.loc['电流', 'std'], rel=0.15)
+
+
+def test_generate_to_memmap_matches_generate(base_df, tmp_path):
+    synth = DataSynthesizer(base_df)
+    path = str(tmp_path / 'synth.npy')
+    values, labels = synth.generate_to_memmap(path, 2500, 0.1, dtype=np.float64, seed=5, chunk_rows=600)
+    df, expected = synth.generate(2500, 0.1, seed=5, chunk_rows=600)
+    assert isinstance(values, np.memmap) and not values.flags.writeable
+    np.testing.assert_allclose(values, df.to_numpy())
+    np.testing.assert_array_equal(labels, expected)
+    assert np.load(f'{path}.labels.npy').dtype == np.int8
@@ -0,0 +1,132 @@
+import numpy as np
+import pandas as pd
+
+from allert.data_loader import build_shard_queries
+from allert.tsdb_fetch import (ColumnarFetcher, fetch_many, fetch_sharded, iter_frames, merge_frames,
+                               split_time_range)
+
+
+class ListCursor:
+    def __init__(self, rows, description):
+        self.rows = rows
+        self.description = description
+        self._pos = 0
+
+    def fetchmany(self, size):
+        rows = self.rows[self._pos:self._pos + size]
+        self._pos += size
+        return rows
+
+
+def fetch(rows, description, block_rows=3):
+    return ColumnarFetcher(ListCursor(rows, description), block_rows=block_rows).fetch_frame()
+
+
+def test_merge_frames_empty():
+    assert merge_frames([]).empty
+
+
+def test_columnar_fetch_matches_rows():
+    description = [('ts', 'TIMESTAMP'), ('a', 'DOUBLE'), ('ok', 'BOOL'), ('equ_code', 'NCHAR')]
+    ts = pd.date_range('2026-01-01', periods=7, freq='s').to_pydatetime().tolist()
+    rows = [(t, float(i), i % 2 == 0, f'F{i % 2:02d}') for i, t in enumerate(ts)]
+    df = fetch(rows, description)
+    expected = pd.DataFrame(rows, columns=[d[0] for d in description])
+    assert df['ok'].dtype == np.bool_
+    assert isinstance(df['equ_code'].dtype, pd.CategoricalDtype)
+    pd.testing.assert_frame_equal(df.astype({'equ_code': object}), expected.astype({'equ_code': object}),
+                                  check_dtype=False)
+
+
+def test_kinds_resolved_from_later_blocks():
+    # 没有类型名且第一块全为 NULL 时，列类型由后续块决定；带 NULL 的布尔列为 float
+    description = [('ts', 'TIMESTAMP'), ('a', 6), ('ok', 1)]
+    ts = pd.date_range('2026-01-01', periods=6, freq='s').to_pydatetime().tolist()
+    rows = [(t, None if i < 3 else float(i), None if i < 3 else True) for i, t in enumerate(ts)]
+    df = fetch(rows, description)
+    assert df['a'].dtype == np.float64
+    assert df['a'].isna().sum() == 3 and df['a'].iloc[3:].tolist() == [3.0, 4.0, 5.0]
+    assert df['ok'].dtype == np.float64
+    assert df['ok'].iloc[3:].tolist() == [1.0, 1.0, 1.0]
+
+
+def test_iter_frames_blocks_and_float32():
+    description = [('ts', 'TIMESTAMP'), ('a', 'FLOAT'), ('n', 'INT')]
+    ts = pd.date_range('2026-01-01', periods=7, freq='s').to_pydatetime().tolist()
+    rows = [(t, float(i), i) for i, t in enumerate(ts)]
+    frames = list(iter_frames(ListCursor(rows, description), block_rows=3, float_dtype=np.float32))
+    assert [len(f) for f in frames] == [3, 3, 1]
+    assert frames[0]['a'].dtype == np.float32
+    assert pd.concat(frames)['n'].tolist() == list(range(7))
+
+
+class QueryConnection:
+    """按 SQL 返回预置结果的假连接"""
+
+    def __init__(self, results):
+        self.results = results
+        self.closed = False
+
+    def cursor(self):
+        conn = self
+
+        class Cursor(ListCursor):
+            def __init__(self):
+                super().__init__([], [('ts', 'TIMESTAMP'), ('a', 'DOUBLE'), ('equ_code', 'NCHAR')])
+
+            def execute(self, sql):
+                assert not conn.closed
+                self.rows = conn.results[sql]
+
+            def close(self):
+                pass
+
+        return Cursor()
+
+    def close(self):
+        self.closed = True
+
+
+def test_split_time_range():
+    parts = split_time_range('2026-01-01', '2026-01-02', 4)
+    assert len(parts) == 4
+    assert parts[0][0] == pd.Timestamp('2026-01-01') and parts[-1][1] == pd.Timestamp('2026-01-02')
+    assert all(a[1] == b[0] for a, b in zip(parts, parts[1:]))
+
+
+def test_build_shard_queries():
+    queries = build_shard_queries('2026-01-01', '2026-01-03', shards=2, devices=['F01', 'F02'], table='t',
+                                  columns=['ts', 'a'], where='a > 1')
+    assert queries == [
+        "SELECT ts, a FROM t WHERE ts >= '2026-01-01 00:00:00.000' AND ts < '2026-01-02 00:00:00.000' "
+        "AND (a > 1) AND (equ_code = 'F01')",
+        "SELECT ts, a FROM t WHERE ts >= '2026-01-01 00:00:00.000' AND ts < '2026-01-02 00:00:00.000' "
+        "AND (a > 1) AND (equ_code = 'F02')",
+        "SELECT ts, a FROM t WHERE ts >= '2026-01-02 00:00:00.000' AND ts < '2026-01-03 00:00:00.000' "
+        "AND (a > 1) AND (equ_code = 'F01')",
+        "SELECT ts, a FROM t WHERE ts >= '2026-01-02 00:00:00.000' AND ts < '2026-01-03 00:00:00.000' "
+        "AND (a > 1) AND (equ_code = 'F02')",
+    ]
+
+
+def test_fetch_sharded_merges_in_time_order():
+    ts = pd.date_range('2026-01-01', periods=12, freq='min').to_pydatetime().tolist()
+    # 按设备分片: 各分片内时间有序，分片之间交错
+    results = {f'q{d}': [(t, float(i), f'F0{d}') for i, t in enumerate(ts) if i % 3 == d] for d in range(3)}
+    results['empty'] = []
+    opened = []
+
+    def connect():
+        opened.append(QueryConnection(results))
+        return opened[-1]
+
+    queries = ['q0', 'q1', 'q2', 'empty']
+    frames = fetch_many(connect, queries, workers=2)
+    assert [len(f) for f in frames] == [4, 4, 4, 0]
+    assert frames[1]['equ_code'].astype(str).unique().tolist() == ['F01']
+    assert 1 <= len(opened) <= 2 and all(conn.closed for conn in opened)
+
+    df = fetch_sharded(connect, queries, workers=3)
+    assert df['a'].tolist() == [float(i) for i in range(12)]
+    assert df['ts'].is_monotonic_increasing
+    assert isinstance(df['equ_code'].dtype, pd.CategoricalDtype)
@@ -0,0 +1,207 @@
+import threading
+import time
+
+import pytest
+
+from allert import tsdb_pool
+from allert.tsdb_pool import HEALTH_CHECK_SQL, ConnectionPool, PoolTimeout, get_pool
+
+
+class PoolCursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def execute(self, sql):
+        self.conn.log.append(sql)
+        if self.conn.dead:
+            raise RuntimeError('connection reset')
+
+    def fetchall(self):
+        return [(1,)]
+
+    def close(self):
+        pass
+
+
+class PoolConnection:
+    def __init__(self):
+        self.log = []
+        self.dead = False
+        self.closed = False
+
+    def cursor(self):
+        return PoolCursor(self)
+
+    def close(self):
+        self.closed = True
+
+
+class Connector:
+    """记录新建的连接；fail 为真时模拟连接失败"""
+
+    def __init__(self):
+        self.opened = []
+        self.fail = False
+
+    def __call__(self):
+        if self.fail:
+            raise ConnectionError('refused')
+        conn = PoolConnection()
+        self.opened.append(conn)
+        return conn
+
+
+@pytest.fixture
+def connect():
+    return Connector()
+
+
+def make_pool(connect, **kwargs):
+    return ConnectionPool('taosws://root:taosdata@db:6041', connect=connect,
+                          **{'max_size': 2, 'health_check': '1h', 'timeout': 1, **kwargs})
+
+
+def test_reuses_connections_and_database(connect):
+    pool = make_pool(connect)
+    for _ in range(3):
+        with pool.connection('station_data') as conn:
+            conn.cursor().execute('SELECT 1')
+    assert len(connect.opened) == 1
+    assert connect.opened[0].log == ['USE station_data'] + ['SELECT 1'] * 3
+    stats = pool.stats()
+    assert (stats['hits'], stats['misses'], stats['db_switches']) == (2, 1, 1)
+    assert stats['hit_rate'] == pytest.approx(2 / 3)
+    assert (stats['open'], stats['idle'], stats['in_use']) == (1, 1, 0)
+
+
+def test_prefers_connection_on_requested_database(connect):
+    pool = make_pool(connect)
+    a, b = pool.acquire('a'), pool.acquire('b')
+    pool.release(a)
+    pool.release(b)
+    assert pool.acquire('a').conn is a.conn
+    assert pool.acquire('b').conn is b.conn
+    assert pool.stats()['db_switches'] == 2
+
+
+def test_concurrent_use_never_exceeds_max_size(connect):
+    pool = make_pool(connect)
+    active, peak = [0], [0]
+    lock = threading.Lock()
+
+    def work(database):
+        with pool.connection(database):
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.01)
+            with lock:
+                active[0] -= 1
+
+    threads = [threading.Thread(target=work, args=('a' if i % 2 else 'b',)) for i in range(10)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(connect.opened) == 2 and peak[0] == 2
+    stats = pool.stats()
+    assert stats['hits'] + stats['misses'] == 10 and stats['waits'] > 0
+
+
+def test_timeout_when_exhausted(connect):
+    pool = make_pool(connect, max_size=1)
+    session = pool.acquire()
+    start = time.monotonic()
+    with pytest.raises(PoolTimeout):
+        pool.acquire(timeout=0.05)
+    assert time.monotonic() - start >= 0.05
+    pool.release(session)
+    assert pool.acquire(timeout=0.05) is session
+
+
+def test_failed_connect_frees_the_slot(connect):
+    pool = make_pool(connect, max_size=1)
+    connect.fail = True
+    with pytest.raises(ConnectionError):
+        pool.acquire()
+    connect.fail = False
+    with pool.connection():
+        pass
+    assert pool.stats()['open'] == 1
+
+
+def test_error_marks_connection_suspect(connect):
+    pool = make_pool(connect)
+    with pytest.raises(RuntimeError):
+        with pool.connection() as conn:
+            conn.dead = True
+            raise RuntimeError('query failed')
+    # 出错的连接取出前先做健康检查，失败则丢弃并新建
+    with pool.connection() as conn:
+        assert conn is connect.opened[1]
+    assert connect.opened[0].closed
+    assert connect.opened[0].log[-1] == HEALTH_CHECK_SQL
+    stats = pool.stats()
+    assert (stats['health_checks'], stats['broken'], stats['open']) == (1, 1, 1)
+
+
+def test_suspect_connection_that_passes_is_kept(connect):
+    pool = make_pool(connect)
+    with pytest.raises(ValueError):
+        with pool.connection():
+            raise ValueError('bad data')
+    with pool.connection() as conn:
+        assert conn is connect.opened[0]
+    with pool.connection():
+        pass
+    assert pool.stats()['health_checks'] == 1
+
+
+def test_closed_generator_is_not_a_failure(connect):
+    pool = make_pool(connect)
+
+    def rows():
+        with pool.connection():
+            yield 1
+            yield 2
+
+    gen = rows()
+    next(gen)
+    gen.close()
+    with pool.connection():
+        pass
+    assert pool.stats()['health_checks'] == 0
+
+
+def test_stale_connections_are_checked_and_evicted(connect):
+    pool = make_pool(connect, health_check=0)
+    with pool.connection():
+        pass
+    with pool.connection():
+        pass
+    assert pool.stats()['health_checks'] == 1
+    pool.max_idle = 0
+    time.sleep(0.01)
+    with pool.connection():
+        pass
+    assert connect.opened[0].closed
+    assert pool.stats()['evicted'] == 1 and len(connect.opened) == 2
+
+
+def test_close_closes_idle_connections(connect):
+    pool = make_pool(connect)
+    session = pool.acquire()
+    with pool.connection():
+        pass
+    pool.close()
+    assert connect.opened[1].closed and not connect.opened[0].closed
+    assert pool.stats()['open'] == 1
+    pool.release(session)
+    assert pool.stats()['idle'] == 1
+
+
+def test_get_pool_is_shared_per_dsn(monkeypatch, connect):
+    monkeypatch.setattr(tsdb_pool, '_pools', {})
+    pool = get_pool('taosws://a', connect=connect, max_size=3)
+    assert get_pool('taosws://a', max_size=5) is pool and pool.max_size == 3
+    assert get_pool('taosws://b', connect=connect) is not pool
@@ -0,0 +1,53 @@
+import pandas as pd
+
+from allert.watermark import WatermarkStore
+
+
+def frame(devices, times):
+    return pd.DataFrame({'device_id': devices, 'a': range(len(devices))},
+                        index=pd.DatetimeIndex(pd.to_datetime(times), name='timestamp'))
+
+
+def test_split_and_advance(tmp_path):
+    store = WatermarkStore(str(tmp_path / 'state.json'))
+    first = frame(['F01', 'F02'], ['2026-01-01 00:00', '2026-01-01 00:05'])
+    old, new = store.split(first)
+    assert old.empty and len(new) == 2
+    store.advance(new)
+    assert store.watermarks == {'F01': pd.Timestamp('2026-01-01 00:00'), 'F02': pd.Timestamp('2026-01-01 00:05')}
+
+    second = frame(['F01', 'F02', 'F03'], ['2026-01-01 00:03', '2026-01-01 00:05', '2026-01-01 00:01'])
+    old, new = store.split(second)
+    assert list(old['device_id']) == ['F02']
+    assert list(new['device_id']) == ['F01', 'F03']
+
+
+def test_integer_devices_survive_restart(tmp_path):
+    path = str(tmp_path / 'state.json')
+    store = WatermarkStore(path)
+    store.advance(frame([7, 8], ['2026-01-01 00:00', '2026-01-01 00:05']))
+    store.last_alert = {'rule': {'7': '2026-01-01T00:00:00'}}
+    store.save()
+
+    restarted = WatermarkStore(path)
+    assert restarted.last_alert == store.last_alert
+    old, new = restarted.split(frame([7, 8, 8], ['2026-01-01 00:00', '2026-01-01 00:04', '2026-01-01 00:06']))
+    assert len(old) == 2 and list(new['device_id']) == [8]
+    # 更早的时间不会回退水位
+    restarted.advance(frame([7], ['2025-12-31 23:00']))
+    assert restarted.watermarks['7'] == pd.Timestamp('2026-01-01 00:00')
+
+
+def test_lower_bound_skips_stale_devices(tmp_path):
+    store = WatermarkStore(str(tmp_path / 'state.json'))
+    assert store.lower_bound() is None
+    store.advance(frame(['F01', 'F02', 'F03'], ['2026-01-01 00:00', '2026-01-01 09:00', '2026-01-01 10:00']))
+    assert store.lower_bound() == pd.Timestamp('2026-01-01 00:00')
+    assert store.lower_bound(max_lag=pd.Timedelta('2h')) == pd.Timestamp('2026-01-01 09:00')
+
+
+def test_corrupt_state_is_ignored(tmp_path):
+    path = tmp_path / 'state.json'
+    path.write_text('{not json', encoding='utf-8')
+    store = WatermarkStore(str(path))
+    assert store.watermarks == {} and store.last_alert == {}
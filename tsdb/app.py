@@ -1,9 +1,21 @@
 import streamlit as st
-import pandas as pd
-import taosws
 from openai import OpenAI
-import json
 import re
+import os
+import sys
+
+# 将项目根目录添加到 sys.path 以便导入 allert 模块
+_root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _root_dir not in sys.path:
+    sys.path.insert(0, _root_dir)
+
+from allert.tsdb_pool import get_pool
+from plus.paging import fetch_bounded
+from plus.rewrite import bound_sql
+
+# 单次查询的行数与内存上限: 生成的 SQL 没有 LIMIT 时注入，超过时截断
+MAX_ROWS = 100_000
+MAX_RESULT_MB = 128
 
 # --- 页面配置 ---
 st.set_page_config(
@@ -58,26 +70,30 @@ with st.sidebar:
 # --- 核心函数 ---
 
 
-def get_db_connection():
+def get_db_pool():
+    # 进程内共享的连接池，所有会话复用连接
     dsn = f"taosws://{td_user}:{td_pass}@{td_host}:{td_port}"
-    return taosws.connect(dsn)
+    return get_pool(dsn)
 
 
 def execute_query(sql):
     try:
-        conn = get_db_connection()
-        # 确保使用正确的数据库
-        cursor = conn.cursor()
-        cursor.execute("USE solar_power")
-
-        cursor.execute(sql)
-        fields = [field[0] for field in cursor.description]
-        data = cursor.fetchall()
+        sql, capped = bound_sql(sql, MAX_ROWS)
+        # 借出的连接已切换到正确的数据库
+        with get_db_pool().connection("solar_power") as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.execute(sql)
+                df, truncated = fetch_bounded(cursor, max_bytes=MAX_RESULT_MB * 1024 ** 2)
+            finally:
+                cursor.close()
 
-        cursor.close()
-        conn.close()
+        if truncated:
+            st.warning(f"结果超过 {MAX_RESULT_MB} MB，只显示前 {len(df):,} 行")
+        elif capped and len(df) >= MAX_ROWS:
+            st.warning(f"结果超过 {MAX_ROWS:,} 行，已自动添加 LIMIT {MAX_ROWS}")
 
-        return pd.DataFrame(data, columns=fields), None
+        return df, None
     except Exception as e:
         return None, str(e)
 
@@ -1,6 +1,13 @@
 import pandas as pd
 import json
+import os
 import re
+import sys
+
+# 将项目根目录添加到 sys.path 以便导入 allert 模块
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from allert.mapping_artifact import compile_mapping
 
 try:
     # Read CSV
@@ -28,5 +35,9 @@ try:
 
     print(f"Mapping saved to column_mapping.json. Found {len(mapping)} columns.")
 
+    # 编译映射产物 (正反向索引 + 点表 type/factor/dtype)，供 allert 与 plus 直接加载
+    compiled = compile_mapping('column_mapping.json', meta_path='jjl.csv', meta_encoding='gbk')
+    print(f"Compiled mapping saved with metadata for {len(compiled.columns)} columns.")
+
 except Exception as e:
     print(f"Error: {e}")